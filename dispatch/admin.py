@@ -16,7 +16,7 @@ from dispatch.services.duties import (
     get_duties_by_date,
     get_duties_assigned,
     get_duties_covering_date,
-    get_or_create_duty,
+    assign_duties,
     get_or_create_duty_range,
     duty_overlaps_range,
     delete_duty,
@@ -25,6 +25,7 @@ from dispatch.calendar_ru import get_non_working_ranges
 from dispatch.utils import decl, now, today
 from myapp.admin_mixins import CustomAdmin
 from myapp.services.users import get_all_users
+from myproject.history import bulk_history
 
 
 logger = structlog.get_logger(__name__)
@@ -229,48 +230,45 @@ class DutyRoleAdmin(CustomAdmin):
                     rest_step=duty_form.cleaned_data.get("rest_step") or 0,
                 )
 
-                # Нерабочие дни по производственному календарю: объединяем в длинные дежурства
-                ranges = get_non_working_ranges(start_date, end_date)
-                non_working_days = set()
-                for range_start, range_end in ranges:
-                    current = range_start
-                    while current <= range_end:
-                        non_working_days.add(current)
-                        current += timedelta(days=1)
-
-                for range_start, range_end in ranges:
-                    if duty_overlaps_range(duty_role, range_start, range_end):
-                        continue
-                    duty, created = get_or_create_duty_range(
-                        range_start, range_end, duty_role, defaults={"user": user}
-                    )
-                    if not created:
-                        duty.user = user
-                        duty.save()
-                        updated_count += 1
-                    else:
-                        created_count += 1
-
-                # На рабочие дни продолжаем создавать обычные дежурства по шагу/отдыху
-                duty_step = duty_form.cleaned_data.get("duty_step") or 1
-                rest_step = duty_form.cleaned_data.get("rest_step") or 0
-                current_date = start_date
-                while current_date <= end_date:
-                    for _ in range(duty_step):
-                        if current_date > end_date:
-                            break
-                        if current_date not in non_working_days:
-                            duty, created = get_or_create_duty(
-                                duty_date=current_date, role=duty_role, defaults={"user": user}
-                            )
-                            if not created:
-                                duty.user = user
-                                updated_count += 1
-                            else:
-                                created_count += 1
+                with bulk_history():
+                    # Нерабочие дни по производственному календарю: объединяем в длинные дежурства
+                    ranges = get_non_working_ranges(start_date, end_date)
+                    non_working_days = set()
+                    for range_start, range_end in ranges:
+                        current = range_start
+                        while current <= range_end:
+                            non_working_days.add(current)
+                            current += timedelta(days=1)
+
+                    for range_start, range_end in ranges:
+                        if duty_overlaps_range(duty_role, range_start, range_end):
+                            continue
+                        duty, created = get_or_create_duty_range(
+                            range_start, range_end, duty_role, defaults={"user": user}
+                        )
+                        if not created:
+                            duty.user = user
                             duty.save()
-                        current_date += timedelta(days=1)
-                    current_date += timedelta(days=rest_step)
+                            updated_count += 1
+                        else:
+                            created_count += 1
+
+                    # На рабочие дни продолжаем создавать обычные дежурства по шагу/отдыху
+                    duty_step = duty_form.cleaned_data.get("duty_step") or 1
+                    rest_step = duty_form.cleaned_data.get("rest_step") or 0
+                    duty_dates = []
+                    current_date = start_date
+                    while current_date <= end_date:
+                        for _ in range(duty_step):
+                            if current_date > end_date:
+                                break
+                            if current_date not in non_working_days:
+                                duty_dates.append(current_date)
+                            current_date += timedelta(days=1)
+                        current_date += timedelta(days=rest_step)
+                    assigned_created, assigned_updated = assign_duties(duty_dates, duty_role, user)
+                    created_count += assigned_created
+                    updated_count += assigned_updated
                 logger.info(
                     "admin_duty_schedule_add_finished",
                     duty_role_id=duty_role.id,
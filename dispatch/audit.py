@@ -1,5 +1,8 @@
+import random
 from functools import partial
 
+from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 
 from dispatch.models import (
@@ -16,11 +19,21 @@ from dispatch.models import (
     VideoMessage,
     WeekendDutyAssignment,
 )
-from myproject.observability import diff_snapshots, get_logger, model_snapshot
+from myproject.history import update_with_history
+from myproject.observability import (
+    diff_snapshots,
+    get_logger,
+    model_snapshot,
+    serialize_for_log,
+)
 
 
 logger = get_logger(__name__)
 
+AUDIT_MODE_FULL = "full"
+AUDIT_MODE_CHANGES = "changes"
+AUDIT_MODE_OFF = "off"
+
 _AUDIT_SIGNAL_REGISTERED = False
 _AUDITED_MODELS = (
     DutyRole,
@@ -46,35 +59,120 @@ def _object_context(instance):
     }
 
 
+def get_audit_mode() -> str:
+    mode = getattr(settings, "DISPATCH_AUDIT_MODE", AUDIT_MODE_FULL)
+    if mode not in {AUDIT_MODE_FULL, AUDIT_MODE_CHANGES, AUDIT_MODE_OFF}:
+        return AUDIT_MODE_FULL
+    return mode
+
+
+def _should_log_full_payload() -> bool:
+    if get_audit_mode() != AUDIT_MODE_FULL:
+        return False
+    sample_rate = getattr(settings, "DISPATCH_AUDIT_FULL_PAYLOAD_SAMPLE_RATE", 1.0)
+    return sample_rate >= 1 or random.random() < sample_rate
+
+
 def _cache_previous_state(sender, instance, **kwargs):
+    if get_audit_mode() == AUDIT_MODE_OFF:
+        return
+
     if not instance.pk:
         instance._audit_previous_snapshot = None
         return
 
-    previous_instance = sender.objects.filter(pk=instance.pk).first()
-    instance._audit_previous_snapshot = (
-        model_snapshot(previous_instance) if previous_instance else None
-    )
+    # Состояние на момент загрузки (FieldTrackerMixin.from_db); SELECT только
+    # для объектов, собранных вручную или загруженных с defer()/only().
+    previous_snapshot = instance.loaded_snapshot()
+    if previous_snapshot is None:
+        previous_instance = sender.objects.filter(pk=instance.pk).first()
+        previous_snapshot = model_snapshot(previous_instance) if previous_instance else None
+    instance._audit_previous_snapshot = previous_snapshot
 
 
 def _log_saved(sender, instance, created, **kwargs):
-    before = getattr(instance, "_audit_previous_snapshot", None)
+    if get_audit_mode() == AUDIT_MODE_OFF:
+        return
+
+    before = None if created else getattr(instance, "_audit_previous_snapshot", None)
     after = model_snapshot(instance)
     changes = diff_snapshots(before, after)
 
+    payload = {"changes": changes}
+    if _should_log_full_payload():
+        payload.update(before=before, after=after)
+
     logger.info(
         "dispatch_model_created" if created else "dispatch_model_updated",
         **_object_context(instance),
-        before=before,
-        after=after,
-        changes=changes,
+        **payload,
     )
 
+    instance._audit_loaded_snapshot = after
     if hasattr(instance, "_audit_previous_snapshot"):
         delattr(instance, "_audit_previous_snapshot")
 
 
+def log_bulk_created(model, objs):
+    """Аудит для bulk_create: сигналы save при нём не отправляются."""
+    objs = list(objs)
+    if get_audit_mode() == AUDIT_MODE_OFF or not objs:
+        return objs
+
+    event = {
+        "model": model._meta.label_lower,
+        "object_ids": [obj.pk for obj in objs],
+        "object_count": len(objs),
+    }
+    if _should_log_full_payload():
+        event["after"] = [model_snapshot(obj) for obj in objs]
+    logger.info("dispatch_model_bulk_created", **event)
+
+    for obj in objs:
+        obj._audit_loaded_snapshot = model_snapshot(obj)
+    return objs
+
+
+def audited_update(queryset, **values):
+    """
+    update_with_history(...) с одной записью аудита на всю пачку.
+    Значения-выражения (F(), Case...) логируются уже вычисленными, по объектам.
+    """
+    if get_audit_mode() == AUDIT_MODE_OFF:
+        return update_with_history(queryset, **values)
+
+    model = queryset.model
+    with transaction.atomic():
+        object_ids = list(queryset.values_list("pk", flat=True))
+        if not object_ids:
+            return 0
+        updated = model._default_manager.filter(pk__in=object_ids)
+        updated_count = update_with_history(updated, **values)
+
+        event = {
+            "model": model._meta.label_lower,
+            "object_ids": object_ids,
+            "updated_count": updated_count,
+            "changes": {
+                key: {"new": serialize_for_log(value)}
+                for key, value in values.items()
+                if not hasattr(value, "resolve_expression")
+            },
+        }
+        computed_fields = [key for key, value in values.items() if hasattr(value, "resolve_expression")]
+        if computed_fields:
+            event["computed_values"] = {
+                str(row.pop("pk")): {key: serialize_for_log(value) for key, value in row.items()}
+                for row in updated.values("pk", *computed_fields)
+            }
+    logger.info("dispatch_model_bulk_updated", **event)
+    return updated_count
+
+
 def _log_deleted(sender, instance, **kwargs):
+    if get_audit_mode() == AUDIT_MODE_OFF:
+        return
+
     logger.warning(
         "dispatch_model_deleted",
         **_object_context(instance),
@@ -85,6 +183,8 @@ def _log_deleted(sender, instance, **kwargs):
 def _log_m2m_change(field_name, sender, instance, action, reverse, pk_set, **kwargs):
     if action not in {"post_add", "post_remove", "post_clear"}:
         return
+    if get_audit_mode() == AUDIT_MODE_OFF:
+        return
 
     logger.info(
         "dispatch_model_m2m_changed",
@@ -12,6 +12,7 @@ from django.utils.deconstruct import deconstructible
 from storages.backends.s3boto3 import S3Boto3Storage
 
 from myproject import settings
+from myproject.observability import FieldTrackerMixin
 from myproject.settings import AUTH_USER_MODEL
 from dispatch.utils import now
 
@@ -22,7 +23,7 @@ class DispatchS3MediaStorage(S3Boto3Storage):
     file_overwrite = False
 
 
-class DutyRole(models.Model):
+class DutyRole(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100, verbose_name='Имя роли')
 
     class Meta:
@@ -33,7 +34,7 @@ class DutyRole(models.Model):
         return f"{self.name}"
 
 
-class ExploitationRole(models.Model):
+class ExploitationRole(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100, verbose_name='Имя роли')
 
     members = models.ManyToManyField(AUTH_USER_MODEL, related_name='exploitation_roles', verbose_name='Участники',
@@ -47,7 +48,7 @@ class ExploitationRole(models.Model):
         return f"{self.name}"
 
 
-class DutyPoint(models.Model):
+class DutyPoint(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=150, verbose_name='Имя системы дежурств')
     level_0_role = models.ForeignKey(ExploitationRole, on_delete=models.SET_NULL, null=True, blank=True,
                                      verbose_name='Персонал, вызывающий дежурного (уровень 0)', related_name='level_0_role')
@@ -68,7 +69,7 @@ class DutyPoint(models.Model):
         return f"{self.name}"
 
 
-class Duty(models.Model):
+class Duty(FieldTrackerMixin, models.Model):
     user = models.ForeignKey(AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Аккаунт дежурного')
     role = models.ForeignKey(DutyRole, on_delete=models.CASCADE, null=True, verbose_name='Роль дежурства')
     is_opened = models.BooleanField(default=False, verbose_name='Открыт ли')
@@ -122,7 +123,7 @@ class Duty(models.Model):
         return f"{self.user} - {self.date} ({self.role})"
 
 
-class WeekendDutyAssignment(models.Model):
+class WeekendDutyAssignment(FieldTrackerMixin, models.Model):
     role = models.ForeignKey(
         DutyRole,
         on_delete=models.CASCADE,
@@ -153,7 +154,7 @@ class DutyActionTypeEnum(enum.Enum):
     ACCEPTANCE = "acceptance"  # Принятие дежурства
 
 
-class DutyAction(models.Model):
+class DutyAction(FieldTrackerMixin, models.Model):
     """Модель для хранения действий с дежурствами (отказы, передачи, принятия)"""
 
     ACTION_CHOICES = [
@@ -210,7 +211,7 @@ class IncidentStatusEnum(enum.Enum):
     WAITING_TO_BE_ACCEPTED = 'waiting_to_be_accepted'
 
 
-class Incident(models.Model):
+class Incident(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         (IncidentStatusEnum.OPENED.value, 'В работе'),
         (IncidentStatusEnum.CLOSED.value, 'Выполнено'),
@@ -243,7 +244,7 @@ class Incident(models.Model):
         return f'{self.name} ({self.get_status_display()})'
 
 
-class IncidentMessage(models.Model):
+class IncidentMessage(FieldTrackerMixin, models.Model):
     TEXT = "text"
     PHOTO = "photo"
     VIDEO = "video"
@@ -286,7 +287,7 @@ class PathAndRename(object):
         return os.path.join(self.path, filename)
 
 
-class TextMessage(models.Model):
+class TextMessage(FieldTrackerMixin, models.Model):
     message = models.OneToOneField(IncidentMessage, on_delete=models.CASCADE, related_name="text")
     text = models.TextField(verbose_name="Текст")
 
@@ -294,16 +295,16 @@ class TextMessage(models.Model):
         return f"{self.text}"
 
 
-class PhotoMessage(models.Model):
+class PhotoMessage(FieldTrackerMixin, models.Model):
     message = models.OneToOneField(IncidentMessage, on_delete=models.CASCADE, related_name="photo")
     photo = models.ImageField(storage=DispatchS3MediaStorage(), upload_to=PathAndRename("photos"))
 
 
-class VideoMessage(models.Model):
+class VideoMessage(FieldTrackerMixin, models.Model):
     message = models.OneToOneField(IncidentMessage, on_delete=models.CASCADE, related_name="video")
     video = models.FileField(storage=DispatchS3MediaStorage(), upload_to=PathAndRename("videos"))
 
 
-class AudioMessage(models.Model):
+class AudioMessage(FieldTrackerMixin, models.Model):
     message = models.OneToOneField(IncidentMessage, on_delete=models.CASCADE, related_name="audio")
     audio = models.FileField(storage=DispatchS3MediaStorage(), upload_to=PathAndRename("audios"))
@@ -2,9 +2,12 @@ from datetime import date, timedelta, datetime
 
 from django.db.models import Q
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
+from dispatch.audit import log_bulk_created
 from dispatch.models import Duty, DutyRole, ExploitationRole, DutyPoint
 from dispatch.utils import now
+from myproject.history import bulk_create_with_history
 from myproject.settings import AUTH_USER_MODEL
 
 
@@ -81,14 +84,44 @@ def get_duty_point_by_duty_role(duty_role: DutyRole):
     return DutyPoint.objects.filter(Q(level_1_role=duty_role) | Q(level_2_role=duty_role) | Q(level_3_role=duty_role)).all()
 
 
-def get_or_create_duty(duty_date: date, role: DutyRole, defaults):
-    defaults['start_datetime'] = datetime(duty_date.year, duty_date.month, duty_date.day, 17, 30, 0)
-
+def _duty_bounds(duty_date: date) -> dict:
     next_day = duty_date + timedelta(days=1)
-    defaults['end_datetime'] = datetime(next_day.year, next_day.month, next_day.day, 8, 30, 0)
+    return {
+        'start_datetime': datetime(duty_date.year, duty_date.month, duty_date.day, 17, 30, 0),
+        'end_datetime': datetime(next_day.year, next_day.month, next_day.day, 8, 30, 0),
+    }
+
+
+def get_or_create_duty(duty_date: date, role: DutyRole, defaults):
+    defaults.update(_duty_bounds(duty_date))
     return Duty.objects.get_or_create(start_datetime__date=duty_date, role=role, defaults=defaults)
 
 
+def assign_duties(duty_dates, role: DutyRole, user: AUTH_USER_MODEL) -> tuple[int, int]:
+    """
+    Назначает пользователя на однодневные дежурства роли по списку дат.
+    Недостающие дежурства создаются одной пачкой (история и аудит тоже пачкой),
+    существующие переназначаются через save() с проверкой завершённых.
+    Возвращает число созданных и переназначенных дежурств.
+    """
+    duty_dates = list(duty_dates)
+    existing = {
+        timezone.localtime(duty.start_datetime).date(): duty
+        for duty in Duty.objects.filter(role=role, start_datetime__date__in=duty_dates)
+    }
+    for duty in existing.values():
+        duty.user = user
+        duty.save()
+
+    new_duties = [
+        Duty(role=role, user=user, **_duty_bounds(duty_date))
+        for duty_date in duty_dates
+        if duty_date not in existing
+    ]
+    log_bulk_created(Duty, bulk_create_with_history(new_duties, Duty))
+    return len(new_duties), len(existing)
+
+
 def duty_overlaps_range(role: DutyRole, range_start: date, range_end: date) -> bool:
     """
     Проверяет, есть ли у роли дежурство, покрывающее хотя бы один день периода
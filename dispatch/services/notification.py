@@ -3,11 +3,13 @@ from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 
 import structlog
-from django.db import close_old_connections
+from django.db import close_old_connections, transaction
 
 from dispatch.services.access import dispatch_admins
 from dispatch.services.duties import get_duty_point_participants
 from myapp.utils import send_fcm_notification
+from myproject.history import bulk_create_with_history
+from myproject.metrics import NOTIFICATION_QUEUE_DEPTH, NOTIFICATIONS
 from myproject.observability import bound_log_context, capture_log_context
 from users.models import Notification
 
@@ -20,6 +22,10 @@ _NOTIFICATION_EXECUTOR = ThreadPoolExecutor(max_workers=_NOTIFICATION_SEND_WORKE
 logger = structlog.get_logger(__name__)
 
 
+def _update_queue_depth():
+    NOTIFICATION_QUEUE_DEPTH.set(_NOTIFICATION_EXECUTOR._work_queue.qsize())
+
+
 def _send_notification_async(user, title, text, log_context=None):
     close_old_connections()
     try:
@@ -29,9 +35,15 @@ def _send_notification_async(user, title, text, log_context=None):
             notification_title=title,
         ):
             logger.info("notification_delivery_started")
-            send_fcm_notification(user, title, text)
-            logger.info("notification_delivery_finished")
+            try:
+                delivered = send_fcm_notification(user, title, text)
+            except Exception:
+                NOTIFICATIONS.inc(event="failed")
+                raise
+            NOTIFICATIONS.inc(event="delivered" if delivered else "failed")
+            logger.info("notification_delivery_finished", delivered=delivered)
     finally:
+        _update_queue_depth()
         close_old_connections()
 
 
@@ -39,6 +51,8 @@ def _enqueue_notification(user, title, text):
     log_context = capture_log_context()
     try:
         _NOTIFICATION_EXECUTOR.submit(_send_notification_async, user, title, text, log_context)
+        NOTIFICATIONS.inc(event="enqueued")
+        _update_queue_depth()
         logger.info(
             "notification_delivery_enqueued",
             notification_user_id=user.id,
@@ -51,21 +65,26 @@ def _enqueue_notification(user, title, text):
             notification_user_id=user.id,
             notification_title=title,
         )
+        NOTIFICATIONS.inc(event="enqueue_failed")
         send_fcm_notification(user, title, text)
 
 
-def create_notification(user, title, text, source, duty_action=None):
-    notification = Notification.objects.create(
-        user=user, title=title, text=text, source=source, duty_action=duty_action
-    )
+def _log_created(notification):
     logger.info(
         "notification_created",
         notification_id=notification.id,
-        notification_user_id=user.id,
-        source=source,
-        duty_action_id=duty_action.id if duty_action else None,
-        title=title,
+        notification_user_id=notification.user_id,
+        source=notification.source,
+        duty_action_id=notification.duty_action_id,
+        title=notification.title,
     )
+
+
+def create_notification(user, title, text, source, duty_action=None):
+    notification = Notification.objects.create(
+        user=user, title=title, text=text, source=source, duty_action=duty_action
+    )
+    _log_created(notification)
     return notification
 
 
@@ -86,13 +105,22 @@ def notify_users(users, title, text, source, duty_action=None):
         recipient_count=len(users),
         title=title,
     )
-    notifications = []
-    for point_admin in users:
-        notification = create_notification(
-            point_admin, title, text, source, duty_action=duty_action
-        )
-        _enqueue_notification(point_admin, notification.title, notification.text)
-        notifications.append(notification)
+    # Уведомления и их история пишутся одной пачкой, отправка — после коммита
+    notifications = bulk_create_with_history(
+        [
+            Notification(user=user, title=title, text=text, source=source, duty_action=duty_action)
+            for user in users
+        ],
+        Notification,
+    )
+    for notification in notifications:
+        _log_created(notification)
+
+    def enqueue_all():
+        for notification in notifications:
+            _enqueue_notification(notification.user, notification.title, notification.text)
+
+    transaction.on_commit(enqueue_all)
     return notifications
 
 
@@ -1,19 +1,31 @@
+import tempfile
 from datetime import date, datetime, timedelta, timezone as dt_timezone
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from dispatch.audit import audited_update
 from dispatch.crons import check_missing_duties
 from dispatch.admin import ClearDutyForm, DutyAdminForm, DutyForm
-from dispatch.models import Duty, DutyAction, DutyActionTypeEnum, DutyPoint, DutyRole, Incident
-from dispatch.services.duties import duty_overlaps_range
+from dispatch.models import AudioMessage, Duty, DutyAction, DutyActionTypeEnum, DutyPoint, DutyRole, Incident
+from dispatch.services.duties import assign_duties, duty_overlaps_range, get_or_create_duty
+from dispatch.services.notification import _send_notification_async, notify_users
 from dispatch.views import DutyViewSet
 from dispatch.utils import now, today
 from dispatch.models import IncidentStatusEnum
+from myproject.history import bulk_history, update_with_history
+from myproject.metrics import NOTIFICATIONS
+from myproject.uploads import create_upload_slot, get_upload_target
 from users.models import Notification, NotificationSourceEnum, User
 
 
@@ -467,3 +479,240 @@ class MissingDutiesCronTests(TestCase):
         self._create_daily_duty(role, date(2026, 3, 25), user=user)
 
         self.assertFalse(duty_overlaps_range(role, date(2026, 3, 26), date(2026, 3, 28)))
+
+
+class DispatchAuditTests(TestCase):
+    def _logged_events(self, logger_mock, method="info"):
+        return [(call.args[0], call.kwargs) for call in getattr(logger_mock, method).call_args_list]
+
+    def test_save_of_loaded_object_does_not_reselect_previous_state(self):
+        role = DutyRole.objects.create(name="Old name")
+        loaded_role = DutyRole.objects.get(pk=role.pk)
+        loaded_role.name = "New name"
+
+        with patch("dispatch.audit.logger") as logger_mock, CaptureQueriesContext(connection) as queries:
+            loaded_role.save()
+
+        selects = [query["sql"] for query in queries if query["sql"].startswith("SELECT")]
+        self.assertEqual(selects, [])
+        event, payload = self._logged_events(logger_mock)[0]
+        self.assertEqual(event, "dispatch_model_updated")
+        self.assertEqual(payload["changes"], {"name": {"old": "Old name", "new": "New name"}})
+        self.assertEqual(payload["before"]["name"], "Old name")
+        self.assertEqual(payload["after"]["name"], "New name")
+
+    def test_diff_matches_choice_display_and_tracks_repeated_saves(self):
+        incident = Incident.objects.create(name="Leak", description="Basement")
+        incident = Incident.objects.get(pk=incident.pk)
+
+        with patch("dispatch.audit.logger") as logger_mock:
+            incident.status = IncidentStatusEnum.CLOSED.value
+            incident.save()
+            incident.status = IncidentStatusEnum.OPENED.value
+            incident.save()
+
+        first_changes = self._logged_events(logger_mock)[0][1]["changes"]
+        second_changes = self._logged_events(logger_mock)[1][1]["changes"]
+        self.assertEqual(
+            first_changes,
+            {
+                "status": {"old": "opened", "new": "closed"},
+                "status_display": {"old": "В работе", "new": "Выполнено"},
+            },
+        )
+        self.assertEqual(second_changes["status"], {"old": "closed", "new": "opened"})
+
+    @override_settings(DISPATCH_AUDIT_MODE="changes")
+    def test_changes_mode_skips_before_after_payloads(self):
+        role = DutyRole.objects.get(pk=DutyRole.objects.create(name="Role").pk)
+        role.name = "Renamed role"
+
+        with patch("dispatch.audit.logger") as logger_mock:
+            role.save()
+
+        _, payload = self._logged_events(logger_mock)[0]
+        self.assertNotIn("before", payload)
+        self.assertNotIn("after", payload)
+        self.assertEqual(payload["changes"]["name"]["new"], "Renamed role")
+
+    def test_audited_update_logs_single_bulk_event(self):
+        roles = [DutyRole.objects.create(name=f"Role {index}") for index in range(3)]
+
+        with patch("dispatch.audit.logger") as logger_mock:
+            updated_count = audited_update(DutyRole.objects.all(), name="Same")
+
+        self.assertEqual(updated_count, 3)
+        events = self._logged_events(logger_mock)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], "dispatch_model_bulk_updated")
+        self.assertEqual(sorted(events[0][1]["object_ids"]), sorted(role.pk for role in roles))
+        self.assertEqual(DutyRole.history.filter(history_type="~", name="Same").count(), 3)
+
+    def test_audited_update_logs_computed_values_of_expressions(self):
+        role = DutyRole.objects.create(name="Role")
+
+        with patch("dispatch.audit.logger") as logger_mock:
+            audited_update(DutyRole.objects.filter(pk=role.pk), name=Concat(F("name"), Value(" 2")))
+
+        _, payload = self._logged_events(logger_mock)[0]
+        self.assertEqual(payload["changes"], {})
+        self.assertEqual(payload["computed_values"], {str(role.pk): {"name": "Role 2"}})
+
+    def test_schedule_assignment_creates_duties_in_bulk_with_one_audit_event(self):
+        user = User.objects.create_user(username="schedule-user", password="pass")
+        role = DutyRole.objects.create(name="Schedule role")
+        start = today() + timedelta(days=1)
+        get_or_create_duty(duty_date=start, role=role, defaults={"user": user})
+        days = [start + timedelta(days=offset) for offset in range(4)]
+
+        with patch("dispatch.audit.logger") as logger_mock:
+            created_count, updated_count = assign_duties(days, role, user)
+
+        self.assertEqual((created_count, updated_count), (3, 1))
+        events = [name for name, _ in self._logged_events(logger_mock)]
+        self.assertEqual(events.count("dispatch_model_bulk_created"), 1)
+        self.assertEqual(Duty.objects.filter(role=role).count(), 4)
+        self.assertEqual(Duty.history.filter(history_type="+").count(), 4)
+
+
+class NotificationDeliveryMetricsTests(TestCase):
+    def setUp(self):
+        NOTIFICATIONS.reset()
+        self.addCleanup(NOTIFICATIONS.reset)
+
+    @patch("myapp.utils.FCMNotification", side_effect=RuntimeError("fcm down"))
+    def test_fcm_failure_without_fallback_is_counted_as_failed(self, _fcm_mock):
+        user = User.objects.create_user(username="no-channel-user")
+
+        _send_notification_async(user, "Title", "Text")
+
+        self.assertEqual(NOTIFICATIONS._samples, {("failed",): 1})
+
+    @patch("myapp.utils.telegram_notification")
+    @patch("myapp.utils.FCMNotification", side_effect=RuntimeError("fcm down"))
+    def test_telegram_fallback_is_counted_as_delivered(self, _fcm_mock, telegram_mock):
+        user = User.objects.create_user(username="telegram-user", telegram_user_id=42)
+
+        _send_notification_async(user, "Title", "Text")
+
+        telegram_mock.assert_called_once()
+        self.assertEqual(NOTIFICATIONS._samples, {("delivered",): 1})
+
+
+class BulkHistoryTests(TestCase):
+    def setUp(self):
+        self.role = DutyRole.objects.create(name="Bulk history role")
+        self.user = User.objects.create_user(username="bulk-history-user", password="pass")
+
+    def _create_duties(self, count):
+        start = today() + timedelta(days=1)
+        for offset in range(count):
+            get_or_create_duty(duty_date=start + timedelta(days=offset), role=self.role, defaults={"user": self.user})
+
+    def test_bulk_history_writes_same_rows_with_single_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with bulk_history():
+                self._create_duties(3)
+
+        history_inserts = [q for q in ctx.captured_queries if 'INSERT INTO "dispatch_historicalduty"' in q["sql"]]
+        self.assertEqual(len(history_inserts), 1)
+        self.assertEqual(Duty.history.filter(history_type="+").count(), 3)
+        self.assertEqual(set(Duty.history.values_list("user_id", flat=True)), {self.user.id})
+
+    @override_settings(HISTORY_MODEL_POLICIES={"users.notification": "off"})
+    def test_policy_off_skips_history(self):
+        notification = Notification.objects.create(
+            user=self.user, title="t", text="x", source=NotificationSourceEnum.DISPATCH.value
+        )
+        notification.title = "changed"
+        notification.save()
+
+        self.assertFalse(Notification.history.exists())
+
+    def test_update_with_history_writes_change_rows(self):
+        self._create_duties(2)
+        other_user = User.objects.create_user(username="bulk-history-other", password="pass")
+
+        updated = update_with_history(Duty.objects.filter(role=self.role), user=other_user)
+
+        self.assertEqual(updated, 2)
+        changed = Duty.history.filter(history_type="~")
+        self.assertEqual(changed.count(), 2)
+        self.assertEqual(set(changed.values_list("user_id", flat=True)), {other_user.id})
+
+    def test_history_of_rolled_back_savepoint_is_not_inserted(self):
+        with bulk_history():
+            self._create_duties(1)
+            try:
+                with transaction.atomic():
+                    DutyRole.objects.create(name="Rolled back role")
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+            with transaction.atomic():
+                DutyRole.objects.create(name="Kept role")
+
+        self.assertEqual(Duty.history.count(), 1)
+        self.assertFalse(DutyRole.history.filter(name="Rolled back role").exists())
+        self.assertTrue(DutyRole.history.filter(name="Kept role").exists())
+
+    def test_notify_users_inserts_in_bulk_and_sends_after_commit(self):
+        users = [User.objects.create_user(username=f"notify-{index}", password="pass") for index in range(3)]
+
+        with patch("dispatch.services.notification._enqueue_notification") as enqueue_mock:
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks() as callbacks:
+                notifications = notify_users(users, "Title", "Text", NotificationSourceEnum.DISPATCH.value)
+                enqueue_mock.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "users_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Notification.history.filter(history_type="+").count(), 3)
+        self.assertEqual(enqueue_mock.call_count, len(notifications))
+
+
+class IncidentDirectUploadTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage = FileSystemStorage(location=tmp_dir.name)
+        storage_patcher = patch.object(AudioMessage._meta.get_field("audio"), "storage", self.storage)
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+        self.user = User.objects.create_user(username="incident-reporter")
+        self.incident = Incident.objects.create(name="Leak", description="Basement")
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+
+    def test_audio_message_is_created_from_uploaded_file(self):
+        slot = create_upload_slot(get_upload_target("incident_audio"), self.user, "voice.m4a", "audio/mp4", 5)
+        self.client.post(slot["upload_url"], {
+            **slot["fields"], "file": SimpleUploadedFile("voice.m4a", b"audio", content_type="audio/mp4"),
+        })
+
+        response = self.client_api.post(
+            f"/api/dispatch/incidents/{self.incident.id}/messages/",
+            {"message_type": "audio", "upload_token": slot["token"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        audio = AudioMessage.objects.get(message__incident=self.incident)
+        self.assertTrue(audio.audio.name.startswith("audios/"))
+        self.assertEqual(self.storage.open(audio.audio.name).read(), b"audio")
+
+    def test_token_for_other_target_is_rejected(self):
+        slot = create_upload_slot(get_upload_target("incident_audio"), self.user, "voice.m4a", "audio/mp4", 5)
+        self.client.post(slot["upload_url"], {
+            **slot["fields"], "file": SimpleUploadedFile("voice.m4a", b"audio", content_type="audio/mp4"),
+        })
+
+        response = self.client_api.post(
+            f"/api/dispatch/incidents/{self.incident.id}/messages/",
+            {"message_type": "photo", "upload_token": slot["token"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.incident.messages.exists())
@@ -9,12 +9,14 @@ from rest_framework import status
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticated
 from rest_framework.response import Response
 
+from myproject.uploads import UploadError, confirm_upload, get_upload_target
 from users.models import NotificationSourceEnum
 
+from .audit import audited_update
 from .calendar_ru import is_working_day
 from .models import (
     DutyAction,
@@ -673,11 +675,12 @@ class DutyViewSet(viewsets.ReadOnlyModelViewSet):  # ReadOnly since no update/cr
 
         # Помечаем связанные нерешенные действия как решенные
         unresolved_actions = DutyAction.objects.filter(duty=duty, is_resolved=False)
-        for duty_action_item in unresolved_actions:
-            duty_action_item.is_resolved = True
-            duty_action_item.resolved_by = request.user
-            duty_action_item.resolved_at = timezone.now()
-            duty_action_item.save()
+        resolved_action_count = audited_update(
+            unresolved_actions,
+            is_resolved=True,
+            resolved_by=request.user,
+            resolved_at=timezone.now(),
+        )
 
         # Уведомляем нового дежурного
         create_and_notify(
@@ -703,7 +706,7 @@ class DutyViewSet(viewsets.ReadOnlyModelViewSet):  # ReadOnly since no update/cr
             old_user_id=old_user.id,
             new_user_id=new_user.id,
             notification_id=notification.id,
-            resolved_action_count=unresolved_actions.count(),
+            resolved_action_count=resolved_action_count,
         )
         serializer = DutySerializer(duty)
         return Response(serializer.data)
@@ -717,7 +720,7 @@ class StandardResultsSetPagination(PageNumberPagination):
 
 class IncidentMessageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
     serializer_class = IncidentMessageSerializer
 
     def get_queryset(self):
@@ -757,71 +760,89 @@ class IncidentMessageViewSet(viewsets.ModelViewSet):
             )
             return Response({"error": "Invalid message type"}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = serializer_class(data=request.data)
-        if serializer.is_valid():
-            content_obj = serializer.save(message=msg)
-            msg.content_type = ContentType.objects.get_for_model(content_obj)
-            msg.object_id = content_obj.id
-            msg.save()
-            logger.info(
-                "incident_message_created",
-                incident_id=self.kwargs["incident_pk"],
-                incident_message_id=msg.id,
-                requested_by_user_id=user.id if user else None,
-                message_type=message_type,
-                content_object_id=content_obj.id,
-                text=getattr(content_obj, "text", None),
-                file_name=(
-                    getattr(getattr(content_obj, "photo", None), "name", None)
-                    or getattr(getattr(content_obj, "video", None), "name", None)
-                    or getattr(getattr(content_obj, "audio", None), "name", None)
-                ),
-            )
-            incident = Incident.objects.get(pk=self.kwargs['incident_pk'])
-            if incident.point:
-                author_name = (request.user.display_name if request.user.is_authenticated else "Система")
-                notification_text = None
-                if message_type == IncidentMessage.TEXT and content_obj:
-                    raw_text = getattr(content_obj, "text", "")
-                    raw_text = raw_text.strip().replace("\n", " ")
-                    if raw_text:
-                        prefix = f"Комментарий от {author_name}: "
-                        max_preview_len = 255 - len(prefix)
-                        if max_preview_len < 0:
-                            max_preview_len = 0
-                        preview = raw_text
-                        if len(preview) > max_preview_len:
-                            if max_preview_len > 1:
-                                preview = preview[: max_preview_len - 1] + "…"
-                            else:
-                                preview = preview[:max_preview_len]
-                        notification_text = prefix + preview
-
-                if not notification_text:
-                    type_label = {
-                        IncidentMessage.TEXT: "текст",
-                        IncidentMessage.PHOTO: "фото",
-                        IncidentMessage.VIDEO: "видео",
-                        IncidentMessage.AUDIO: "аудио",
-                    }.get(message_type, "сообщение")
-                    notification_text = f"Новый комментарий ({type_label}) от {author_name}."
-
-                if len(notification_text) > 255:
-                    notification_text = notification_text[:254] + "…"
-                notify_duty_point_participants(
-                    incident.point,
-                    incident.name,
-                    notification_text,
-                    NotificationSourceEnum.DISPATCH.value,
+        upload_token = request.data.get("upload_token")
+        if upload_token and message_type != IncidentMessage.TEXT:
+            # Файл уже загружен напрямую в хранилище (api/uploads/), сохраняем только ссылку на него
+            try:
+                target = get_upload_target(f"incident_{message_type}")
+                file_name = confirm_upload(target, user, upload_token)
+            except UploadError as e:
+                msg.delete()
+                logger.warning(
+                    "incident_message_upload_confirm_failed",
+                    incident_id=self.kwargs["incident_pk"],
+                    requested_by_user_id=user.id if user else None,
+                    message_type=message_type,
+                    error=str(e),
                 )
-            return Response(IncidentMessageSerializer(msg).data, status=status.HTTP_201_CREATED)
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            content_obj = target.model.objects.create(message=msg, **{target.field_name: file_name})
+        else:
+            serializer = serializer_class(data=request.data)
+            if not serializer.is_valid():
+                msg.delete()
+                logger.warning(
+                    "incident_message_create_validation_failed",
+                    incident_id=self.kwargs["incident_pk"],
+                    requested_by_user_id=user.id if user else None,
+                    message_type=message_type,
+                    errors=serializer.errors,
+                )
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            content_obj = serializer.save(message=msg)
 
-        msg.delete()
-        logger.warning(
-            "incident_message_create_validation_failed",
+        msg.content_type = ContentType.objects.get_for_model(content_obj)
+        msg.object_id = content_obj.id
+        msg.save()
+        logger.info(
+            "incident_message_created",
             incident_id=self.kwargs["incident_pk"],
+            incident_message_id=msg.id,
             requested_by_user_id=user.id if user else None,
             message_type=message_type,
-            errors=serializer.errors,
+            content_object_id=content_obj.id,
+            text=getattr(content_obj, "text", None),
+            file_name=(
+                getattr(getattr(content_obj, "photo", None), "name", None)
+                or getattr(getattr(content_obj, "video", None), "name", None)
+                or getattr(getattr(content_obj, "audio", None), "name", None)
+            ),
         )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        incident = Incident.objects.get(pk=self.kwargs['incident_pk'])
+        if incident.point:
+            author_name = (request.user.display_name if request.user.is_authenticated else "Система")
+            notification_text = None
+            if message_type == IncidentMessage.TEXT and content_obj:
+                raw_text = getattr(content_obj, "text", "")
+                raw_text = raw_text.strip().replace("\n", " ")
+                if raw_text:
+                    prefix = f"Комментарий от {author_name}: "
+                    max_preview_len = 255 - len(prefix)
+                    if max_preview_len < 0:
+                        max_preview_len = 0
+                    preview = raw_text
+                    if len(preview) > max_preview_len:
+                        if max_preview_len > 1:
+                            preview = preview[: max_preview_len - 1] + "…"
+                        else:
+                            preview = preview[:max_preview_len]
+                    notification_text = prefix + preview
+
+            if not notification_text:
+                type_label = {
+                    IncidentMessage.TEXT: "текст",
+                    IncidentMessage.PHOTO: "фото",
+                    IncidentMessage.VIDEO: "видео",
+                    IncidentMessage.AUDIO: "аудио",
+                }.get(message_type, "сообщение")
+                notification_text = f"Новый комментарий ({type_label}) от {author_name}."
+
+            if len(notification_text) > 255:
+                notification_text = notification_text[:254] + "…"
+            notify_duty_point_participants(
+                incident.point,
+                incident.name,
+                notification_text,
+                NotificationSourceEnum.DISPATCH.value,
+            )
+        return Response(IncidentMessageSerializer(msg).data, status=status.HTTP_201_CREATED)
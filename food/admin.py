@@ -1,20 +1,34 @@
-from food.models import Dish, Order, Feedback, AllowedDish
+from food.models import Dish, Order, Feedback, AllowedDish, OrderDayClosure, OrderDaySummary
+from django.contrib import admin
 from django.urls import path, reverse
 from django.shortcuts import render, redirect
 from food.models import Order
 from django.utils import timezone
+from food.services.feedback_analytics import STATS_PERIODS, feedback_stats, get_unread_feedback_count, \
+    mark_feedback_read
+from food.services.menu_planning import apply_menu_plan, date_range, get_menu_plan, repeat_menu
 from food.services.order_statistics import OrderService
+from food.services.production_forecast import is_day_closed, production_forecast
 from myapp.admin_mixins import CustomAdmin
 from datetime import timedelta
 from django import forms
-from django.db import IntegrityError
+from django.db.models import Sum
 
 
 class FeedbackModelAdmin(CustomAdmin):
     readonly_fields = ('is_read',)
-    
+    list_display = ('dish', 'created_at', 'is_read')
+    list_filter = ('is_read', 'dish')
+    actions = ['mark_as_read']
+    change_list_template = 'admin/feedback/change_list.html'
+
     def get_unread_count(self):
-        return Feedback.objects.filter(is_read=False).count()
+        return get_unread_feedback_count()
+
+    @admin.action(description='Отметить прочитанными')
+    def mark_as_read(self, request, queryset):
+        updated_count = mark_feedback_read(queryset)
+        self.message_user(request, f'Отмечено прочитанными: {updated_count}')
 
     def change_view(self, request, object_id, form_url='', extra_context=None):
         obj = self.get_object(request, object_id)
@@ -25,7 +39,40 @@ class FeedbackModelAdmin(CustomAdmin):
         
         return super().change_view(request, object_id, form_url, extra_context)
 
+    def feedback_statistics(self, request):
+        """
+        Отзывы по блюдам за период с разбивкой по дням, неделям или месяцам.
+        """
+        today = timezone.now().date()
+        period = request.GET.get('period', 'week')
+        if period not in STATS_PERIODS:
+            period = 'week'
+        try:
+            date_from = timezone.datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() \
+                if request.GET.get('date_from') else today - timedelta(days=90)
+            date_to = timezone.datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() \
+                if request.GET.get('date_to') else today
+        except ValueError:
+            self.message_user(request, 'Неверный формат даты. Используйте YYYY-MM-DD.', level='error')
+            date_from, date_to = today - timedelta(days=90), today
+
+        return render(request, 'admin/feedback/statistics.html', {
+            'date_from': date_from,
+            'date_to': date_to,
+            'period': period,
+            'statistics': feedback_stats(date_from, date_to, period),
+        })
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('statistics/', self.admin_site.admin_view(self.feedback_statistics), name='feedback_statistics'),
+        ]
+        return custom_urls + urls
+
     exclude = ['user',]
+
+
 class OrderAdmin(CustomAdmin):
     change_list_template = 'admin/order/change_list.html'
     
@@ -35,6 +82,14 @@ class OrderAdmin(CustomAdmin):
         """
         return False
 
+    def has_change_permission(self, request, obj=None):
+        """
+        Заказы закрытого дня уже попали в снимок итогов и не редактируются
+        """
+        if obj is not None and is_day_closed(obj.cooking_time):
+            return False
+        return super().has_change_permission(request, obj)
+
     def changelist_view(self, request, extra_context=None):
         """
         Переопределяем метод changelist_view, чтобы добавить кнопку на страницу списка заказов.
@@ -71,12 +126,29 @@ class OrderAdmin(CustomAdmin):
             'date': date,
         })
 
+    def kitchen_sheet(self, request):
+        """
+        Лист для кухни на неделю: блюда по категориям, итоги и комментарии, с версткой для печати.
+        """
+        date_str = request.GET.get('date', None)
+        try:
+            date = timezone.datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else timezone.now().date()
+        except ValueError:
+            self.message_user(request, 'Неверный формат даты. Используйте YYYY-MM-DD.', level='error')
+            date = timezone.now().date()
+
+        return render(request, 'admin/order/kitchen_sheet.html', {
+            'date': date,
+            'forecast': production_forecast(date, days=7),
+        })
+
     def get_urls(self):
         """
         Добавляем кастомный URL для отображения формы выбора даты.
         """
         urls = super().get_urls()
         custom_urls = [
+            path('kitchen-sheet/', self.admin_site.admin_view(self.kitchen_sheet), name='kitchen_sheet'),
             path('orders-statistics/', self.admin_site.admin_view(self.calc_order_statistics_form), name='calc_order_statistics_form'),
             path('order-statistics-result/', self.admin_site.admin_view(self.calc_statistics), name='calc_order_statistics'),
         ]
@@ -99,28 +171,16 @@ class AllowedDishForm(forms.Form):
             self.fields['dishes'].initial = existing_dishes
 
     def save(self, commit=True):
-        date = self.date
-        selected_dishes = self.cleaned_data['dishes']
-        existing_dishes = AllowedDish.objects.filter(date=date)
+        if commit:
+            selected_dish_ids = self.cleaned_data['dishes'].values_list('id', flat=True)
+            apply_menu_plan([self.date], {(dish_id, self.date) for dish_id in selected_dish_ids})
 
-        
-        existing_dish_ids = set(existing_dishes.values_list('dish_id', flat=True))
-        selected_dish_ids = set(selected_dishes.values_list('id', flat=True))
 
-        # Определяем блюда для добавления и удаления
-        to_add = selected_dish_ids - existing_dish_ids
-        to_remove = existing_dish_ids - selected_dish_ids
+class MenuRepeatForm(forms.Form):
+    source_start = forms.DateField(label="Первый день образца", widget=forms.DateInput(attrs={'type': 'date'}))
+    source_days = forms.IntegerField(label="Дней в образце", min_value=1, max_value=14, initial=7)
+    target_days = forms.IntegerField(label="Заполнить дней", min_value=1, max_value=56, initial=7)
 
-        
-        for dish_id in to_add:
-            try:
-                if commit:
-                    AllowedDish.objects.create(dish_id=dish_id, date=date)
-            except IntegrityError:
-                pass
-        if commit:
-            AllowedDish.objects.filter(dish_id__in=to_remove, date=date).delete()
-    
 
 class AllowedDishAdmin(CustomAdmin):
     list_display = ('dish', 'date')
@@ -131,6 +191,7 @@ class AllowedDishAdmin(CustomAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('add_menu/', self.admin_site.admin_view(self.batch_add_menu), name='add_menu'),
+            path('menu_planner/', self.admin_site.admin_view(self.menu_planner), name='menu_planner'),
         ]
         return custom_urls + urls
     
@@ -186,9 +247,96 @@ class AllowedDishAdmin(CustomAdmin):
         }
         return render(request, 'admin/add_menu.html', context)
 
+    def menu_planner(self, request):
+        """
+        Сетка блюда × 7 дней с копированием недели и повтором образца на несколько недель.
+        """
+        selected_date = request.GET.get('date')
+        if selected_date:
+            base_date = timezone.datetime.strptime(selected_date, '%Y-%m-%d').date()
+        else:
+            base_date = timezone.now().date()
+        dates = date_range(base_date, 7)
+        repeat_form = MenuRepeatForm(initial={'source_start': base_date - timedelta(days=7)})
+
+        if request.method == 'POST':
+            action = request.POST.get('action')
+            if action == 'save':
+                selection = set()
+                for dish_id, day in (key.split('_')[1:] for key in request.POST if key.startswith('cell_')):
+                    selection.add((int(dish_id), timezone.datetime.strptime(day, '%Y-%m-%d').date()))
+                added, removed = apply_menu_plan(dates, selection)
+                self.message_user(request, f'Меню сохранено: добавлено {added}, убрано {removed}.')
+                return redirect(f"{reverse('admin:menu_planner')}?date={base_date:%Y-%m-%d}")
+            if action in ('copy_week', 'repeat'):
+                repeat_form = MenuRepeatForm(request.POST)
+                if repeat_form.is_valid():
+                    data = repeat_form.cleaned_data
+                    if action == 'copy_week':
+                        added, removed = repeat_menu(data['source_start'], 7, base_date, 7)
+                    else:
+                        added, removed = repeat_menu(data['source_start'], data['source_days'], base_date,
+                                                     data['target_days'])
+                    self.message_user(request, f'Меню заполнено по образцу: добавлено {added}, убрано {removed}.')
+                    return redirect(f"{reverse('admin:menu_planner')}?date={base_date:%Y-%m-%d}")
+
+        plan = get_menu_plan(dates)
+        category_order = {category: index for index, (category, _) in enumerate(Dish.CATEGORY_CHOICES)}
+        dishes = sorted(Dish.objects.all(), key=lambda dish: (category_order.get(dish.category, 0), dish.name))
+        rows = [
+            {
+                'dish': dish,
+                'cells': [{'day': day, 'selected': (dish.id, day) in plan} for day in dates],
+            }
+            for dish in dishes
+        ]
+        return render(request, 'admin/menu_planner.html', {
+            'date': base_date,
+            'previous_week': base_date - timedelta(days=7),
+            'next_week': base_date + timedelta(days=7),
+            'dates': dates,
+            'rows': rows,
+            'repeat_form': repeat_form,
+        })
+
+
+class OrderDaySummaryInline(admin.TabularInline):
+    model = OrderDaySummary
+    fields = ['dish_name', 'category', 'ordered', 'cancelled']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class OrderDayClosureAdmin(admin.ModelAdmin):
+    list_display = ['date', 'closed_at', 'total_ordered']
+    readonly_fields = ['date', 'closed_at', 'comments']
+    inlines = [OrderDaySummaryInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(total_ordered=Sum('dishes__ordered'))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def total_ordered(self, obj):
+        return obj.total_ordered or 0
+
+    total_ordered.short_description = 'Заказано порций'
+
 
 def register_food_admin(site):
     site.register(Dish)
     site.register(Order, OrderAdmin)
     site.register(Feedback, FeedbackModelAdmin)
     site.register(AllowedDish, AllowedDishAdmin)
+    site.register(OrderDayClosure, OrderDayClosureAdmin)
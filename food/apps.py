@@ -5,3 +5,7 @@ class FoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food'
     verbose_name = 'Приложение заказа еды'
+
+    def ready(self):
+        # Подключает сигналы кэша меню, счётчика отзывов и генерации превью фотографий
+        from food.services import feedback_analytics, images, menu  # noqa: F401
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from food.models import Dish, Feedback
+from food.services.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/JPEG variants for dish and feedback photos that have none yet "
+        "(photos uploaded before variants existed or whose generation failed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants for every photo, including already processed ones.",
+        )
+
+    def handle(self, *args, **options):
+        generated_count = failed_count = 0
+        for model in (Dish, Feedback):
+            photos = model.objects.exclude(photo="").exclude(photo__isnull=True)
+            if not options["force"]:
+                photos = photos.exclude(photo_variants_for=F("photo"))
+            for instance in photos.order_by("pk").iterator():
+                try:
+                    generate_variants(instance.photo)
+                except Exception as exc:
+                    failed_count += 1
+                    self.stderr.write(f"{model._meta.label} #{instance.pk} ({instance.photo.name}): {exc}")
+                else:
+                    generated_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {generated_count} photo(s), failed: {failed_count}"
+        ))
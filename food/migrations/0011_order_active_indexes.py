@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0010_historicalalloweddish_historicaldish_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'cooking_time'], name='food_order_user_day_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['cooking_time', 'dish'], name='food_order_day_dish_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['cooking_time'], name='food_order_day_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0011_order_active_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDayClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата готовки')),
+                ('closed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время закрытия')),
+                ('comments', models.JSONField(blank=True, default=list, verbose_name='Комментарии к заказам')),
+            ],
+            options={
+                'verbose_name': 'Закрытый день',
+                'verbose_name_plural': 'Закрытые дни',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderDaySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dish_name', models.CharField(max_length=255, verbose_name='Название блюда')),
+                ('category', models.CharField(choices=[('first_course', 'Первое блюдо'), ('side_dish', 'Гарнир'), ('main_course', 'Второе блюдо'), ('salad', 'Салат'), ('drink', 'Напиток')], max_length=50, verbose_name='Тип блюда')),
+                ('ordered', models.PositiveIntegerField(verbose_name='Заказано')),
+                ('cancelled', models.PositiveIntegerField(verbose_name='Отменено')),
+                ('closure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dishes', to='food.orderdayclosure', verbose_name='Закрытый день')),
+                ('dish', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='food.dish', verbose_name='Блюдо')),
+            ],
+            options={
+                'verbose_name': 'Итог по блюду',
+                'verbose_name_plural': 'Итоги по блюдам',
+                'ordering': ['id'],
+            },
+        ),
+    ]
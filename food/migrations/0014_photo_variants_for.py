@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0013_order_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='photo_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Варианты фото готовы для'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='photo_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Варианты фото готовы для'),
+        ),
+        migrations.AddField(
+            model_name='historicaldish',
+            name='photo_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Варианты фото готовы для'),
+        ),
+        migrations.AddField(
+            model_name='historicalfeedback',
+            name='photo_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Варианты фото готовы для'),
+        ),
+    ]
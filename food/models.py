@@ -23,6 +23,9 @@ class Dish(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, verbose_name='Тип блюда')
     photo = models.ImageField(storage=FoodS3MediaStorage(), upload_to='dish_photos/', verbose_name='Фотография блюда',
                               blank=True)
+    # Имя фото, для которого сгенерированы уменьшенные варианты (food.services.images)
+    photo_variants_for = models.CharField(max_length=100, blank=True, editable=False,
+                                          verbose_name='Варианты фото готовы для')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
     class Meta:
@@ -46,6 +49,16 @@ class AllowedDish(models.Model):
         return f"{self.dish.name} ({self.date})"
 
 
+class OrderQuerySet(models.QuerySet):
+    """Заказы удаляются мягко: действующие и удалённые выбираются по частичным индексам."""
+
+    def active(self):
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        return self.filter(is_deleted=True)
+
+
 class Order(models.Model):
     is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
     deletion_reason = models.TextField(null=True, blank=True, verbose_name='Причина удаления')
@@ -56,6 +69,8 @@ class Order(models.Model):
     comment = models.TextField(blank=True, null=True, verbose_name='Комментарий к заказу')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
+    objects = OrderQuerySet.as_manager()
+
     def delete(self, reason=None, *args, **kwargs):
         self.is_deleted = True
         self.deletion_reason = reason
@@ -65,17 +80,67 @@ class Order(models.Model):
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        indexes = [
+            # id в конце индекса — для пагинации истории по ключу (cooking_time, id)
+            models.Index(fields=['user', 'cooking_time', 'id'], condition=models.Q(is_deleted=False),
+                         name='food_order_user_day_active_idx'),
+            models.Index(fields=['cooking_time', 'dish'], condition=models.Q(is_deleted=False),
+                         name='food_order_day_dish_active_idx'),
+            models.Index(fields=['cooking_time'], condition=models.Q(is_deleted=True),
+                         name='food_order_day_deleted_idx'),
+        ]
 
     def __str__(self):
         return f"Заказ блюда: {self.dish}, для: {self.user}"
 
 
+class OrderDayClosure(models.Model):
+    """Закрытый день готовки: после отсечки заказы не меняются, итоги хранятся в снимке."""
+    date = models.DateField(unique=True, verbose_name='Дата готовки')
+    closed_at = models.DateTimeField(auto_now_add=True, verbose_name='Время закрытия')
+    comments = models.JSONField(default=list, blank=True, verbose_name='Комментарии к заказам')
+
+    class Meta:
+        verbose_name = "Закрытый день"
+        verbose_name_plural = "Закрытые дни"
+        ordering = ['-date']
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Итоги закрытого дня не изменяются')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Закрыт день {self.date}"
+
+
+class OrderDaySummary(models.Model):
+    """Итог по блюду на закрытый день; название и категория копируются на момент закрытия."""
+    closure = models.ForeignKey(OrderDayClosure, on_delete=models.CASCADE, related_name='dishes',
+                                verbose_name='Закрытый день')
+    dish = models.ForeignKey(Dish, on_delete=models.SET_NULL, null=True, verbose_name='Блюдо')
+    dish_name = models.CharField(max_length=255, verbose_name='Название блюда')
+    category = models.CharField(max_length=50, choices=Dish.CATEGORY_CHOICES, verbose_name='Тип блюда')
+    ordered = models.PositiveIntegerField(verbose_name='Заказано')
+    cancelled = models.PositiveIntegerField(verbose_name='Отменено')
+
+    class Meta:
+        verbose_name = "Итог по блюду"
+        verbose_name_plural = "Итоги по блюдам"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.dish_name}: {self.ordered}"
+
+
 class Feedback(models.Model):
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE, verbose_name='Блюдо')
     comment = models.TextField(verbose_name='Отзыв')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     photo = models.ImageField(storage=FoodS3MediaStorage(), upload_to='feedback_photos/',
                               verbose_name='Фотография блюда', blank=True, null=True)
+    photo_variants_for = models.CharField(max_length=100, blank=True, editable=False,
+                                          verbose_name='Варианты фото готовы для')
     is_read = models.BooleanField(default=False)
 
     class Meta:
@@ -1,12 +1,19 @@
 from rest_framework import serializers, fields
 from food.models import Dish, Order, Feedback, AllowedDish
+from food.services.images import schedule_variants_on_commit, variant_urls
+from myproject.uploads import UploadError, confirm_upload, get_upload_target
 from django.utils import timezone
 
 
 class DishSerializer(serializers.ModelSerializer):
+    photo_variants = serializers.SerializerMethodField()
+
+    def get_photo_variants(self, obj):
+        return variant_urls(obj.photo, obj.photo_variants_for)
+
     class Meta:
         model = Dish
-        fields = '__all__'
+        exclude = ['photo_variants_for']
         
 class AllowedDishSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,6 +21,16 @@ class AllowedDishSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+def validate_order_window(value):
+    tomorrow = timezone.now().date() + timezone.timedelta(days=1)
+    week_end = timezone.now().date() + timezone.timedelta(days=7)
+
+    if value < tomorrow:
+        raise serializers.ValidationError("Дату готовки нельзя назначить ранее чем на завтрашний день.")
+    if value > week_end:
+        raise serializers.ValidationError("Заказ нельзя сделать раньше чем за неделю.")
+
+
 class OrderSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=fields.CurrentUserDefault())
     
@@ -21,14 +38,10 @@ class OrderSerializer(serializers.ModelSerializer):
         old_cooking_time = self.instance.cooking_time if self.instance else None
         
         tomorrow = timezone.now().date() + timezone.timedelta(days=1)
-        week_end = timezone.now().date() + timezone.timedelta(days=7)
 
         if old_cooking_time and old_cooking_time < tomorrow:
             raise serializers.ValidationError("Заказ нельзя редактировать менее чем за сутки до даты готовки.")
-        if value < tomorrow:
-            raise serializers.ValidationError("Дату готовки нельзя назначить ранее чем на завтрашний день.")
-        if value > week_end:
-            raise serializers.ValidationError("Заказ нельзя сделать раньше чем за неделю.")
+        validate_order_window(value)
         
         return value
     
@@ -47,10 +60,9 @@ class OrderSerializer(serializers.ModelSerializer):
                         f"Блюдо '{dish.name}' недоступно для заказа на {cooking_time}."
                     )
                     
-        if Order.objects.filter(
+        if Order.objects.active().filter(
             user=user,
             cooking_time=cooking_time,
-            is_deleted=False,
             dish__category=dish.category
         ).exists():
             raise serializers.ValidationError(
@@ -64,7 +76,56 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class OrderHistoryDishSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='get_category_display')
+
+    class Meta:
+        model = Dish
+        fields = ['id', 'name', 'category', 'category_name']
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    dish = OrderHistoryDishSerializer()
+
+    class Meta:
+        model = Order
+        fields = ['id', 'cooking_time', 'dish', 'comment', 'created_at']
+
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    dish = serializers.IntegerField(min_value=1)
+    cooking_time = serializers.DateField(validators=[validate_order_window])
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class BulkOrderSerializer(serializers.Serializer):
+    # Неделя вперёд по всем категориям блюд
+    orders = BulkOrderItemSerializer(many=True, allow_empty=False, max_length=7 * len(Dish.CATEGORY_CHOICES))
+
+
 class FeedbackSerializer(serializers.ModelSerializer):
+    photo_variants = serializers.SerializerMethodField()
+    # Токен фото, загруженного напрямую в хранилище (api/uploads/, target=feedback_photo)
+    photo_token = serializers.CharField(write_only=True, required=False)
+
+    def get_photo_variants(self, obj):
+        return variant_urls(obj.photo, obj.photo_variants_for)
+
+    def validate_photo_token(self, value):
+        try:
+            return confirm_upload(get_upload_target('feedback_photo'), self.context['request'].user, value)
+        except UploadError as e:
+            raise serializers.ValidationError(str(e))
+
+    def create(self, validated_data):
+        uploaded_photo = validated_data.pop('photo_token', None)
+        if uploaded_photo:
+            validated_data['photo'] = uploaded_photo
+        feedback = super().create(validated_data)
+        if uploaded_photo:
+            schedule_variants_on_commit(feedback.photo)
+        return feedback
+
     class Meta:
         model = Feedback
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['photo_variants_for']
\ No newline at end of file
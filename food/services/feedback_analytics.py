@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from food.models import Feedback
+
+
+UNREAD_FEEDBACK_KEY = "food:feedback:unread"
+# Счётчик ведётся инкрементально; периодический пересчёт страхует от расхождений
+UNREAD_FEEDBACK_TIMEOUT = 60 * 60
+STATS_PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def get_unread_feedback_count() -> int:
+    count = cache.get(UNREAD_FEEDBACK_KEY)
+    if count is None:
+        count = Feedback.objects.filter(is_read=False).count()
+        cache.add(UNREAD_FEEDBACK_KEY, count, UNREAD_FEEDBACK_TIMEOUT)
+    return count
+
+
+def _adjust_unread(delta):
+    def apply():
+        try:
+            cache.incr(UNREAD_FEEDBACK_KEY, delta)
+        except ValueError:
+            # Счётчика нет в кэше — посчитается при следующем чтении
+            pass
+
+    if delta:
+        transaction.on_commit(apply)
+
+
+def mark_feedback_read(queryset) -> int:
+    """Отмечает отзывы прочитанными одним UPDATE и уменьшает счётчик на их число."""
+    updated_count = queryset.filter(is_read=False).update(is_read=True)
+    _adjust_unread(-updated_count)
+    return updated_count
+
+
+def feedback_stats(date_from, date_to, period='week') -> list[dict]:
+    """
+    Число отзывов по блюдам за период с разбивкой по дням, неделям или месяцам
+    (один GROUP BY) и количество непрочитанных.
+    """
+    rows = (
+        Feedback.objects.filter(created_at__date__gte=date_from, created_at__date__lte=date_to)
+        .annotate(period=STATS_PERIODS[period]('created_at'))
+        .values('dish_id', 'dish__name', 'period', 'is_read')
+        .annotate(count=Count('id'))
+        .order_by('dish__name', 'period')
+    )
+    dishes = {}
+    periods = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        dish = dishes.setdefault(row['dish_id'], {
+            'dish_id': row['dish_id'],
+            'dish': row['dish__name'],
+            'total': 0,
+            'unread': 0,
+        })
+        dish['total'] += row['count']
+        if not row['is_read']:
+            dish['unread'] += row['count']
+        periods[row['dish_id']][row['period'].date()] += row['count']
+
+    return [
+        {
+            **dish,
+            'periods': [{'period': day, 'count': count} for day, count in sorted(periods[dish_id].items())],
+        }
+        for dish_id, dish in dishes.items()
+    ]
+
+
+@receiver(post_init, sender=Feedback, dispatch_uid="food_feedback_track_read")
+def _remember_read_state(sender, instance, **kwargs):
+    if 'is_read' not in instance.get_deferred_fields():
+        instance._was_read = instance.is_read
+
+
+@receiver(post_save, sender=Feedback, dispatch_uid="food_feedback_unread_saved")
+def _count_saved_feedback(sender, instance, created, **kwargs):
+    was_unread = not created and not getattr(instance, '_was_read', True)
+    is_unread = not instance.is_read
+    _adjust_unread(int(is_unread) - int(was_unread))
+    instance._was_read = instance.is_read
+
+
+@receiver(post_delete, sender=Feedback, dispatch_uid="food_feedback_unread_deleted")
+def _count_deleted_feedback(sender, instance, **kwargs):
+    if not instance.is_read:
+        _adjust_unread(-1)
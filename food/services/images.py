@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import structlog
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from food.models import Dish, Feedback
+
+
+# Вписываются в квадрат с сохранением пропорций
+VARIANT_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (640, 640),
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+logger = structlog.get_logger(__name__)
+
+
+def _image_workers() -> int:
+    try:
+        return max(1, int(os.getenv('IMAGE_VARIANT_WORKERS', '2')))
+    except ValueError:
+        return 1
+
+
+_executor = ThreadPoolExecutor(max_workers=_image_workers(), thread_name_prefix='image-variants')
+
+
+def variant_name(name, variant, image_format) -> str:
+    """Вариант лежит рядом с оригиналом: dish_photos/borsch.jpg -> dish_photos/borsch_card.webp."""
+    root, _ = os.path.splitext(name)
+    return f"{root}_{variant}.{image_format}"
+
+
+def variant_urls(field_file, generated_for) -> dict | None:
+    """
+    Ссылки на варианты, только если они сгенерированы для текущего файла:
+    у старых фото, нераспознанных форматов (HEIC без плагина Pillow) и ещё
+    не обработанных загрузок вариантов нет — None.
+    """
+    if not field_file or generated_for != field_file.name:
+        return None
+    return {
+        variant: {
+            image_format: field_file.storage.url(variant_name(field_file.name, variant, image_format))
+            for image_format in VARIANT_FORMATS
+        }
+        for variant in VARIANT_SIZES
+    }
+
+
+def render_variants(data: bytes) -> dict[tuple[str, str], bytes]:
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    rendered = {}
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        for image_format, (pil_format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, format=pil_format, **options)
+            rendered[(variant, image_format)] = buffer.getvalue()
+    return rendered
+
+
+def _mark_variants_generated(field_file):
+    instance = field_file.instance
+    with transaction.atomic():
+        current = type(instance).objects.select_for_update().filter(pk=instance.pk).first()
+        # Пока варианты рендерились, фото могли заменить: отметка относится к старому файлу
+        if current is None or getattr(current, field_file.field.name).name != field_file.name:
+            return
+        current.photo_variants_for = field_file.name
+        current.save(update_fields=['photo_variants_for'])
+    instance.photo_variants_for = field_file.name
+
+
+def generate_variants(field_file) -> list[str]:
+    """
+    Читает оригинал из хранилища поля, сохраняет рядом уменьшенные WebP/JPEG
+    и отмечает в объекте, для какого файла варианты готовы.
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as original:
+        rendered = render_variants(original.read())
+
+    names = []
+    for (variant, image_format), data in rendered.items():
+        name = variant_name(field_file.name, variant, image_format)
+        if storage.exists(name):
+            storage.delete(name)
+        names.append(storage.save(name, ContentFile(data)))
+    _mark_variants_generated(field_file)
+    logger.info("image_variants_generated", original=field_file.name, variant_count=len(names))
+    return names
+
+
+def _generate_variants_safely(field_file):
+    try:
+        generate_variants(field_file)
+    except Exception:
+        logger.exception("image_variants_failed", original=field_file.name)
+
+
+def schedule_variants(field_file):
+    return _executor.submit(_generate_variants_safely, field_file)
+
+
+def schedule_variants_on_commit(field_file):
+    transaction.on_commit(lambda: schedule_variants(field_file))
+
+
+@receiver(pre_save, sender=Dish, dispatch_uid="food_dish_photo_uploaded")
+@receiver(pre_save, sender=Feedback, dispatch_uid="food_feedback_photo_uploaded")
+def _mark_photo_upload(sender, instance, **kwargs):
+    # До сохранения поля новый файл ещё не записан в хранилище
+    instance._photo_uploaded = bool(instance.photo) and not instance.photo._committed
+
+
+@receiver(post_save, sender=Dish, dispatch_uid="food_dish_photo_variants")
+@receiver(post_save, sender=Feedback, dispatch_uid="food_feedback_photo_variants")
+def _schedule_photo_variants(sender, instance, **kwargs):
+    if getattr(instance, '_photo_uploaded', False):
+        instance._photo_uploaded = False
+        schedule_variants_on_commit(instance.photo)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from food.models import AllowedDish, Dish
+from food.services.images import variant_urls
+
+
+MENU_CACHE_TIMEOUT = 24 * 60 * 60
+MENU_MAX_DAYS = 7
+CATEGORY_NAMES = dict(Dish.CATEGORY_CHOICES)
+
+_deferred_menu_days: ContextVar[set | None] = ContextVar("deferred_menu_days", default=None)
+
+
+def _menu_key(day) -> str:
+    return f"food:menu:{day.isoformat()}"
+
+
+def _compute_day_menu(day) -> dict:
+    dishes_by_category = {category: [] for category in CATEGORY_NAMES}
+    for allowed in AllowedDish.objects.filter(date=day).select_related('dish').order_by('dish__name'):
+        dish = allowed.dish
+        dishes_by_category.setdefault(dish.category, []).append({
+            'id': dish.id,
+            'name': dish.name,
+            'photo': dish.photo.url if dish.photo else None,
+            'photo_variants': variant_urls(dish.photo, dish.photo_variants_for),
+        })
+
+    menu = {
+        'date': day.isoformat(),
+        'categories': [
+            {'category': category, 'name': CATEGORY_NAMES.get(category, category), 'dishes': dishes}
+            for category, dishes in dishes_by_category.items() if dishes
+        ],
+    }
+    menu['etag'] = hashlib.sha1(json.dumps(menu, sort_keys=True).encode('utf-8')).hexdigest()
+    return menu
+
+
+def get_day_menu(day) -> dict:
+    """Меню на день по категориям с данными блюд; в etag — хеш содержимого."""
+    key = _menu_key(day)
+    menu = cache.get(key)
+    if menu is None:
+        menu = _compute_day_menu(day)
+        cache.set(key, menu, MENU_CACHE_TIMEOUT)
+    return menu
+
+
+def get_menu(date_from, days) -> tuple[list[dict], str]:
+    """Меню на несколько дней подряд и общий ETag ответа."""
+    menus = [get_day_menu(date_from + timedelta(days=offset)) for offset in range(days)]
+    etag = hashlib.sha1('|'.join(menu['etag'] for menu in menus).encode('utf-8')).hexdigest()
+    return [{key: value for key, value in menu.items() if key != 'etag'} for menu in menus], f'"{etag}"'
+
+
+@contextmanager
+def defer_menu_invalidation():
+    """Копит изменённые дни меню и сбрасывает кэш один раз при выходе из блока."""
+    days = set()
+    token = _deferred_menu_days.set(days)
+    try:
+        yield days
+    finally:
+        _deferred_menu_days.reset(token)
+        _invalidate(days)
+
+
+def _invalidate(days):
+    deferred_days = _deferred_menu_days.get()
+    if deferred_days is not None:
+        deferred_days.update(days)
+        return
+    keys = [_menu_key(day) for day in set(days)]
+    if not keys:
+        return
+    # Как и в кэше патрулирования: сразу и ещё раз после коммита
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(pre_save, sender=AllowedDish, dispatch_uid="food_menu_allowed_dish_moved")
+def _invalidate_previous_menu_day(sender, instance, **kwargs):
+    if instance.pk:
+        _invalidate(AllowedDish.objects.filter(pk=instance.pk).values_list('date', flat=True))
+
+
+@receiver([post_save, post_delete], sender=AllowedDish, dispatch_uid="food_menu_allowed_dish")
+def _invalidate_menu_day(sender, instance, **kwargs):
+    _invalidate([instance.date])
+
+
+@receiver(post_save, sender=Dish, dispatch_uid="food_menu_dish")
+def _invalidate_dish_menu_days(sender, instance, **kwargs):
+    _invalidate(AllowedDish.objects.filter(dish=instance).values_list('date', flat=True))
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+import structlog
+from django.db import transaction
+
+from food.models import AllowedDish
+from food.services.menu import defer_menu_invalidation
+from myproject.history import bulk_create_with_history, bulk_history
+
+
+logger = structlog.get_logger(__name__)
+
+
+def date_range(start, days) -> list:
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def get_menu_plan(dates) -> set[tuple[int, object]]:
+    """Текущее меню на даты как множество пар (id блюда, дата)."""
+    return set(AllowedDish.objects.filter(date__in=dates).values_list('dish_id', 'date'))
+
+
+def apply_menu_plan(dates, selection) -> tuple[int, int]:
+    """
+    Приводит меню на даты к selection — множеству пар (id блюда, дата).
+    Разница с текущим меню применяется bulk_create/удалением в одной транзакции,
+    кэш меню сбрасывается один раз.
+    """
+    dates = set(dates)
+    selection = {(dish_id, day) for dish_id, day in selection if day in dates}
+    existing = {
+        (dish_id, day): allowed_id
+        for allowed_id, dish_id, day in AllowedDish.objects.filter(date__in=dates).values_list('id', 'dish_id', 'date')
+    }
+    to_add = selection - existing.keys()
+    to_remove = existing.keys() - selection
+
+    with transaction.atomic(), defer_menu_invalidation() as changed_days, bulk_history():
+        if to_add:
+            bulk_create_with_history(
+                [AllowedDish(dish_id=dish_id, date=day) for dish_id, day in sorted(to_add)], AllowedDish,
+            )
+        if to_remove:
+            AllowedDish.objects.filter(id__in=[existing[key] for key in to_remove]).delete()
+        changed_days.update(day for _, day in to_add | to_remove)
+
+    logger.info("menu_plan_applied", added_count=len(to_add), removed_count=len(to_remove),
+                date_from=min(dates).isoformat() if dates else None, date_to=max(dates).isoformat() if dates else None)
+    return len(to_add), len(to_remove)
+
+
+def repeat_menu(source_start, source_days, target_start, target_days) -> tuple[int, int]:
+    """
+    Повторяет меню source_days дней начиная с source_start на target_days дней
+    с target_start (копирование недели — 7 дней на 7 дней).
+    """
+    source_dates = date_range(source_start, source_days)
+    source_plan = get_menu_plan(source_dates)
+    target_dates = date_range(target_start, target_days)
+    selection = {
+        (dish_id, target_day)
+        for offset, target_day in enumerate(target_dates)
+        for dish_id, source_day in source_plan
+        if source_day == source_dates[offset % source_days]
+    }
+    return apply_menu_plan(target_dates, selection)
+
+
+def copy_week(source_start, target_start) -> tuple[int, int]:
+    return repeat_menu(source_start, 7, target_start, 7)
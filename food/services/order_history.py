@@ -0,0 +1,80 @@
+import base64
+import binascii
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from food.models import Dish, Order
+
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+CATEGORY_NAMES = dict(Dish.CATEGORY_CHOICES)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(order) -> str:
+    return base64.urlsafe_b64encode(f"{order.cooking_time.isoformat()}:{order.id}".encode()).decode()
+
+
+def decode_cursor(cursor) -> tuple[date, int]:
+    try:
+        cooking_time, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return date.fromisoformat(cooking_time), int(order_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Неверный курсор')
+
+
+def order_history_page(user, cursor=None, page_size=HISTORY_PAGE_SIZE) -> tuple[list, str | None]:
+    """
+    Страница истории заказов пользователя от новых к старым с пагинацией по ключу
+    (cooking_time, id): продолжение выбирается по индексу без OFFSET, блюдо — тем же запросом.
+    Возвращает заказы и курсор следующей страницы (None на последней).
+    """
+    queryset = (
+        Order.objects.active().filter(user=user)
+        .select_related('dish')
+        .order_by('-cooking_time', '-id')
+    )
+    if cursor:
+        cooking_time, order_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(cooking_time__lt=cooking_time) | Q(cooking_time=cooking_time, id__lt=order_id))
+
+    orders = list(queryset[:page_size + 1])
+    if len(orders) <= page_size:
+        return orders, None
+    orders = orders[:page_size]
+    return orders, encode_cursor(orders[-1])
+
+
+def monthly_summary(user, year) -> list[dict]:
+    """Число заказов пользователя по месяцам года с разбивкой по категориям блюд (один GROUP BY)."""
+    rows = (
+        Order.objects.active()
+        .filter(user=user, cooking_time__gte=date(year, 1, 1), cooking_time__lt=date(year + 1, 1, 1))
+        .annotate(month=TruncMonth('cooking_time'))
+        .values('month', 'dish__category')
+        .annotate(count=Count('id'))
+        .order_by('month')
+    )
+    months = defaultdict(dict)
+    for row in rows:
+        months[row['month']][row['dish__category']] = row['count']
+
+    return [
+        {
+            'month': month,
+            'total': sum(categories.values()),
+            'categories': [
+                {'category': category, 'name': CATEGORY_NAMES[category], 'count': categories[category]}
+                for category in CATEGORY_NAMES
+                if category in categories
+            ],
+        }
+        for month, categories in months.items()
+    ]
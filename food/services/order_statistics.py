@@ -1,6 +1,7 @@
-from django.db.models import Count
 from django.utils import timezone
-from food.models import Order
+
+from food.services.production_forecast import production_forecast
+
 
 class OrderService:
     @staticmethod
@@ -8,14 +9,10 @@ class OrderService:
         if not date:
             date = timezone.now().date()
 
-        aggregate_data = Order.objects.filter(cooking_time=date, is_deleted=False) \
-                                      .values('dish__name', 'dish__id') \
-                                      .annotate(total_orders=Count('id'))
-
-        result = []
-        for item in aggregate_data:
-            result.append({
-                'dish': item['dish__name'],
-                'total_orders': item['total_orders'],
-            })
-        return result
\ No newline at end of file
+        [forecast] = production_forecast(date, days=1)
+        return [
+            {'dish': dish['dish'], 'total_orders': dish['ordered']}
+            for category in forecast['categories']
+            for dish in category['dishes']
+            if dish['ordered']
+        ]
@@ -0,0 +1,43 @@
+from django.db import transaction
+
+from food.models import AllowedDish, Order
+from myproject.history import bulk_create_with_history
+
+
+def build_orders(user, items) -> tuple[list[Order], list[dict]]:
+    """
+    Заказы на несколько дней без сохранения. Меню и уже сделанные заказы
+    пользователя читаются двумя запросами на всю пачку; ошибки возвращаются
+    словарём на каждую позицию в порядке items, как у вложенного сериализатора.
+    """
+    dates = {item['cooking_time'] for item in items}
+    menu = {
+        (allowed.dish_id, allowed.date): allowed.dish
+        for allowed in AllowedDish.objects.filter(
+            date__in=dates, dish_id__in={item['dish'] for item in items}
+        ).select_related('dish')
+    }
+    taken = set(
+        Order.objects.active().filter(user=user, cooking_time__in=dates)
+        .values_list('cooking_time', 'dish__category')
+    )
+
+    orders, errors = [], []
+    for item in items:
+        cooking_time = item['cooking_time']
+        dish = menu.get((item['dish'], cooking_time))
+        if dish is None:
+            errors.append({'dish': [f"Блюдо #{item['dish']} недоступно для заказа на {cooking_time}."]})
+            continue
+        if (cooking_time, dish.category) in taken:
+            errors.append({'dish': [f"Уже заказано блюдо категории {dish.get_category_display()} на {cooking_time}"]})
+            continue
+        taken.add((cooking_time, dish.category))
+        orders.append(Order(user=user, dish=dish, cooking_time=cooking_time, comment=item.get('comment')))
+        errors.append({})
+    return orders, errors
+
+
+def create_orders(user, orders) -> list[Order]:
+    with transaction.atomic():
+        return bulk_create_with_history(orders, Order, default_user=user)
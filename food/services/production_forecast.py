@@ -0,0 +1,182 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import structlog
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from food.models import Dish, Order, OrderDayClosure, OrderDaySummary
+
+
+FORECAST_MAX_DAYS = 14
+# Сколько прошедших дней задание закрытия досоздаёт, если пропустило запуски
+CLOSEOUT_CATCHUP_DAYS = 7
+CATEGORY_NAMES = dict(Dish.CATEGORY_CHOICES)
+
+logger = structlog.get_logger(__name__)
+
+
+def _forecast_key(day) -> str:
+    return f"food:production:{day.isoformat()}"
+
+
+def _empty_day(day) -> dict:
+    return {'date': day, 'closed': False, 'ordered': 0, 'cancelled': 0, 'categories': [], 'comments': []}
+
+
+def _compute_days(days) -> dict:
+    """
+    Один GROUP BY по дате и блюду на все дни сразу (заказано и отменено)
+    и одна выборка комментариев действующих заказов.
+    """
+    rows = (
+        Order.objects.filter(cooking_time__in=days)
+        .values('cooking_time', 'dish_id', 'dish__name', 'dish__category')
+        .annotate(
+            ordered=Count('id', filter=Q(is_deleted=False)),
+            cancelled=Count('id', filter=Q(is_deleted=True)),
+        )
+        .order_by('cooking_time', 'dish__name')
+    )
+    dishes = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        dishes[row['cooking_time']][row['dish__category']].append({
+            'dish_id': row['dish_id'],
+            'dish': row['dish__name'],
+            'ordered': row['ordered'],
+            'cancelled': row['cancelled'],
+        })
+
+    comments = defaultdict(list)
+    for cooking_time, dish_name, comment in (
+        Order.objects.active().filter(cooking_time__in=days)
+        .exclude(comment__isnull=True).exclude(comment='')
+        .order_by('cooking_time', 'dish__name', 'id')
+        .values_list('cooking_time', 'dish__name', 'comment')
+    ):
+        comments[cooking_time].append({'dish': dish_name, 'comment': comment})
+
+    return {day: _build_day(day, dishes[day], comments[day]) for day in days}
+
+
+def _build_day(day, dishes_by_category, comments) -> dict:
+    forecast = _empty_day(day)
+    for category in CATEGORY_NAMES:
+        category_dishes = dishes_by_category.get(category)
+        if not category_dishes:
+            continue
+        forecast['categories'].append({
+            'category': category,
+            'name': CATEGORY_NAMES[category],
+            'ordered': sum(dish['ordered'] for dish in category_dishes),
+            'cancelled': sum(dish['cancelled'] for dish in category_dishes),
+            'dishes': category_dishes,
+        })
+    forecast['ordered'] = sum(category['ordered'] for category in forecast['categories'])
+    forecast['cancelled'] = sum(category['cancelled'] for category in forecast['categories'])
+    forecast['comments'] = comments
+    return forecast
+
+
+def _snapshot_days(days) -> dict:
+    """Итоги закрытых дней из снимка: два запроса независимо от числа дней."""
+    closures = OrderDayClosure.objects.filter(date__in=days).prefetch_related(
+        Prefetch('dishes', queryset=OrderDaySummary.objects.order_by('id'))
+    )
+    result = {}
+    for closure in closures:
+        dishes = defaultdict(list)
+        for summary in closure.dishes.all():
+            dishes[summary.category].append({
+                'dish_id': summary.dish_id,
+                'dish': summary.dish_name,
+                'ordered': summary.ordered,
+                'cancelled': summary.cancelled,
+            })
+        result[closure.date] = _build_day(closure.date, dishes, closure.comments)
+        result[closure.date]['closed'] = True
+    return result
+
+
+def is_day_closed(day) -> bool:
+    return OrderDayClosure.objects.filter(date=day).exists()
+
+
+def close_order_day(day) -> OrderDayClosure | None:
+    """
+    Замораживает итоги дня после отсечки заказов: количество порций по блюдам
+    и комментарии сохраняются в снимок, дальше статистика читается из него.
+    Возвращает None, если день уже закрыт.
+    """
+    forecast = _compute_days([day])[day]
+    try:
+        with transaction.atomic():
+            closure = OrderDayClosure.objects.create(date=day, comments=forecast['comments'])
+            OrderDaySummary.objects.bulk_create([
+                OrderDaySummary(
+                    closure=closure,
+                    dish_id=dish['dish_id'],
+                    dish_name=dish['dish'],
+                    category=category['category'],
+                    ordered=dish['ordered'],
+                    cancelled=dish['cancelled'],
+                )
+                for category in forecast['categories']
+                for dish in category['dishes']
+            ])
+    except IntegrityError:
+        return None
+
+    forecast['closed'] = True
+    cache.set(_forecast_key(day), forecast, timeout=None)
+    logger.info("order_day_closed", cooking_date=day.isoformat(), ordered=forecast['ordered'],
+                cancelled=forecast['cancelled'])
+    return closure
+
+
+def close_order_days(today=None) -> list:
+    """
+    Закрывает сегодняшний день (заказы на него уже нельзя менять) и пропущенные
+    за последние CLOSEOUT_CATCHUP_DAYS дней. Возвращает даты, закрытые этим запуском.
+    """
+    today = today or timezone.now().date()
+    days = [today - timedelta(days=offset) for offset in range(CLOSEOUT_CATCHUP_DAYS, -1, -1)]
+    already_closed = set(OrderDayClosure.objects.filter(date__in=days).values_list('date', flat=True))
+    return [day for day in days if day not in already_closed and close_order_day(day)]
+
+
+def production_forecast(date_from, days=7) -> list[dict]:
+    """
+    Прогноз производства кухни по дням: блюда по категориям с количеством
+    заказанных и отменённых порций, итоги и комментарии к заказам.
+    Дни после отсечки читаются из снимка закрытия и кэшируются бессрочно;
+    живые заказы агрегируются только для открытых дней и дней без снимка.
+    """
+    today = timezone.now().date()
+    all_days = [date_from + timedelta(days=offset) for offset in range(days)]
+    closed_days = [day for day in all_days if day <= today]
+
+    forecasts = {}
+    if closed_days:
+        cached = cache.get_many([_forecast_key(day) for day in closed_days])
+        for day in closed_days:
+            if _forecast_key(day) in cached:
+                forecasts[day] = cached[_forecast_key(day)]
+
+        uncached = [day for day in closed_days if day not in forecasts]
+        if uncached:
+            snapshots = _snapshot_days(uncached)
+            forecasts.update(snapshots)
+            cache.set_many({_forecast_key(day): forecast for day, forecast in snapshots.items()}, timeout=None)
+
+    missing_days = [day for day in all_days if day not in forecasts]
+    if missing_days:
+        computed = _compute_days(missing_days)
+        forecasts.update(computed)
+        cache.set_many(
+            {_forecast_key(day): forecast for day, forecast in computed.items() if day < today},
+            timeout=None,
+        )
+    return [forecasts[day] for day in all_days]
@@ -1,3 +1,533 @@
+import base64
+import json
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from storages.backends.s3boto3 import S3Boto3Storage
+from rest_framework.test import APIClient
+
+from food.models import AllowedDish, Dish, Feedback, Order, OrderDayClosure
+from food.serializers import DishSerializer
+from food.services.feedback_analytics import feedback_stats, get_unread_feedback_count, mark_feedback_read
+from food.services.images import generate_variants
+from food.services.menu import get_day_menu
+from food.services.menu_planning import apply_menu_plan, copy_week, repeat_menu
+from food.services.production_forecast import close_order_days, production_forecast
+from myapp.models import DirectUpload
+from myproject.uploads import cleanup_abandoned_uploads, create_upload_slot, get_upload_target, read_upload_token
+
+
+BULK_ORDERS_URL = "/api/food/orders/bulk/"
+MENU_URL = "/api/food/allowed_dishes/menu/"
+HISTORY_URL = "/api/food/orders/history/"
+
+
+class BulkOrderTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="canteen-user", password="pass")
+        self.user.user_permissions.add(Permission.objects.get(codename="add_order"))
+        self.soup = Dish.objects.create(name="Борщ", category="first_course")
+        self.salad = Dish.objects.create(name="Винегрет", category="salad")
+        self.days = [timezone.now().date() + timedelta(days=offset) for offset in range(1, 4)]
+        for day in self.days:
+            AllowedDish.objects.create(dish=self.soup, date=day)
+            AllowedDish.objects.create(dish=self.salad, date=day)
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def _post(self, orders):
+        return self.api_client.post(BULK_ORDERS_URL, {"orders": orders}, format="json")
+
+    def test_week_is_ordered_in_one_request_with_constant_queries(self):
+        orders = [
+            {"dish": dish.id, "cooking_time": day.isoformat()} for day in self.days for dish in (self.soup, self.salad)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._post(orders)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(Order.history.filter(user=self.user).count(), 6)
+        self.assertLessEqual(len([q for q in ctx.captured_queries if "food_" in q["sql"]]), 4)
+
+    def test_per_item_errors_reject_the_whole_batch(self):
+        Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.days[0])
+
+        response = self._post([
+            {"dish": self.salad.id, "cooking_time": self.days[0].isoformat()},
+            {"dish": self.soup.id, "cooking_time": self.days[0].isoformat()},
+            {"dish": self.salad.id, "cooking_time": self.days[1].isoformat()},
+            {"dish": self.salad.id, "cooking_time": self.days[1].isoformat()},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["orders"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("dish", errors[1])
+        self.assertEqual(errors[2], {})
+        self.assertIn("dish", errors[3])
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_dates_outside_order_window_are_rejected(self):
+        response = self._post([{"dish": self.soup.id, "cooking_time": timezone.now().date().isoformat()}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cooking_time", response.json()["orders"][0])
+
+
+class MenuTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.soup = Dish.objects.create(name="Щи", category="first_course")
+        self.drink = Dish.objects.create(name="Компот", category="drink")
+        AllowedDish.objects.create(dish=self.soup, date=self.day)
+        AllowedDish.objects.create(dish=self.drink, date=self.day)
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(get_user_model().objects.create_user(username="menu-user"))
+
+    def _get(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.api_client.get(MENU_URL, {"date": self.day.isoformat()}, headers=headers)
+
+    def test_menu_is_grouped_by_category_and_served_from_cache(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        [menu] = response.json()
+        self.assertEqual([category["category"] for category in menu["categories"]], ["first_course", "drink"])
+        self.assertEqual(menu["categories"][0]["dishes"], [
+            {"id": self.soup.id, "name": "Щи", "photo": None, "photo_variants": None}
+        ])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._get(response["ETag"]).status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if "food_" in q["sql"]])
+
+    def test_dish_and_menu_changes_change_etag(self):
+        etag = self._get()["ETag"]
+
+        self.soup.name = "Щи из свежей капусты"
+        self.soup.save()
+        renamed = self._get(etag)
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.json()[0]["categories"][0]["dishes"][0]["name"], "Щи из свежей капусты")
+
+        AllowedDish.objects.filter(dish=self.drink).delete()
+        self.assertEqual(len(self._get(renamed["ETag"]).json()[0]["categories"]), 1)
+
+
+class ProductionForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(username="forecast-user")
+        self.soup = Dish.objects.create(name="Солянка", category="first_course")
+        self.salad = Dish.objects.create(name="Оливье", category="salad")
+        self.past_day = timezone.now().date() - timedelta(days=2)
+        Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.past_day, comment="Без сметаны")
+        Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.past_day)
+        Order.objects.create(user=self.user, dish=self.salad, cooking_time=self.past_day, is_deleted=True)
+
+    def test_days_are_grouped_by_category_with_cancelled_and_comments(self):
+        day, next_day = production_forecast(self.past_day, days=2)
+
+        self.assertEqual((day["ordered"], day["cancelled"]), (2, 1))
+        soup, salad = day["categories"]
+        self.assertEqual(soup["dishes"], [{"dish_id": self.soup.id, "dish": "Солянка", "ordered": 2, "cancelled": 0}])
+        self.assertEqual((salad["ordered"], salad["cancelled"]), (0, 1))
+        self.assertEqual(day["comments"], [{"dish": "Солянка", "comment": "Без сметаны"}])
+        self.assertEqual(next_day["categories"], [])
+
+    def test_closed_days_are_served_from_cache(self):
+        production_forecast(self.past_day, days=2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            production_forecast(self.past_day, days=2)
+
+        self.assertEqual(ctx.captured_queries, [])
+
+    def test_kitchen_sheet_renders_week(self):
+        self.client.force_login(get_user_model().objects.create_superuser(username="kitchen-admin", password="pass"))
+
+        response = self.client.get(reverse("admin:kitchen_sheet"), {"date": self.past_day.isoformat()})
+
+        self.assertContains(response, "Без сметаны")
+
+
+class OrderCloseOutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(username="closeout-user")
+        self.user.user_permissions.add(Permission.objects.get(codename="delete_order"))
+        self.soup = Dish.objects.create(name="Щи", category="first_course")
+        self.today = timezone.now().date()
+        self.order = Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.today, comment="Погорячее")
+        Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.today - timedelta(days=1))
+
+    def test_closed_day_is_read_from_snapshot_not_live_orders(self):
+        self.assertEqual(close_order_days(self.today)[-2:], [self.today - timedelta(days=1), self.today])
+        self.assertEqual(close_order_days(self.today), [])
+        Order.objects.create(user=self.user, dish=self.soup, cooking_time=self.today)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            [day] = production_forecast(self.today, days=1)
+
+        self.assertTrue(day["closed"])
+        self.assertEqual(day["ordered"], 1)
+        self.assertEqual(day["comments"], [{"dish": "Щи", "comment": "Погорячее"}])
+        self.assertFalse(any("food_order\"" in query["sql"] for query in ctx.captured_queries))
+        with self.assertRaises(ValueError):
+            OrderDayClosure.objects.get(date=self.today).save()
+
+    def test_orders_of_closed_day_cannot_be_cancelled(self):
+        close_order_days(self.today)
+        api_client = APIClient()
+        api_client.force_authenticate(self.user)
+
+        response = api_client.delete(f"/api/food/orders/{self.order.id}/")
+
+        self.assertEqual(response.status_code, 400)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.is_deleted)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="history-user")
+        other_user = get_user_model().objects.create_user(username="history-other")
+        soup = Dish.objects.create(name="Уха", category="first_course")
+        salad = Dish.objects.create(name="Цезарь", category="salad")
+        self.days = [date(2025, 1, 30), date(2025, 1, 31), date(2025, 2, 3)]
+        for day in self.days:
+            Order.objects.create(user=self.user, dish=soup, cooking_time=day)
+            Order.objects.create(user=self.user, dish=salad, cooking_time=day)
+        Order.objects.create(user=self.user, dish=soup, cooking_time=date(2025, 2, 4), is_deleted=True)
+        Order.objects.create(user=other_user, dish=soup, cooking_time=date(2025, 2, 3))
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def test_history_is_paged_by_key_with_dish_in_one_query(self):
+        pages = []
+        next_cursor = None
+        while True:
+            params = {"page_size": 4, **({"cursor": next_cursor} if next_cursor else {})}
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.api_client.get(HISTORY_URL, params)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            pages.append(response.data["results"])
+            next_cursor = response.data["next"]
+            if not next_cursor:
+                break
+
+        self.assertEqual([len(page) for page in pages], [4, 2])
+        orders = [order for page in pages for order in page]
+        self.assertEqual([order["cooking_time"] for order in orders[::2]], ["2025-02-03", "2025-01-31", "2025-01-30"])
+        self.assertEqual(orders[0]["dish"]["category_name"], "Салат")
+        self.assertEqual(self.api_client.get(HISTORY_URL, {"cursor": "не курсор"}).status_code, 400)
+
+    def test_summary_is_grouped_by_month_and_category(self):
+        response = self.api_client.get(f"{HISTORY_URL}summary/", {"year": 2025})
+
+        january, february = response.data
+        self.assertEqual((january["month"], january["total"]), (date(2025, 1, 1), 4))
+        self.assertEqual(february["categories"], [
+            {"category": "first_course", "name": "Первое блюдо", "count": 1},
+            {"category": "salad", "name": "Салат", "count": 1},
+        ])
+
+
+class OrderQuerySetTests(TestCase):
+    # На пустой таблице PostgreSQL предпочитает последовательное чтение, план SQLite стабилен
+    @skipUnless(connection.vendor == "sqlite", "план запроса проверяется на SQLite")
+    def test_active_and_deleted_orders_use_partial_indexes(self):
+        user = get_user_model().objects.create_user(username="index-user")
+        today = timezone.now().date()
+
+        self.assertIn("food_order_user_day_active_idx",
+                      Order.objects.active().filter(user=user, cooking_time__gte=today).explain())
+        self.assertIn("food_order_day_deleted_idx", Order.objects.deleted().filter(cooking_time__gte=today).explain())
+
+
+class DishPhotoVariantTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage = FileSystemStorage(location=tmp_dir.name, base_url="/media/")
+        storage_patcher = mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage)
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+
+    def _upload(self, size=(2000, 1500)):
+        buffer = BytesIO()
+        Image.new("RGB", size, "orange").save(buffer, format="JPEG")
+        return SimpleUploadedFile("plov.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_variants_are_stored_next_to_original_and_exposed(self):
+        dish = Dish.objects.create(name="Плов", category="main_course", photo=self._upload())
+        self.assertIsNone(DishSerializer(dish).data["photo_variants"])
+
+        generate_variants(dish.photo)
+        dish.refresh_from_db()
+
+        variants = DishSerializer(dish).data["photo_variants"]
+        self.assertEqual(set(variants), {"thumbnail", "card"})
+        card_name = variants["card"]["webp"].removeprefix("/media/")
+        with Image.open(self.storage.path(card_name)) as card:
+            self.assertEqual((card.format, card.size), ("WEBP", (640, 480)))
+        self.assertLess(self.storage.size(variants["thumbnail"]["jpeg"].removeprefix("/media/")),
+                        self.storage.size(dish.photo.name))
+
+    def test_replaced_or_unreadable_photo_has_no_variants(self):
+        dish = Dish.objects.create(name="Плов", category="main_course", photo=self._upload())
+        generate_variants(dish.photo)
+
+        dish.photo = SimpleUploadedFile("plov.heic", b"ftypheic", content_type="image/heic")
+        dish.save()
+        dish.refresh_from_db()
+        self.assertIsNone(DishSerializer(dish).data["photo_variants"])
+
+        with self.assertRaises(UnidentifiedImageError):
+            generate_variants(dish.photo)
+        dish.refresh_from_db()
+        self.assertIsNone(DishSerializer(dish).data["photo_variants"])
+
+    def test_command_generates_variants_for_existing_photos(self):
+        processed = Dish.objects.create(name="Плов", category="main_course", photo=self._upload())
+        generate_variants(processed.photo)
+        old = Dish.objects.create(name="Борщ", category="first_course", photo=self._upload())
+        Dish.objects.create(name="Компот", category="drink")
+
+        stdout = StringIO()
+        with mock.patch("food.management.commands.generate_photo_variants.generate_variants",
+                        wraps=generate_variants) as generate_mock:
+            call_command("generate_photo_variants", stdout=stdout)
+
+        self.assertEqual([call.args[0].name for call in generate_mock.call_args_list], [old.photo.name])
+        old.refresh_from_db()
+        self.assertEqual(set(DishSerializer(old).data["photo_variants"]), {"thumbnail", "card"})
+        self.assertIn("Generated variants for 1 photo(s), failed: 0", stdout.getvalue())
+
+    def test_variants_are_scheduled_only_on_upload(self):
+        with mock.patch("food.services.images.schedule_variants") as schedule_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                dish = Dish.objects.create(name="Плов", category="main_course", photo=self._upload())
+            with self.captureOnCommitCallbacks(execute=True):
+                dish.name = "Плов по-узбекски"
+                dish.save()
+
+        schedule_mock.assert_called_once()
+
+
+class DirectUploadTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage = FileSystemStorage(location=tmp_dir.name)
+        self.user = get_user_model().objects.create_user(username="menu-editor")
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=["add_dish", "change_dish"]))
+        self.dish = Dish.objects.create(name="Гуляш", category="main_course")
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def test_dish_photo_is_put_to_storage_and_confirmed_by_token(self):
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage), \
+                mock.patch("food.views.schedule_variants_on_commit") as schedule_mock:
+            slot = self.api_client.post("/api/uploads/", {
+                "target": "dish_photo", "filename": "IMG_0001.JPG", "content_type": "image/jpeg", "size": 4,
+            }, format="json").json()
+            put_response = self.client.post(slot["upload_url"], {
+                **slot["fields"], "file": SimpleUploadedFile("IMG_0001.JPG", b"jpeg", content_type="image/jpeg"),
+            })
+            confirm = self.api_client.post(f"/api/food/dishes/{self.dish.id}/confirm-photo/",
+                                           {"token": slot["token"]}, format="json")
+
+        self.assertEqual(put_response.status_code, 200)
+        self.assertEqual(confirm.status_code, 200)
+        self.dish.refresh_from_db()
+        self.assertTrue(self.dish.photo.name.startswith("dish_photos/"))
+        self.assertTrue(self.dish.photo.name.endswith(".jpg"))
+        self.assertTrue(self.storage.exists(self.dish.photo.name))
+        schedule_mock.assert_called_once()
+
+    def test_token_cannot_attach_file_twice(self):
+        other_dish = Dish.objects.create(name="Рагу", category="main_course")
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage), \
+                mock.patch("food.views.schedule_variants_on_commit"):
+            slot = create_upload_slot(get_upload_target("dish_photo"), self.user, "a.jpg", "image/jpeg", 4)
+            self.client.post(slot["upload_url"], {
+                "file": SimpleUploadedFile("a.jpg", b"jpeg", content_type="image/jpeg"),
+            })
+            first = self.api_client.post(f"/api/food/dishes/{self.dish.id}/confirm-photo/",
+                                         {"token": slot["token"]}, format="json")
+            second = self.api_client.post(f"/api/food/dishes/{other_dish.id}/confirm-photo/",
+                                          {"token": slot["token"]}, format="json")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        other_dish.refresh_from_db()
+        self.assertFalse(other_dish.photo)
+        self.assertIsNotNone(DirectUpload.objects.get().confirmed_at)
+
+    def test_confirm_without_uploaded_file_is_rejected(self):
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage):
+            slot = create_upload_slot(get_upload_target("dish_photo"), self.user, "a.jpg", "image/jpeg", 10)
+            response = self.api_client.post(f"/api/food/dishes/{self.dish.id}/confirm-photo/",
+                                            {"token": slot["token"]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_s3_slot_is_presigned_for_bucket_key(self):
+        s3_storage = S3Boto3Storage(bucket_name="test-bucket", location="food", access_key="key", secret_key="secret",
+                                    endpoint_url="https://storage.yandexcloud.net", region_name="ru-central1")
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", s3_storage):
+            slot = create_upload_slot(get_upload_target("dish_photo"), self.user, "a.png", "image/png", 10)
+
+        self.assertEqual(slot["method"], "POST")
+        self.assertIn("/test-bucket", slot["upload_url"])
+        self.assertTrue(slot["fields"]["key"].startswith("food/dish_photos/"))
+        self.assertEqual(slot["fields"]["Content-Type"], "image/png")
+        policy = json.loads(base64.b64decode(slot["fields"]["policy"]))
+        self.assertIn(["content-length-range", 1, 10], policy["conditions"])
+
+    def test_upload_larger_than_declared_size_is_rejected(self):
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage):
+            slot = create_upload_slot(get_upload_target("dish_photo"), self.user, "a.jpg", "image/jpeg", 4)
+            response = self.client.post(slot["upload_url"], {
+                "file": SimpleUploadedFile("a.jpg", b"jpeg-too-big", content_type="image/jpeg"),
+            })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.storage.exists(read_upload_token(slot["token"])["name"]))
+
+    def test_abandoned_uploads_are_removed_and_confirmed_are_kept(self):
+        target = get_upload_target("dish_photo")
+        with mock.patch.object(Dish._meta.get_field("photo"), "storage", self.storage):
+            slots = [create_upload_slot(target, self.user, "a.jpg", "image/jpeg", 4) for _ in range(3)]
+            for slot in slots:
+                self.client.post(slot["upload_url"], {
+                    "file": SimpleUploadedFile("a.jpg", b"jpeg", content_type="image/jpeg"),
+                })
+            self.api_client.post(f"/api/food/dishes/{self.dish.id}/confirm-photo/",
+                                 {"token": slots[0]["token"]}, format="json")
+            self.dish.refresh_from_db()
+            abandoned_name = read_upload_token(slots[1]["token"])["name"]
+            fresh_name = read_upload_token(slots[2]["token"])["name"]
+            DirectUpload.objects.exclude(name=fresh_name).update(created_at=timezone.now() - timedelta(days=2))
+
+            self.assertEqual(cleanup_abandoned_uploads(), 1)
+
+        self.assertTrue(self.storage.exists(self.dish.photo.name))
+        self.assertFalse(self.storage.exists(abandoned_name))
+        self.assertTrue(self.storage.exists(fresh_name))
+        self.assertEqual(list(DirectUpload.objects.values_list("name", flat=True)), [fresh_name])
+
+
+class FeedbackAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.dish = Dish.objects.create(name="Котлета", category="main_course")
+
+    def _create_feedback(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Feedback.objects.create(dish=self.dish, comment=f"Отзыв {index}") for index in range(count)]
+
+    def test_unread_counter_is_updated_without_recount(self):
+        self._create_feedback(2)
+        self.assertEqual(get_unread_feedback_count(), 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            feedback = self._create_feedback(1)[0]
+            self.assertEqual(get_unread_feedback_count(), 3)
+            with self.captureOnCommitCallbacks(execute=True):
+                feedback.is_read = True
+                feedback.save(update_fields=["is_read"])
+            self.assertEqual(get_unread_feedback_count(), 2)
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT" in q["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_feedback_read(Feedback.objects.all()), 2)
+        self.assertEqual(get_unread_feedback_count(), 0)
+
+    def test_stats_are_grouped_by_dish_and_period(self):
+        old, new = self._create_feedback(2)
+        Feedback.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40), is_read=True)
+
+        [stats] = feedback_stats(timezone.now().date() - timedelta(days=60), timezone.now().date(), period="month")
+
+        self.assertEqual((stats["dish"], stats["total"], stats["unread"]), ("Котлета", 2, 1))
+        self.assertEqual([row["count"] for row in stats["periods"]], [1, 1])
+
+    def test_admin_pages_show_statistics_and_unread_count(self):
+        self._create_feedback(1)
+        self.client.force_login(get_user_model().objects.create_superuser(username="feedback-admin", password="pass"))
+
+        self.assertContains(self.client.get(reverse("admin:feedback_statistics")), "Котлета")
+        self.assertContains(self.client.get(reverse("admin:index")), "Непрочитанные отзывы (1)")
+
+
+class MenuPlanningTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.monday = date(2026, 3, 2)
+        self.dishes = [Dish.objects.create(name=f"Блюдо {index}", category="main_course") for index in range(3)]
+
+    def test_plan_diff_is_applied_with_single_cache_invalidation(self):
+        AllowedDish.objects.create(dish=self.dishes[0], date=self.monday)
+        AllowedDish.objects.create(dish=self.dishes[1], date=self.monday)
+        get_day_menu(self.monday)
+
+        with mock.patch("food.services.menu.cache.delete_many") as delete_mock:
+            added, removed = apply_menu_plan(
+                [self.monday], {(self.dishes[1].id, self.monday), (self.dishes[2].id, self.monday)}
+            )
+
+        self.assertEqual((added, removed), (1, 1))
+        self.assertEqual(set(AllowedDish.objects.values_list("dish_id", flat=True)), {self.dishes[1].id,
+                                                                                     self.dishes[2].id})
+        delete_mock.assert_called_once()
+        self.assertEqual(AllowedDish.history.filter(history_type="-").count(), 1)
+
+    def test_copy_week_and_repeat_pattern(self):
+        AllowedDish.objects.create(dish=self.dishes[0], date=self.monday)
+        AllowedDish.objects.create(dish=self.dishes[1], date=self.monday + timedelta(days=1))
+
+        self.assertEqual(copy_week(self.monday, self.monday + timedelta(days=7)), (2, 0))
+        self.assertTrue(AllowedDish.objects.filter(dish=self.dishes[1], date=self.monday + timedelta(days=8)).exists())
+
+        repeat_menu(self.monday, 2, self.monday + timedelta(days=14), 6)
+        pattern = list(
+            AllowedDish.objects.filter(date__gte=self.monday + timedelta(days=14))
+            .order_by("date").values_list("dish_id", flat=True)
+        )
+        self.assertEqual(pattern, [self.dishes[0].id, self.dishes[1].id] * 3)
+
+    def test_planner_grid_saves_week(self):
+        self.client.force_login(get_user_model().objects.create_superuser(username="menu-planner", password="pass"))
+        url = f"{reverse('admin:menu_planner')}?date={self.monday:%Y-%m-%d}"
+
+        self.assertContains(self.client.get(url), f"cell_{self.dishes[2].id}_{self.monday:%Y-%m-%d}")
+        self.client.post(url, {"action": "save", f"cell_{self.dishes[2].id}_{self.monday:%Y-%m-%d}": "on"})
 
-# Create your tests here.
+        self.assertEqual(list(AllowedDish.objects.values_list("dish_id", "date")), [(self.dishes[2].id, self.monday)])
@@ -3,10 +3,19 @@ from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.http import parse_etags
 from food.models import Dish, Order, Feedback, AllowedDish
-from food.serializers import DishSerializer, OrderSerializer, FeedbackSerializer, AllowedDishSerializer
+from food.serializers import DishSerializer, OrderSerializer, FeedbackSerializer, AllowedDishSerializer, \
+    BulkOrderSerializer, OrderHistorySerializer
 from food.permissions import CanAccessOrder, CanAccessOrderStats
 from food.services.order_statistics import OrderService
+from food.services.images import schedule_variants_on_commit
+from food.services.menu import MENU_MAX_DAYS, get_menu
+from food.services.order_history import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, InvalidCursor, monthly_summary, \
+    order_history_page
+from food.services.orders import build_orders, create_orders
+from food.services.production_forecast import FORECAST_MAX_DAYS, is_day_closed, production_forecast
+from myproject.uploads import UploadError, confirm_upload, get_upload_target
 
 
 class DishViewSet(viewsets.ModelViewSet):
@@ -26,6 +35,20 @@ class DishViewSet(viewsets.ModelViewSet):
         instance.save()
         return Response({'message': 'Image updated successfully'}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'], url_path='confirm-photo')
+    def confirm_photo(self, request, pk=None):
+        """
+        Привязывает фото, загруженное напрямую в хранилище по токену из api/uploads/ (target=dish_photo).
+        """
+        instance = self.get_object()
+        try:
+            instance.photo = confirm_upload(get_upload_target('dish_photo'), request.user, request.data.get('token'))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        instance.save()
+        schedule_variants_on_commit(instance.photo)
+        return Response({'message': 'Image updated successfully'}, status=status.HTTP_200_OK)
+
 
 class AllowedDishViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AllowedDishSerializer
@@ -35,6 +58,32 @@ class AllowedDishViewSet(viewsets.ReadOnlyModelViewSet):
         today = timezone.now().date()
         return AllowedDish.objects.filter(date__gte=today)
 
+    @action(detail=False, methods=['get'])
+    def menu(self, request):
+        """
+        Меню по дням и категориям с названиями и фото блюд.
+        Параметры: date (YYYY-MM-DD, по умолчанию сегодня) и days (1..7, по умолчанию 1).
+        Поддерживает If-None-Match: при неизменном меню отвечает 304.
+        """
+        try:
+            date_from = timezone.datetime.strptime(request.query_params['date'], '%Y-%m-%d').date() \
+                if 'date' in request.query_params else timezone.now().date()
+            days = int(request.query_params.get('days', 1))
+        except ValueError:
+            return Response({'detail': 'Неверный формат даты. Используйте YYYY-MM-DD.'}, status=400)
+        if not 1 <= days <= MENU_MAX_DAYS:
+            return Response({'detail': f'Количество дней должно быть от 1 до {MENU_MAX_DAYS}.'}, status=400)
+
+        menus, etag = get_menu(date_from, days)
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(menus)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
@@ -42,10 +91,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         today = timezone.now().date()
-        return Order.objects.filter(user=self.request.user, is_deleted=False, cooking_time__gte=today)
+        return Order.objects.active().filter(user=self.request.user, cooking_time__gte=today)
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
+        if is_day_closed(instance.cooking_time):
+            return Response({'detail': 'День готовки закрыт, заказ нельзя отменить.'},
+                            status=status.HTTP_400_BAD_REQUEST)
         reason = request.data.get('reason', 'Причина не указана')
         instance.delete(reason=reason)
         return Response(
@@ -56,6 +108,58 @@ class OrderViewSet(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT
         )
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Заказ сразу на несколько дней: {"orders": [{"dish", "cooking_time", "comment"}, ...]}.
+        Создаются все позиции или ни одной; ошибки возвращаются по каждой позиции.
+        """
+        serializer = BulkOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        orders, errors = build_orders(request.user, serializer.validated_data['orders'])
+        if any(errors):
+            return Response({'orders': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = create_orders(request.user, orders)
+        return Response(OrderSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        История заказов пользователя от новых к старым.
+        Параметры: cursor (из поля next предыдущей страницы) и page_size (по умолчанию 50).
+        """
+        try:
+            page_size = int(request.query_params.get('page_size', HISTORY_PAGE_SIZE))
+        except ValueError:
+            return Response({'detail': 'page_size должен быть числом.'}, status=400)
+        if not 1 <= page_size <= HISTORY_MAX_PAGE_SIZE:
+            return Response({'detail': f'page_size должен быть от 1 до {HISTORY_MAX_PAGE_SIZE}.'}, status=400)
+
+        try:
+            orders, next_cursor = order_history_page(request.user, request.query_params.get('cursor'), page_size)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response({
+            'next': next_cursor,
+            'results': OrderHistorySerializer(orders, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'], url_path='history/summary')
+    def history_summary(self, request):
+        """
+        Сводка заказов пользователя по месяцам года: всего и по категориям блюд.
+        Параметр year (по умолчанию текущий год).
+        """
+        try:
+            year = int(request.query_params.get('year', timezone.now().year))
+        except ValueError:
+            return Response({'detail': 'year должен быть числом.'}, status=400)
+        if not 2000 <= year <= 9998:
+            return Response({'detail': 'Неверный год.'}, status=400)
+        return Response(monthly_summary(request.user, year))
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, CanAccessOrderStats])
     def aggregate_orders(self, request):
         """
@@ -76,15 +180,32 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         return Response(aggregate_data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, CanAccessOrderStats])
+    def production_forecast(self, request):
+        """
+        Прогноз производства на несколько дней: блюда по категориям, заказано/отменено, комментарии.
+        Параметры: date (YYYY-MM-DD, по умолчанию сегодня) и days (по умолчанию 7).
+        """
+        try:
+            date_from = timezone.datetime.strptime(request.query_params['date'], '%Y-%m-%d').date() \
+                if 'date' in request.query_params else timezone.now().date()
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({'detail': 'Неверный формат даты. Используйте YYYY-MM-DD.'}, status=400)
+        if not 1 <= days <= FORECAST_MAX_DAYS:
+            return Response({'detail': f'Количество дней должно быть от 1 до {FORECAST_MAX_DAYS}.'}, status=400)
+
+        return Response(production_forecast(date_from, days))
+
 
 class RemovedOrderViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Order.objects.filter(is_deleted=True)
+    queryset = Order.objects.deleted()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, DjangoModelPermissions, CanAccessOrderStats]
     
     def get_queryset(self):
         today = timezone.now().date()
-        return Order.objects.filter(is_deleted=True, cooking_time__gte=today)
+        return Order.objects.deleted().filter(cooking_time__gte=today)
 
 class FeedbackViewSet(viewsets.ModelViewSet):
     queryset = Feedback.objects.all()
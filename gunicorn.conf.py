@@ -9,3 +9,22 @@ timeout = 600
 accesslog = None
 loglevel = "warning"
 worker_class = "sync"
+
+
+def on_starting(server):
+    from django.conf import settings
+
+    from myproject.metrics import REGISTRY
+
+    # Инвалидация кэша по сигналам не доходит до соседних воркеров с LocMemCache
+    cache_backend = settings.CACHES["default"]["BACKEND"]
+    if server.cfg.workers > 1 and cache_backend.endswith("LocMemCache"):
+        raise RuntimeError("Несколько воркеров gunicorn требуют общего кэша: задайте REDIS_URL")
+
+    REGISTRY.clear_multiproc_dir()
+
+
+def child_exit(server, worker):
+    from myproject.metrics import REGISTRY
+
+    REGISTRY.mark_process_dead(worker.pid)
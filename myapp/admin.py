@@ -10,24 +10,29 @@ from django.contrib.auth.admin import UserAdmin, GroupAdmin
 from django.contrib.auth.forms import SetPasswordForm, UserCreationForm
 from django.contrib.auth.models import Group
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import path
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from simple_history.admin import SimpleHistoryAdmin
 
 from dispatch.admin import register_dispatch_admin
 from food.admin import register_food_admin
 from users.admin import register_user_admin
-from food.models import Feedback
+from food.services.feedback_analytics import get_unread_feedback_count
 from myapp.admin_mixins import CustomAdmin
 from myapp.custom_groups import UserManager, SeniorUserManager, CanteenAdminManager
-from myapp.excel import fire_extinguishers, guards_stats
-from myapp.models import Guard, Round, Visit, Point, Message, Device
+from myapp.exports import FORMAT_XLSX, GUARDS_STATS_FORMAT_CHOICES
+from myapp.models import Guard, Round, Visit, Point, Message, Device, ReportJob, ExpiringFireExtinguisher
 from myapp.scheduler_admin import register_scheduler_admin
 from myapp.services.guards import get_manager_guards, get_guard_by_guard_id
-from myapp.services.messages import messages_by_user
+from myapp.services.inbox import get_unread_count
+from myapp.services.manager_scope import SCOPE_ALL, SCOPE_OWN, get_manager_scope, scope_by_manager
+from myapp.services.points import get_expiring_fire_extinguishers
+from myapp.services.qr_codes import get_qr_png
+from myapp.services.reports import request_report
 from myproject.settings import AUTH_USER_MODEL
 
 
@@ -57,11 +62,55 @@ class GuardsStatsForm(forms.Form):
         ]
         self.fields['guards'].choices = guards_choices
 
+    date_from = forms.DateField(
+        label="С даты",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+    date_to = forms.DateField(
+        label="По дату",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+
+    points = forms.ModelMultipleChoiceField(
+        queryset=Point.objects.order_by('name'),
+        label="Точки обхода (пусто — все)",
+        required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-control'}),
+    )
+    file_format = forms.ChoiceField(
+        choices=GUARDS_STATS_FORMAT_CHOICES,
+        initial=FORMAT_XLSX,
+        required=False,
+        label="Формат файла",
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("Дата начала позже даты окончания.")
+        return cleaned_data
+
     def get_guards(self):
         guard_id = int(self.cleaned_data['guards'])
         return get_manager_guards(self.request.user) if guard_id == self.ALL_EMPLOYEES_OPTION else [
             get_guard_by_guard_id(guard_id)]
 
+    def get_report_params(self):
+        date_from = self.cleaned_data.get('date_from')
+        date_to = self.cleaned_data.get('date_to')
+        return {
+            'guard_ids': sorted(guard.id for guard in self.get_guards()),
+            'date_from': date_from.isoformat() if date_from else None,
+            'date_to': date_to.isoformat() if date_to else None,
+            'point_ids': sorted(point.id for point in self.cleaned_data.get('points') or []),
+            'format': self.cleaned_data.get('file_format') or FORMAT_XLSX,
+        }
+
 
 class GroupUserManagementForm(forms.Form):
     add_user = forms.ModelChoiceField(
@@ -87,10 +136,16 @@ class MyAdminSite(AdminSite):
             admin_class = CustomAdmin
         super().register(model_or_iterable, admin_class, **options)
 
+    def index(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        if request.user.has_perm('food.view_feedback'):
+            extra_context['unread_feedback_count'] = get_unread_feedback_count()
+        return super().index(request, extra_context)
+
     def app_index(self, request, app_label, extra_context=None):
         extra_context = extra_context or {}
         if app_label == 'food':
-            extra_context['unread_feedback_count'] = Feedback.objects.filter(is_read=False).count()
+            extra_context['unread_feedback_count'] = get_unread_feedback_count()
         return super().app_index(request, app_label, extra_context)
 
     def get_absolute_url(self, request, view_name, *args, **kwargs):
@@ -99,8 +154,12 @@ class MyAdminSite(AdminSite):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('export-fire-extinguishers/', fire_extinguishers, name='export_fire_extinguishers'),
-            path('export-guards-stats/', self.guards_stats_form, name='guards_stats'),
+            path('export-fire-extinguishers/', self.admin_view(self.fire_extinguishers_report),
+                 name='export_fire_extinguishers'),
+            path('export-guards-stats/', self.admin_view(self.guards_stats_form), name='guards_stats'),
+            path('reports/<int:job_id>/', self.admin_view(self.report_job_status), name='report_job_status'),
+            path('reports/<int:job_id>/download/', self.admin_view(self.report_job_download),
+                 name='report_job_download'),
             path('manage_group_users/<str:group_name>', self.manage_group_users, name='manage_group_users'),
             path('manage_group_users/<str:group_name>/delete/<str:user_id>', self.manage_group_users_delete,
                  name='manage_group_users_delete'),
@@ -111,13 +170,36 @@ class MyAdminSite(AdminSite):
         if request.method == 'POST':
             form = GuardsStatsForm(request.POST, request=request)
             if form.is_valid():
-                guards = form.get_guards()
-                return guards_stats(guards)
+                job, _ = request_report(ReportJob.GUARDS_STATS, form.get_report_params(), request.user)
+                return redirect(reverse('admin:report_job_status', kwargs={'job_id': job.id}))
         else:
             form = GuardsStatsForm(request=request)
 
         return render(request, 'guards_stats.html', {'form': form})
 
+    def fire_extinguishers_report(self, request):
+        job, _ = request_report(ReportJob.FIRE_EXTINGUISHERS, {}, request.user)
+        return redirect(reverse('admin:report_job_status', kwargs={'job_id': job.id}))
+
+    def _get_report_job(self, request, job_id):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        if not request.user.is_superuser and job.requested_by_id != request.user.id:
+            raise PermissionDenied
+        return job
+
+    def report_job_status(self, request, job_id):
+        job = self._get_report_job(request, job_id)
+        return render(request, 'report_job.html', {
+            'job': job,
+            'in_progress': job.status in (ReportJob.PENDING, ReportJob.RUNNING),
+        })
+
+    def report_job_download(self, request, job_id):
+        job = self._get_report_job(request, job_id)
+        if job.status != ReportJob.DONE or not job.file:
+            raise Http404("Отчёт ещё не готов")
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename)
+
     def manage_group_users(self, request, group_name):
         group = get_object_or_404(Group, name=group_name)
         if request.method == 'POST':
@@ -165,7 +247,7 @@ class MyAdminSite(AdminSite):
         extra_context = super().each_context(request)
         extra_context['custom_buttons'] = self.get_buttons(request, app_name)
         extra_context['is_index'] = request.path.endswith('/admin/')
-        extra_context['message_count'] = len(messages_by_user(request.user))
+        extra_context['message_count'] = get_unread_count(request.user)
         extra_context['app_name'] = app_name
         return extra_context
 
@@ -184,20 +266,13 @@ class GuardAdmin(CustomAdmin):
     actions = ['manager_delete']
 
     def has_super_permission(self, request):
-        return request.user.is_superuser or request.user.groups.filter(
-            name='Senior Managers').exists() or request.user.groups.filter(name='senior_user_manager').exists()
+        return get_manager_scope(request.user) == SCOPE_ALL
 
     def has_manager_permission(self, request):
-        return request.user.groups.filter(name='Managers').exists() or request.user.groups.filter(
-            name='qr_manager').exists()
+        return get_manager_scope(request.user) == SCOPE_OWN
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if self.has_super_permission(request):
-            return qs
-        elif self.has_manager_permission(request):
-            return qs.filter(managers=request.user)
-        return []
+        return scope_by_manager(super().get_queryset(request), request.user, guard_path=None)
 
     def has_change_permission(self, request, obj=None):
         if not super().has_change_permission(request, obj):
@@ -270,14 +345,7 @@ class RoundAdmin(CustomAdmin):
         return not obj.is_active
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if request.user.is_superuser or request.user.groups.filter(
-                name='Senior Managers').exists() or request.user.groups.filter(name='senior_user_manager').exists():
-            return qs
-        if request.user.groups.filter(name='Managers').exists() or request.user.groups.filter(
-                name='qr_manager').exists():
-            return qs.filter(guard__managers=request.user)
-        return []
+        return scope_by_manager(super().get_queryset(request), request.user)
 
     inlines = [VisitInline]
 
@@ -288,14 +356,7 @@ class VisitAdmin(CustomAdmin):
     ]
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if request.user.is_superuser or request.user.groups.filter(
-                name='Senior Managers').exists() or request.user.groups.filter(name='senior_user_manager').exists():
-            return qs
-        if request.user.groups.filter(name='Managers').exists() or request.user.groups.filter(
-                name='qr_manager').exists():
-            return qs.filter(round__guard__managers=request.user)
-        return []
+        return scope_by_manager(super().get_queryset(request), request.user, guard_path='round__guard')
 
 
 def show_qr_code(request, object_id):
@@ -308,7 +369,7 @@ def download_qr_code(request, object_id):
 
 def generate_qr_code(request, object_id, force_download=True):
     obj = get_object_or_404(Point, pk=object_id)
-    qr_code_file = obj.generate_qr_code()
+    qr_code_file = get_qr_png(obj)
 
     filename = f"{obj.name} QR.png"
     encoded_filename = urllib.parse.quote(filename)
@@ -324,6 +385,20 @@ def generate_qr_code(request, object_id, force_download=True):
 class PointAdmin(CustomAdmin):
     list_display = ['name', 'qr_code_button']
     search_fields = ['name__icontains']
+    actions = ['export_qr_sheet_pdf', 'export_qr_zip']
+
+    def _request_qr_report(self, request, queryset, report_type):
+        point_ids = sorted(queryset.values_list('id', flat=True))
+        job, _ = request_report(report_type, {'point_ids': point_ids}, request.user)
+        return redirect(reverse('admin:report_job_status', kwargs={'job_id': job.id}))
+
+    @admin.action(description='Скачать QR-коды для печати (PDF)')
+    def export_qr_sheet_pdf(self, request, queryset):
+        return self._request_qr_report(request, queryset, ReportJob.QR_SHEET_PDF)
+
+    @admin.action(description='Скачать QR-коды архивом (ZIP)')
+    def export_qr_zip(self, request, queryset):
+        return self._request_qr_report(request, queryset, ReportJob.QR_ZIP)
 
     def qr_code_button(self, obj):
         return format_html('<a class="button" href="{}">Показать</a>&nbsp;<a class="button" href="{}">Скачать</a>',
@@ -342,19 +417,65 @@ class PointAdmin(CustomAdmin):
     qr_code_button.short_description = 'QR Код'
 
 
+class ExpiringFireExtinguisherAdmin(admin.ModelAdmin):
+    list_display = ['name', 'expiration_date', 'days_left']
+    search_fields = ['name__icontains']
+    ordering = ['expiration_date', 'name']
+
+    def get_queryset(self, request):
+        point_ids = get_expiring_fire_extinguishers(timezone.localdate()).values('id')
+        return super().get_queryset(request).filter(id__in=point_ids)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def days_left(self, obj):
+        days = (obj.expiration_date - timezone.localdate()).days
+        return f'Просрочен на {-days} дн.' if days < 0 else days
+
+    days_left.short_description = 'Осталось дней'
+
+
 class MessageAdmin(CustomAdmin):
     list_display = ['visit', 'text', 'is_seen']
     readonly_fields = ['guard', 'visit']
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if request.user.is_superuser or request.user.groups.filter(
-                name='Senior Managers').exists() or request.user.groups.filter(name='senior_user_manager').exists():
+        return scope_by_manager(super().get_queryset(request), request.user)
+
+
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['report_type', 'status', 'requested_by', 'created_at', 'finished_at', 'download_link']
+    list_filter = ['report_type', 'status']
+    readonly_fields = ['report_type', 'params', 'status', 'filename', 'error', 'requested_by', 'created_at',
+                       'started_at', 'finished_at']
+    exclude = ['params_hash', 'file']
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).select_related('requested_by')
+        if request.user.is_superuser:
             return qs
-        if request.user.groups.filter(name='Managers').exists() or request.user.groups.filter(
-                name='qr_manager').exists():
-            return qs.filter(guard__managers=request.user)
-        return []
+        return qs.filter(requested_by=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def download_link(self, obj):
+        if obj.status != ReportJob.DONE:
+            return '-'
+        return format_html('<a href="{}">{}</a>',
+                           reverse('admin:report_job_download', kwargs={'job_id': obj.id}), obj.filename)
+
+    download_link.short_description = 'Файл'
 
 
 def is_user_manager(user):
@@ -496,6 +617,7 @@ admin.site.register(Guard, GuardAdmin)
 admin.site.register(Round, RoundAdmin)
 admin.site.register(Visit, VisitAdmin)
 admin.site.register(Point, PointAdmin)
+admin.site.register(ExpiringFireExtinguisher, ExpiringFireExtinguisherAdmin)
 admin.site.register(Message, MessageAdmin)
 admin.site.register(get_user_model(), CustomUserAdmin, ordering=get_user_model()._meta.ordering)
 
@@ -506,6 +628,7 @@ class HistoryGroupAdmin(SimpleHistoryAdmin, GroupAdmin):
 
 admin.site.register(Group, HistoryGroupAdmin)
 admin.site.register(Device)
+admin.site.register(ReportJob, ReportJobAdmin)
 register_food_admin(admin.site)
 register_dispatch_admin(admin.site)
 register_user_admin(admin.site)
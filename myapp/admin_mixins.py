@@ -1,6 +1,8 @@
 from django.contrib import admin
 from simple_history.admin import SimpleHistoryAdmin
 
+from myapp.services.history_archive import read_archived_history
+
 
 class CustomAdmin(SimpleHistoryAdmin):
        
@@ -10,3 +12,15 @@ class CustomAdmin(SimpleHistoryAdmin):
         extra_context['show_save_and_add_another'] = False  # Убираем кнопку "Сохранить и добавить ещё"
         extra_context['show_save_and_continue'] = True  # Оставляем только "Сохранить и продолжить редактирование"
         return super().changeform_view(request, object_id, form_url, extra_context)
+
+    def get_history_queryset(self, request, history_manager, pk_name, object_id):
+        queryset = super().get_history_queryset(request, history_manager, pk_name, object_id)
+        # Архив читаем, только если запись о создании уже вынесена из основной таблицы
+        if queryset.filter(history_type='+').exists():
+            return queryset
+        if not self.model._default_manager.filter(**{pk_name: object_id}).exists():
+            return queryset
+        archived = read_archived_history(self.model, object_id)
+        if not archived:
+            return queryset
+        return [*queryset, *archived]
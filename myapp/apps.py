@@ -5,3 +5,8 @@ class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
     verbose_name = 'QR Приложение службы охраны'
+
+    def ready(self):
+        # Подключает сигналы сброса кэша патрулирования, аналитики, счётчиков сообщений
+        # и удаления QR-кодов точек
+        from myapp.services import inbox, patrol_analytics, patrol_cache, qr_codes  # noqa: F401
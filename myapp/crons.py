@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+import structlog
+
+from dispatch.services.notification import notify_users
+from myapp.custom_groups import QRManager
+from myapp.services.points import get_expiring_fire_extinguishers, get_fire_extinguisher_warning_days
+from users.models import NotificationSourceEnum
+
+
+# Сколько огнетушителей перечислять в одном уведомлении
+DIGEST_POINT_LIMIT = 20
+
+logger = structlog.get_logger(__name__)
+
+
+def _digest_lines(points):
+    lines = [f"{point['name']} — {point['expiration_date']:%d.%m.%Y}" for point in points[:DIGEST_POINT_LIMIT]]
+    if len(points) > DIGEST_POINT_LIMIT:
+        lines.append(f"и ещё {len(points) - DIGEST_POINT_LIMIT}")
+    return lines
+
+
+def notify_expiring_fire_extinguishers(today_value=None) -> int:
+    """Одна сводка менеджерам QR о просроченных и скоро истекающих огнетушителях."""
+    today_value = today_value or timezone.localdate()
+    warning_days = get_fire_extinguisher_warning_days()
+    points = list(get_expiring_fire_extinguishers(today_value, warning_days).values('name', 'expiration_date'))
+    if not points:
+        logger.info("fire_extinguisher_expiry_nothing_to_notify", warning_days=warning_days)
+        return 0
+
+    expired = [point for point in points if point['expiration_date'] < today_value]
+    expiring = [point for point in points if point['expiration_date'] >= today_value]
+    sections = []
+    if expired:
+        sections.append("\n".join([f"Срок истёк ({len(expired)}):", *_digest_lines(expired)]))
+    if expiring:
+        sections.append("\n".join([f"Истекает в ближайшие {warning_days} дн. ({len(expiring)}):",
+                                   *_digest_lines(expiring)]))
+
+    managers = list(
+        get_user_model().objects.filter(groups__name__in=[QRManager.name, 'Managers'], is_active=True).distinct()
+    )
+    notify_users(
+        managers,
+        "Сроки огнетушителей",
+        "\n\n".join(sections),
+        NotificationSourceEnum.QR_PATROL.value,
+    )
+    logger.info(
+        "fire_extinguisher_expiry_notified",
+        expired_count=len(expired),
+        expiring_count=len(expiring),
+        recipient_count=len(managers),
+    )
+    return len(managers)
@@ -1,10 +1,13 @@
 import openpyxl
-from django.http import HttpResponse
-from django.utils.encoding import escape_uri_path
+from django.db.models import Max
+from django.db.models.functions import Length
 from django.utils.timezone import localtime, datetime, get_current_timezone
-from openpyxl.styles import Font, PatternFill, Alignment, colors
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill, Alignment, colors
+from openpyxl.utils import get_column_letter
 
 from myapp.models import Point, Round
+from myapp.services.visits import guard_visit_rows
 
 
 def adjust_col_width(worksheet):
@@ -42,7 +45,7 @@ def style_separator(cell):
     cell.fill = data_fill
 
 
-def fire_extinguishers(*args):
+def write_fire_extinguishers(output):
     fire_extinguishers = Point.objects.filter(point_type='fire_extinguisher')
 
     wb = openpyxl.Workbook()
@@ -70,67 +73,120 @@ def fire_extinguishers(*args):
             cell.font = Font(color="FFFFFF")
 
     adjust_col_width(ws)
-
-    current_date = datetime.now(tz=get_current_timezone()).strftime('%Y-%m-%d')
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-    response['Content-Disposition'] = f'attachment; filename="fire_extinguishers_{current_date}.xlsx"'
-
-    wb.save(response)
-    return response
+    wb.save(output)
 
 
-def guards_stats(guards):
-    wb = openpyxl.Workbook()
-    ws_first = True
-
-    for guard in guards:
-        if ws_first:
-            ws = wb.active
-            ws.title = guard.name
-            ws_first = False
-        else:
-            ws = wb.create_sheet(title=guard.name)
-
-        headers = ["id обхода", "Точка обхода", "Время обхода"]
-        ws.append(headers)
-
-        for col_num in range(1, len(headers) + 1):
-            style_header(ws.cell(row=1, column=col_num))
-
-        rounds = Round.objects.filter(guard=guard).order_by('-created_at').all()
-        for round_obj in rounds:
-            visits = round_obj.visits.order_by('-created_at').all()
-            if visits.exists():
-                for visit in visits:
-                    row = [
-                        round_obj.id,
-                        visit.point.name,
-                        localtime(visit.created_at).strftime('%Y-%m-%d %H:%M:%S')
-                    ]
-
-                    ws.append(row)
-                    for col_num, value in enumerate(row, start=1):
-                        style_list(ws.cell(row=ws.max_row, column=col_num))
-
-            ws.append([" "])
-            for col in range(1, ws.max_column + 1):
-                style_separator(ws.cell(row=ws.max_row, column=col))
-
-        adjust_col_width(ws)
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-
+def fire_extinguishers_filename():
     current_date = datetime.now(tz=get_current_timezone()).strftime('%Y-%m-%d')
+    return f"fire_extinguishers_{current_date}.xlsx"
+
+
+GUARDS_STATS_HEADERS = ["id обхода", "Точка обхода", "Время обхода"]
+GUARDS_STATS_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+EXPORT_CHUNK_SIZE = 2000
 
-    filename = f'rounds_export_{current_date}.xlsx' if len(
-        guards) != 1 else f'rounds_export_{guards[0].name.replace(" ", "_")}_{current_date}.xlsx'
-
-    response['Content-Disposition'] = f"attachment; filename*=utf-8''{escape_uri_path(filename)}"
 
-    wb.save(response)
-    return response
+def _column_width(max_length):
+    return (max_length + 2) * 1.2
+
+
+def _guards_stats_column_widths():
+    """Ширины колонок считаются агрегатами заранее: write-only лист нельзя перечитать."""
+    max_round_id = Round.objects.aggregate(value=Max('id'))['value'] or 0
+    max_point_name = Point.objects.aggregate(value=Max(Length('name')))['value'] or 0
+    return [
+        _column_width(max(len(GUARDS_STATS_HEADERS[0]), len(str(max_round_id)))),
+        _column_width(max(len(GUARDS_STATS_HEADERS[1]), max_point_name)),
+        _column_width(max(len(GUARDS_STATS_HEADERS[2]), len('0000-00-00 00:00:00'))),
+    ]
+
+
+class _GuardsStatsSheet:
+    """Write-only лист одного сотрудника: строки пишутся сразу во временный файл openpyxl."""
+
+    def __init__(self, workbook, title, column_widths):
+        self.ws = workbook.create_sheet(title=title)
+        for index, width in enumerate(column_widths, start=1):
+            self.ws.column_dimensions[get_column_letter(index)].width = width
+        self.row_number = 0
+        self.column_count = len(GUARDS_STATS_HEADERS)
+        self.current_round_id = None
+        self._append(GUARDS_STATS_HEADERS, 'header')
+
+    def _append(self, values, style_name):
+        self.row_number += 1
+        row = []
+        for value in values:
+            cell = WriteOnlyCell(self.ws, value=value)
+            cell.style = style_name
+            row.append(cell)
+        self.ws.append(row)
+
+    def add_visit(self, round_id, point_name, created_at):
+        if self.current_round_id is not None and round_id != self.current_round_id:
+            self.close_round()
+        self.current_round_id = round_id
+        style_name = 'list_even' if not (self.row_number + 1) % 2 else 'list_odd'
+        self._append(
+            [round_id, point_name, localtime(created_at).strftime(GUARDS_STATS_DATETIME_FORMAT)],
+            style_name,
+        )
+
+    def close_round(self):
+        if self.current_round_id is None:
+            return
+        self._append([" "] + [None] * (self.column_count - 1), 'separator')
+        self.current_round_id = None
+
+
+def _guards_stats_styles(workbook):
+    header = NamedStyle(name='header')
+    header.fill = PatternFill(start_color="0c4b33", end_color="0c4b33", fill_type="solid")
+    header.font = Font(bold=False, color=colors.WHITE)
+    header.alignment = Alignment(horizontal="center", vertical="center")
+
+    list_odd = NamedStyle(name='list_odd')
+    list_odd.font = Font(color="000000")
+    list_odd.alignment = Alignment(horizontal="left", vertical="center")
+
+    list_even = NamedStyle(name='list_even')
+    list_even.font = Font(color="000000")
+    list_even.alignment = Alignment(horizontal="left", vertical="center")
+    list_even.fill = PatternFill(start_color="E8F5E9", end_color="E8F5E9", fill_type="solid")
+
+    separator = NamedStyle(name='separator')
+    separator.fill = PatternFill(start_color="A3DDC7", end_color="A3DDC7", fill_type="solid")
+
+    for style in (header, list_odd, list_even, separator):
+        workbook.add_named_style(style)
+
+
+def write_guards_stats(guards, output, date_from=None, date_to=None, point_ids=None):
+    """
+    Пишет xlsx с обходами сотрудников в output. Посещения читаются одним запросом
+    через iterator(), строки сразу уходят в write-only листы.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    _guards_stats_styles(workbook)
+    column_widths = _guards_stats_column_widths()
+
+    sheets = {
+        guard.id: _GuardsStatsSheet(workbook, guard.name, column_widths)
+        for guard in guards
+    }
+
+    rows = guard_visit_rows(sheets.keys(), date_from=date_from, date_to=date_to, point_ids=point_ids)
+    for guard_id, round_id, _, point_name, created_at in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        sheets[guard_id].add_visit(round_id, point_name, created_at)
+
+    for sheet in sheets.values():
+        sheet.close_round()
+
+    workbook.save(output)
+
+
+def guards_stats_filename(guards, extension='xlsx'):
+    current_date = datetime.now(tz=get_current_timezone()).strftime('%Y-%m-%d')
+    return f'rounds_export_{current_date}.{extension}' if len(
+        guards) != 1 else f'rounds_export_{guards[0].name.replace(" ", "_")}_{current_date}.{extension}'
+
@@ -0,0 +1,72 @@
+import csv
+import io
+from itertools import islice
+
+from django.utils.timezone import localtime
+
+from myapp.excel import EXPORT_CHUNK_SIZE, GUARDS_STATS_DATETIME_FORMAT, guards_stats_filename, write_guards_stats
+from myapp.services.visits import guard_visit_rows
+
+
+FORMAT_XLSX = 'xlsx'
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+GUARDS_STATS_FORMAT_CHOICES = [
+    (FORMAT_XLSX, 'Excel (xlsx)'),
+    (FORMAT_CSV, 'CSV'),
+    (FORMAT_PARQUET, 'Parquet (для аналитики)'),
+]
+
+VISIT_EXPORT_COLUMNS = ['guard_id', 'guard_name', 'round_id', 'point_id', 'point_name', 'visited_at']
+
+
+def _visit_export_rows(guards, date_from=None, date_to=None, point_ids=None):
+    guard_names = {guard.id: guard.name for guard in guards}
+    rows = guard_visit_rows(guard_names.keys(), date_from=date_from, date_to=date_to, point_ids=point_ids)
+    for guard_id, round_id, point_id, point_name, created_at in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield guard_id, guard_names[guard_id], round_id, point_id, point_name, localtime(created_at)
+
+
+def write_guards_stats_csv(guards, output, date_from=None, date_to=None, point_ids=None):
+    # utf-8-sig, чтобы Excel корректно открывал кириллицу
+    text_output = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text_output)
+    writer.writerow(VISIT_EXPORT_COLUMNS)
+    for row in _visit_export_rows(guards, date_from=date_from, date_to=date_to, point_ids=point_ids):
+        writer.writerow([*row[:-1], row[-1].strftime(GUARDS_STATS_DATETIME_FORMAT)])
+    text_output.flush()
+    text_output.detach()
+
+
+def write_guards_stats_parquet(guards, output, date_from=None, date_to=None, point_ids=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('guard_id', pa.int64()),
+        ('guard_name', pa.string()),
+        ('round_id', pa.int64()),
+        ('point_id', pa.int64()),
+        ('point_name', pa.string()),
+        ('visited_at', pa.timestamp('us', tz='UTC')),
+    ])
+    rows = _visit_export_rows(guards, date_from=date_from, date_to=date_to, point_ids=point_ids)
+    with pq.ParquetWriter(output, schema) as writer:
+        while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)],
+                schema=schema,
+            ))
+
+
+GUARDS_STATS_WRITERS = {
+    FORMAT_XLSX: write_guards_stats,
+    FORMAT_CSV: write_guards_stats_csv,
+    FORMAT_PARQUET: write_guards_stats_parquet,
+}
+
+
+def export_guards_stats(guards, output, file_format=FORMAT_XLSX, **filters) -> str:
+    """Пишет выгрузку обходов в нужном формате и возвращает имя файла."""
+    GUARDS_STATS_WRITERS[file_format](guards, output, **filters)
+    return guards_stats_filename(guards, extension=file_format)
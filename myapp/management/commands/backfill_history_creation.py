@@ -12,6 +12,8 @@ from django.db.utils import OperationalError, ProgrammingError
 from django.utils import timezone
 import structlog
 
+from myapp.services.history_archive import archived_creation_q
+
 
 logger = structlog.get_logger(__name__)
 
@@ -192,8 +194,16 @@ class Command(BaseCommand):
         if not any(field.name == "history_type" for field in history_model._meta.fields):
             return ModelBackfillResult(model._meta.label_lower, 0, 0)
 
+        # Запись "+" у объектов, чья ранняя история в архиве, не пропала — её не трогаем
+        history_queryset = history_model.objects.all()
+        live_queryset = model._default_manager.all()
+        archived_history_condition = archived_creation_q(model, object_pk_name)
+        if archived_history_condition is not None:
+            history_queryset = history_queryset.exclude(archived_history_condition)
+            live_queryset = live_queryset.exclude(archived_creation_q(model))
+
         missing_plus_ids_qs = (
-            history_model.objects.values(object_pk_name)
+            history_queryset.values(object_pk_name)
             .annotate(created_count=Count("history_id", filter=Q(history_type="+")))
             .filter(created_count=0)
             .order_by(object_pk_name)
@@ -201,8 +211,8 @@ class Command(BaseCommand):
         )
         missing_plus_ids = list(missing_plus_ids_qs)
         no_history_ids = list(
-            model._default_manager.exclude(
-                pk__in=history_model.objects.values_list(object_pk_name, flat=True)
+            live_queryset.exclude(
+                pk__in=history_queryset.values_list(object_pk_name, flat=True)
             )
             .order_by("pk")
             .values_list("pk", flat=True)
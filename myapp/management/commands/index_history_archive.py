@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myapp.services.history_archive import index_archive_segments
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the per-object index for history archive segments written before it existed, "
+        "so history reads and backfill stop relying on segment id ranges."
+    )
+
+    def handle(self, *args, **options):
+        indexed_count = index_archive_segments()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed_count} archive segment(s)"))
@@ -2,14 +2,22 @@ import signal
 import sys
 import time
 
+from apscheduler import events
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from django.conf import settings
 from django.core.management import BaseCommand
 from django_apscheduler.jobstores import DjangoJobStore, register_events, register_job
+from django.utils import timezone
 import structlog
 
+from myproject.metrics import (
+    REGISTRY,
+    SCHEDULER_JOB_LAG,
+    SCHEDULER_JOB_MISSED,
+    track_scheduler_job,
+)
 from myproject.observability import bound_log_context
 from myapp.scheduler_utils import cleanup_old_job_executions, get_job_execution_retention_days
 
@@ -36,7 +44,8 @@ scheduler = BackgroundScheduler(
 )
 def need_to_open_notification_job():
     from dispatch.crons import need_to_open_notification
-    with bound_log_context(execution_source="scheduler", job_name="need_to_open_notification"):
+    with bound_log_context(execution_source="scheduler", job_name="need_to_open_notification"), \
+            track_scheduler_job("need_to_open_notification"):
         need_to_open_notification()
         logger.info("scheduler_job_finished", job_name="need_to_open_notification")
 
@@ -49,11 +58,51 @@ def need_to_open_notification_job():
 )
 def check_missing_duties_job():
     from dispatch.crons import check_missing_duties
-    with bound_log_context(execution_source="scheduler", job_name="check_missing_duties"):
+    with bound_log_context(execution_source="scheduler", job_name="check_missing_duties"), \
+            track_scheduler_job("check_missing_duties"):
         check_missing_duties()
         logger.info("scheduler_job_finished", job_name="check_missing_duties")
 
 
+@register_job(
+    scheduler,
+    trigger=CronTrigger(hour=9, minute=0),
+    id="notify_expiring_fire_extinguishers",
+    replace_existing=True,
+    max_instances=1,
+)
+def notify_expiring_fire_extinguishers_job():
+    from myapp.crons import notify_expiring_fire_extinguishers
+    with bound_log_context(execution_source="scheduler", job_name="notify_expiring_fire_extinguishers"), \
+            track_scheduler_job("notify_expiring_fire_extinguishers"):
+        recipient_count = notify_expiring_fire_extinguishers()
+        logger.info(
+            "scheduler_job_finished",
+            job_name="notify_expiring_fire_extinguishers",
+            recipient_count=recipient_count,
+        )
+
+
+# Отсечка заказов считается по дате UTC (timezone.now().date()), в Москве это 03:00
+@register_job(
+    scheduler,
+    trigger=CronTrigger(hour=3, minute=5),
+    id="close_order_days",
+    replace_existing=True,
+    max_instances=1,
+)
+def close_order_days_job():
+    from food.services.production_forecast import close_order_days
+    with bound_log_context(execution_source="scheduler", job_name="close_order_days"), \
+            track_scheduler_job("close_order_days"):
+        closed_days = close_order_days()
+        logger.info(
+            "scheduler_job_finished",
+            job_name="close_order_days",
+            closed_days=[day.isoformat() for day in closed_days],
+        )
+
+
 @register_job(
     scheduler,
     trigger=CronTrigger(hour=3, minute=0),
@@ -67,7 +116,7 @@ def cleanup_old_job_executions_job():
         execution_source="scheduler",
         job_name="cleanup_old_job_executions",
         retention_days=retention_days,
-    ):
+    ), track_scheduler_job("cleanup_old_job_executions"):
         deleted_execution_count = cleanup_old_job_executions(
             retention_days=retention_days
         )
@@ -79,11 +128,95 @@ def cleanup_old_job_executions_job():
         )
 
 
+@register_job(
+    scheduler,
+    trigger=CronTrigger(hour=3, minute=30),
+    id="archive_old_history",
+    replace_existing=True,
+    max_instances=1,
+)
+def archive_old_history_job():
+    from myapp.services.history_archive import archive_old_history, get_history_retention_days
+    retention_days = get_history_retention_days()
+    with bound_log_context(
+        execution_source="scheduler",
+        job_name="archive_old_history",
+        retention_days=retention_days,
+    ), track_scheduler_job("archive_old_history"):
+        archived = archive_old_history(retention_days=retention_days)
+        logger.info(
+            "scheduler_job_finished",
+            job_name="archive_old_history",
+            archived_count=sum(archived.values()),
+            retention_days=retention_days,
+        )
+
+
+@register_job(
+    scheduler,
+    trigger=IntervalTrigger(hours=1),
+    id="cleanup_empty_rounds",
+    replace_existing=True,
+    max_instances=1,
+)
+def cleanup_empty_rounds_job():
+    from myapp.services.rounds import cleanup_empty_rounds
+    with bound_log_context(execution_source="scheduler", job_name="cleanup_empty_rounds"), \
+            track_scheduler_job("cleanup_empty_rounds"):
+        deleted_count = cleanup_empty_rounds()
+        logger.info("scheduler_job_finished", job_name="cleanup_empty_rounds", deleted_count=deleted_count)
+
+
+@register_job(
+    scheduler,
+    trigger=IntervalTrigger(seconds=15),
+    id="process_report_jobs",
+    replace_existing=True,
+    max_instances=1,
+)
+def process_report_jobs_job():
+    from myapp.services.reports import process_report_jobs
+    with bound_log_context(execution_source="scheduler", job_name="process_report_jobs"), \
+            track_scheduler_job("process_report_jobs"):
+        processed_count = process_report_jobs()
+        if processed_count:
+            logger.info("scheduler_job_finished", job_name="process_report_jobs", processed_count=processed_count)
+
+
+@register_job(
+    scheduler,
+    trigger=IntervalTrigger(hours=1),
+    id="cleanup_abandoned_uploads",
+    replace_existing=True,
+    max_instances=1,
+)
+def cleanup_abandoned_uploads_job():
+    from myproject.uploads import cleanup_abandoned_uploads
+    with bound_log_context(execution_source="scheduler", job_name="cleanup_abandoned_uploads"), \
+            track_scheduler_job("cleanup_abandoned_uploads"):
+        deleted_count = cleanup_abandoned_uploads()
+        logger.info("scheduler_job_finished", job_name="cleanup_abandoned_uploads", deleted_count=deleted_count)
+
+
+def record_scheduler_event(event):
+    if event.code == events.EVENT_JOB_SUBMITTED:
+        if event.scheduled_run_times:
+            lag = (timezone.now() - max(event.scheduled_run_times)).total_seconds()
+            SCHEDULER_JOB_LAG.observe(max(0.0, lag), job=event.job_id)
+    elif event.code == events.EVENT_JOB_MISSED:
+        SCHEDULER_JOB_MISSED.inc(job=event.job_id)
+    REGISTRY.flush_if_due()
+
+
 class Command(BaseCommand):
     help = "Run APScheduler in this process"
 
     def handle(self, *args, **options):
         register_events(scheduler)
+        scheduler.add_listener(
+            record_scheduler_event,
+            events.EVENT_JOB_SUBMITTED | events.EVENT_JOB_MISSED,
+        )
         scheduler.start()
         logger.info("scheduler_started")
         self.stdout.write(self.style.SUCCESS("APScheduler started"))
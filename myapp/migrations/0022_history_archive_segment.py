@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0021_historicaldevice_historicalguard_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Модель')),
+                ('period', models.DateField(verbose_name='Месяц')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='Файл архива')),
+                ('row_count', models.PositiveIntegerField(verbose_name='Записей')),
+                ('min_object_id', models.BigIntegerField(verbose_name='Минимальный id объекта')),
+                ('max_object_id', models.BigIntegerField(verbose_name='Максимальный id объекта')),
+                ('min_history_date', models.DateTimeField(verbose_name='Самая ранняя запись')),
+                ('max_history_date', models.DateTimeField(verbose_name='Самая поздняя запись')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Архив истории',
+                'verbose_name_plural': 'Архивы истории',
+                'indexes': [models.Index(fields=['model_label', 'min_object_id', 'max_object_id'], name='myapp_histarch_model_ids_idx')],
+            },
+        ),
+    ]
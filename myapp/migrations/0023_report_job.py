@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:52
+
+import django.db.models.deletion
+import myapp.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0022_history_archive_segment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('guards_stats', 'Обходы сотрудников'), ('fire_extinguishers', 'Огнетушители')], max_length=50, verbose_name='Тип отчёта')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('params_hash', models.CharField(max_length=64, verbose_name='Хеш параметров')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Формируется'), ('done', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('file', models.FileField(blank=True, null=True, storage=myapp.models.DefaultS3MediaStorage(), upload_to='reports/', verbose_name='Файл')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='Имя файла')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начат')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершён')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Запросил')),
+            ],
+            options={
+                'verbose_name': 'Отчёт',
+                'verbose_name_plural': 'Отчёты',
+                'indexes': [models.Index(fields=['report_type', 'params_hash', 'created_at'], name='myapp_report_cache_idx'), models.Index(fields=['status', 'created_at'], name='myapp_report_status_idx')],
+            },
+        ),
+    ]
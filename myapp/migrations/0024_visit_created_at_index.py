@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0023_report_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['created_at'], name='myapp_visit_created_at_idx'),
+        ),
+    ]
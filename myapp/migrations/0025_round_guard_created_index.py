@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0024_visit_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['guard', 'created_at'], name='myapp_round_guard_created_idx'),
+        ),
+    ]
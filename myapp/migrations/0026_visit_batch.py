@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-19 01:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0025_round_guard_created_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalvisit',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Время'),
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Время'),
+        ),
+        migrations.CreateModel(
+            name='VisitBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, verbose_name='Ключ идемпотентности')),
+                ('visit_count', models.PositiveIntegerField(default=0, verbose_name='Посещений')),
+                ('message_count', models.PositiveIntegerField(default=0, verbose_name='Сообщений')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Загружено')),
+                ('guard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visit_batches', to='myapp.guard', verbose_name='Сотрудник')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visit_batches', to='myapp.round', verbose_name='Обход')),
+            ],
+            options={
+                'verbose_name': 'Пакет посещений',
+                'verbose_name_plural': 'Пакеты посещений',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='visitbatch',
+            constraint=models.UniqueConstraint(fields=('guard', 'idempotency_key'), name='myapp_visitbatch_guard_key_uniq'),
+        ),
+    ]
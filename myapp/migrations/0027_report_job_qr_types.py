@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0026_visit_batch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='report_type',
+            field=models.CharField(choices=[('guards_stats', 'Обходы сотрудников'), ('fire_extinguishers', 'Огнетушители'), ('qr_sheet_pdf', 'QR-коды для печати (PDF)'), ('qr_zip', 'QR-коды (ZIP)')], max_length=50, verbose_name='Тип отчёта'),
+        ),
+    ]
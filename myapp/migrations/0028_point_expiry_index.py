@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0027_report_job_qr_types'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiringFireExtinguisher',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Огнетушитель с истекающим сроком',
+                'verbose_name_plural': 'Огнетушители: истекает срок',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('myapp.point',),
+        ),
+        migrations.AddIndex(
+            model_name='point',
+            index=models.Index(fields=['point_type', 'expiration_date'], name='myapp_point_type_expiry_idx'),
+        ),
+    ]
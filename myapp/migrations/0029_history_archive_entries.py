@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0028_point_expiry_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historyarchivesegment',
+            name='is_indexed',
+            field=models.BooleanField(default=False, verbose_name='Объекты проиндексированы'),
+        ),
+        migrations.CreateModel(
+            name='HistoryArchiveEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('has_creation', models.BooleanField(default=False, verbose_name='Есть запись о создании')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='myapp.historyarchivesegment', verbose_name='Сегмент')),
+            ],
+            options={
+                'verbose_name': 'Объект в архиве истории',
+                'verbose_name_plural': 'Объекты в архиве истории',
+                'indexes': [models.Index(fields=['object_id', 'segment'], name='myapp_histarch_entry_obj_idx')],
+                'unique_together': {('segment', 'object_id')},
+            },
+        ),
+    ]
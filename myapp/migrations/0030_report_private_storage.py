@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:53
+
+import myapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0029_history_archive_entries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=myapp.models.ReportS3Storage(), upload_to='', verbose_name='Файл'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0031_direct_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directupload',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Подтверждено'),
+        ),
+    ]
@@ -1,13 +1,11 @@
 import random
-from io import BytesIO
 
 import pytz
-import qrcode
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
 from django.db import models
 from django.db.models import Q
+from django.utils import timezone
 from storages.backends.s3boto3 import S3Boto3Storage
 
 from myproject import settings
@@ -22,6 +20,26 @@ class DefaultS3MediaStorage(S3Boto3Storage):
         return f"https://storage.appsostra.ru/{self.bucket_name}/{name}"
 
 
+class QRCodeS3Storage(S3Boto3Storage):
+    bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+    location = 'qr_codes'
+    file_overwrite = True
+
+
+class HistoryArchiveS3Storage(S3Boto3Storage):
+    bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+    location = 'history_archive'
+    default_acl = 'private'
+
+
+class ReportS3Storage(S3Boto3Storage):
+    """Готовые отчёты: закрытые объекты, скачиваются через админку или по подписанной ссылке."""
+    bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+    location = 'reports'
+    default_acl = 'private'
+    querystring_auth = True
+
+
 def generate_six_digit_code():
     return f"{random.randint(100000, 999999)}"
 
@@ -86,13 +104,9 @@ class Point(models.Model):
     class Meta:
         verbose_name = "Точка обхода"
         verbose_name_plural = "Точки обхода"
-
-    def generate_qr_code(self):
-        qr = qrcode.make(str(self.id), box_size=15)
-        buffer = BytesIO()
-        qr.save(buffer, format="PNG")
-        buffer.seek(0)
-        return ContentFile(buffer.read(), name=f'{self.name}_qr.png')
+        indexes = [
+            models.Index(fields=['point_type', 'expiration_date'], name='myapp_point_type_expiry_idx'),
+        ]
 
     def clean(self):
         if self.point_type == self.PointType.FIRE_EXTINGUISHER:
@@ -103,6 +117,15 @@ class Point(models.Model):
             self.has_fire_extinguisher = False
 
 
+class ExpiringFireExtinguisher(Point):
+    """Огнетушители с истекающим сроком — отдельный раздел админки поверх индекса по сроку."""
+
+    class Meta:
+        proxy = True
+        verbose_name = "Огнетушитель с истекающим сроком"
+        verbose_name_plural = "Огнетушители: истекает срок"
+
+
 class Round(models.Model):
     guard = models.ForeignKey(Guard, on_delete=models.CASCADE, verbose_name=Guard._meta.verbose_name)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время')
@@ -114,11 +137,15 @@ class Round(models.Model):
     class Meta:
         verbose_name = "Обход"
         verbose_name_plural = "Обходы"
+        indexes = [
+            models.Index(fields=['guard', 'created_at'], name='myapp_round_guard_created_idx'),
+        ]
 
 
 class Visit(models.Model):
     point = models.ForeignKey(Point, on_delete=models.CASCADE, verbose_name=Point._meta.verbose_name)
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время')
+    # default вместо auto_now_add: пакетная загрузка сохраняет время сканирования с устройства
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Время')
     round = models.ForeignKey(Round, on_delete=models.CASCADE, related_name='visits',
                               verbose_name=Round._meta.verbose_name)
 
@@ -128,6 +155,9 @@ class Visit(models.Model):
     class Meta:
         verbose_name = "Посещение"
         verbose_name_plural = "Посещения"
+        indexes = [
+            models.Index(fields=['created_at'], name='myapp_visit_created_at_idx'),
+        ]
 
 
 class Message(models.Model):
@@ -144,6 +174,133 @@ class Message(models.Model):
         verbose_name_plural = "Сообщение"
 
 
+class VisitBatch(models.Model):
+    guard = models.ForeignKey(Guard, on_delete=models.CASCADE, related_name='visit_batches',
+                              verbose_name=Guard._meta.verbose_name)
+    round = models.ForeignKey(Round, on_delete=models.CASCADE, related_name='visit_batches',
+                              verbose_name=Round._meta.verbose_name)
+    idempotency_key = models.CharField(max_length=64, verbose_name='Ключ идемпотентности')
+    visit_count = models.PositiveIntegerField(default=0, verbose_name='Посещений')
+    message_count = models.PositiveIntegerField(default=0, verbose_name='Сообщений')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Загружено')
+
+    def __str__(self):
+        return f"{self.guard_id}: {self.idempotency_key} ({self.visit_count})"
+
+    class Meta:
+        verbose_name = "Пакет посещений"
+        verbose_name_plural = "Пакеты посещений"
+        constraints = [
+            models.UniqueConstraint(fields=['guard', 'idempotency_key'], name='myapp_visitbatch_guard_key_uniq'),
+        ]
+
+
 class Device(models.Model):
     user = models.OneToOneField(AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='device')
     notification_token = models.CharField(max_length=255)
+
+
+class HistoryArchiveSegment(models.Model):
+    model_label = models.CharField(max_length=100, verbose_name='Модель')
+    period = models.DateField(verbose_name='Месяц')
+    path = models.CharField(max_length=255, unique=True, verbose_name='Файл архива')
+    row_count = models.PositiveIntegerField(verbose_name='Записей')
+    min_object_id = models.BigIntegerField(verbose_name='Минимальный id объекта')
+    max_object_id = models.BigIntegerField(verbose_name='Максимальный id объекта')
+    min_history_date = models.DateTimeField(verbose_name='Самая ранняя запись')
+    max_history_date = models.DateTimeField(verbose_name='Самая поздняя запись')
+    # Сегменты до появления индекса объектов ищутся по диапазону id (команда index_history_archive)
+    is_indexed = models.BooleanField(default=False, verbose_name='Объекты проиндексированы')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    def __str__(self):
+        return f"{self.model_label} {self.period:%Y-%m} ({self.row_count})"
+
+    class Meta:
+        verbose_name = "Архив истории"
+        verbose_name_plural = "Архивы истории"
+        indexes = [
+            models.Index(fields=['model_label', 'min_object_id', 'max_object_id'],
+                         name='myapp_histarch_model_ids_idx'),
+        ]
+
+
+class HistoryArchiveEntry(models.Model):
+    """Объект, строки истории которого лежат в сегменте архива."""
+    segment = models.ForeignKey(HistoryArchiveSegment, on_delete=models.CASCADE, related_name='entries',
+                                verbose_name='Сегмент')
+    object_id = models.BigIntegerField(verbose_name='id объекта')
+    has_creation = models.BooleanField(default=False, verbose_name='Есть запись о создании')
+
+    class Meta:
+        verbose_name = "Объект в архиве истории"
+        verbose_name_plural = "Объекты в архиве истории"
+        unique_together = ('segment', 'object_id')
+        indexes = [
+            models.Index(fields=['object_id', 'segment'], name='myapp_histarch_entry_obj_idx'),
+        ]
+
+
+class ReportJob(models.Model):
+    GUARDS_STATS = 'guards_stats'
+    FIRE_EXTINGUISHERS = 'fire_extinguishers'
+    QR_SHEET_PDF = 'qr_sheet_pdf'
+    QR_ZIP = 'qr_zip'
+    REPORT_TYPE_CHOICES = [
+        (GUARDS_STATS, 'Обходы сотрудников'),
+        (FIRE_EXTINGUISHERS, 'Огнетушители'),
+        (QR_SHEET_PDF, 'QR-коды для печати (PDF)'),
+        (QR_ZIP, 'QR-коды (ZIP)'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Формируется'),
+        (DONE, 'Готов'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    report_type = models.CharField(max_length=50, choices=REPORT_TYPE_CHOICES, verbose_name='Тип отчёта')
+    params = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+    params_hash = models.CharField(max_length=64, verbose_name='Хеш параметров')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name='Статус')
+    file = models.FileField(storage=ReportS3Storage(), null=True, blank=True, verbose_name='Файл')
+    filename = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    requested_by = models.ForeignKey(AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='report_jobs', verbose_name='Запросил')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начат')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершён')
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Отчёт"
+        verbose_name_plural = "Отчёты"
+        indexes = [
+            models.Index(fields=['report_type', 'params_hash', 'created_at'], name='myapp_report_cache_idx'),
+            models.Index(fields=['status', 'created_at'], name='myapp_report_status_idx'),
+        ]
+
+
+class DirectUpload(models.Model):
+    """Выданное место прямой загрузки в хранилище (myproject.uploads); брошенные файлы удаляет планировщик."""
+    target = models.CharField(max_length=50, verbose_name='Назначение')
+    name = models.CharField(max_length=255, unique=True, verbose_name='Файл')
+    user = models.ForeignKey(AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='direct_uploads', verbose_name='Пользователь')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создано')
+    confirmed_at = models.DateTimeField(null=True, blank=True, verbose_name='Подтверждено')
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Прямая загрузка"
+        verbose_name_plural = "Прямые загрузки"
@@ -1,4 +1,7 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.http import JsonResponse
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Round, Point, Visit, Guard
 
@@ -43,3 +46,37 @@ class RoundSerializer(serializers.ModelSerializer):
     class Meta:
         model = Round
         fields = ['is_active', 'visits']
+
+
+VISIT_BATCH_MAX_SIZE = 500
+# Допустимое расхождение часов устройства с сервером
+VISIT_BATCH_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class VisitBatchItemSerializer(serializers.Serializer):
+    point_id = serializers.IntegerField()
+    scanned_at = serializers.IntegerField(min_value=0)
+    message = serializers.CharField(max_length=300, required=False, allow_blank=True)
+
+    def validate_point_id(self, value):
+        if value not in self.context['points']:
+            raise serializers.ValidationError('Неизвестная точка обхода.')
+        return value
+
+    def validate_scanned_at(self, value):
+        scanned_at = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        if scanned_at > timezone.now() + VISIT_BATCH_CLOCK_SKEW:
+            raise serializers.ValidationError('Время сканирования в будущем.')
+        return scanned_at
+
+
+class VisitBatchSerializer(serializers.Serializer):
+    idempotency_key = serializers.CharField(max_length=64)
+    round_id = serializers.IntegerField(required=False)
+    visits = VisitBatchItemSerializer(many=True, allow_empty=False, max_length=VISIT_BATCH_MAX_SIZE)
+
+    def validate_visits(self, value):
+        scanned = [item['scanned_at'] for item in value]
+        if scanned != sorted(scanned):
+            raise serializers.ValidationError('Посещения должны идти по возрастанию времени сканирования.')
+        return value
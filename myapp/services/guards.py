@@ -1,4 +1,5 @@
 from myapp.models import Guard
+from myapp.services.manager_scope import scope_by_manager
 
 
 def get_guard(guard_code):
@@ -14,8 +15,4 @@ def get_guard_by_guard_id(guard_id):
 
 
 def get_manager_guards(user):
-    if user.is_superuser or user.groups.filter(name='Senior Managers').exists() or user.groups.filter(name='senior_user_manager').exists():
-        return Guard.objects.all()
-    elif user.groups.filter(name='Managers').exists() or user.groups.filter(name='qr_manager').exists():
-        return Guard.objects.filter(managers=user)
-    return []
+    return scope_by_manager(Guard.objects.all(), user, guard_path=None)
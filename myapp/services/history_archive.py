@@ -0,0 +1,228 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+import structlog
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from myapp.models import HistoryArchiveEntry, HistoryArchiveS3Storage, HistoryArchiveSegment
+
+
+DEFAULT_HISTORY_RETENTION_DAYS = 180
+HISTORY_RETENTION_ENV = "HISTORY_RETENTION_DAYS"
+DEFAULT_ARCHIVE_BATCH_SIZE = 2000
+
+# Модели с быстрорастущей историей, которую переносим в архив
+ARCHIVED_HISTORY_MODELS = (
+    "users.Notification",
+    "myapp.Visit",
+    "myapp.Round",
+    "dispatch.IncidentMessage",
+    "dispatch.Duty",
+)
+
+logger = structlog.get_logger(__name__)
+
+
+def get_history_retention_days() -> int:
+    raw_value = os.getenv(HISTORY_RETENTION_ENV, str(DEFAULT_HISTORY_RETENTION_DAYS))
+    try:
+        retention_days = int(raw_value)
+    except (TypeError, ValueError):
+        retention_days = DEFAULT_HISTORY_RETENTION_DAYS
+
+    return max(1, retention_days)
+
+
+def get_history_archive_storage():
+    storage_path = getattr(settings, "HISTORY_ARCHIVE_STORAGE", None)
+    if storage_path:
+        return import_string(storage_path)()
+    return HistoryArchiveS3Storage()
+
+
+def _history_model(model):
+    return getattr(model, model._meta.simple_history_manager_attribute).model
+
+
+def _is_archived_model(model) -> bool:
+    return model._meta.label_lower in {label.lower() for label in ARCHIVED_HISTORY_MODELS}
+
+
+def _write_segment(storage, model, period, rows) -> HistoryArchiveSegment:
+    pk_name = model._meta.pk.attname
+    payload = "\n".join(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) for row in rows)
+    name = (
+        f"{model._meta.label_lower.replace('.', '_')}/{period:%Y-%m}/"
+        f"{rows[0]['history_id']}-{rows[-1]['history_id']}.jsonl.gz"
+    )
+    path = storage.save(name, ContentFile(gzip.compress(payload.encode("utf-8"))))
+    segment = HistoryArchiveSegment.objects.create(
+        model_label=model._meta.label_lower,
+        period=period,
+        path=path,
+        row_count=len(rows),
+        min_object_id=min(row[pk_name] for row in rows),
+        max_object_id=max(row[pk_name] for row in rows),
+        min_history_date=min(row["history_date"] for row in rows),
+        max_history_date=max(row["history_date"] for row in rows),
+        is_indexed=True,
+    )
+    _create_entries(segment, rows, pk_name)
+    return segment
+
+
+def _create_entries(segment, rows, pk_name) -> None:
+    has_creation = defaultdict(bool)
+    for row in rows:
+        has_creation[row[pk_name]] |= row["history_type"] == "+"
+    HistoryArchiveEntry.objects.bulk_create([
+        HistoryArchiveEntry(segment=segment, object_id=object_id, has_creation=created)
+        for object_id, created in has_creation.items()
+    ])
+
+
+def _read_segment_rows(storage, segment) -> list[dict]:
+    with storage.open(segment.path, "rb") as archive_file:
+        return [json.loads(line) for line in gzip.decompress(archive_file.read()).decode("utf-8").splitlines()]
+
+
+def index_archive_segments(*, storage=None) -> int:
+    """Строит индекс объектов для сегментов, записанных до его появления."""
+    storage = storage or get_history_archive_storage()
+    indexed_count = 0
+    for segment in HistoryArchiveSegment.objects.filter(is_indexed=False).order_by("id"):
+        model = apps.get_model(segment.model_label)
+        rows = _read_segment_rows(storage, segment)
+        with transaction.atomic():
+            segment.entries.all().delete()
+            _create_entries(segment, rows, model._meta.pk.attname)
+            segment.is_indexed = True
+            segment.save(update_fields=["is_indexed"])
+        indexed_count += 1
+    logger.info("history_archive_indexed", segment_count=indexed_count)
+    return indexed_count
+
+
+def archive_model_history(model, cutoff, *, batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE, storage=None) -> int:
+    """
+    Переносит строки истории старше cutoff в сжатые JSONL-файлы (по файлу на месяц
+    в каждой пачке) и удаляет их из основной таблицы пачками по batch_size.
+    """
+    storage = storage or get_history_archive_storage()
+    history_model = _history_model(model)
+    field_names = [field.attname for field in history_model._meta.concrete_fields]
+    archived_count = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                history_model.objects.filter(history_date__lt=cutoff)
+                .order_by("history_id")
+                .values(*field_names)[:batch_size]
+            )
+            if not rows:
+                break
+
+            rows_by_month = defaultdict(list)
+            for row in rows:
+                history_date = timezone.localtime(row["history_date"])
+                rows_by_month[history_date.date().replace(day=1)].append(row)
+
+            for period, period_rows in sorted(rows_by_month.items()):
+                _write_segment(storage, model, period, period_rows)
+
+            history_model.objects.filter(history_id__in=[row["history_id"] for row in rows]).delete()
+        archived_count += len(rows)
+
+    logger.info(
+        "history_archive_model_finished",
+        model=model._meta.label_lower,
+        archived_count=archived_count,
+        cutoff=cutoff.isoformat(),
+    )
+    return archived_count
+
+
+def archive_old_history(*, retention_days: int | None = None, now_value=None,
+                        batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE, storage=None) -> dict[str, int]:
+    retention_days = retention_days or get_history_retention_days()
+    now_value = now_value or timezone.now()
+    cutoff = now_value - timedelta(days=retention_days)
+    storage = storage or get_history_archive_storage()
+
+    archived = {}
+    for model_label in ARCHIVED_HISTORY_MODELS:
+        model = apps.get_model(model_label)
+        archived[model._meta.label_lower] = archive_model_history(
+            model, cutoff, batch_size=batch_size, storage=storage
+        )
+
+    logger.info(
+        "history_archive_finished",
+        retention_days=retention_days,
+        cutoff=cutoff.isoformat(),
+        archived=archived,
+    )
+    return archived
+
+
+def archived_creation_q(model, field_name="pk") -> Q | None:
+    """
+    Условие на объекты, чья запись "+" лежит в архиве. Для непроиндексированных
+    сегментов осторожно берём весь их диапазон id.
+    """
+    if not _is_archived_model(model):
+        return None
+    model_label = model._meta.label_lower
+    condition = Q(**{f"{field_name}__in": HistoryArchiveEntry.objects.filter(
+        segment__model_label=model_label, has_creation=True,
+    ).values("object_id")})
+    for min_object_id, max_object_id in HistoryArchiveSegment.objects.filter(
+        model_label=model_label, is_indexed=False,
+    ).values_list("min_object_id", "max_object_id"):
+        condition |= Q(**{f"{field_name}__range": (min_object_id, max_object_id)})
+    return condition
+
+
+def read_archived_history(model, object_id, *, storage=None) -> list:
+    """Исторические записи объекта из архива (несохранённые экземпляры, новые сверху)."""
+    if not _is_archived_model(model):
+        return []
+
+    object_id = model._meta.pk.to_python(object_id)
+    segments = HistoryArchiveSegment.objects.filter(
+        Q(entries__object_id=object_id)
+        | Q(is_indexed=False, min_object_id__lte=object_id, max_object_id__gte=object_id),
+        model_label=model._meta.label_lower,
+    ).distinct().order_by("min_history_date")
+    if not segments:
+        return []
+
+    storage = storage or get_history_archive_storage()
+    history_model = _history_model(model)
+    fields = {field.attname: field for field in history_model._meta.concrete_fields}
+    pk_name = model._meta.pk.attname
+
+    records = []
+    for segment in segments:
+        for row in _read_segment_rows(storage, segment):
+            if row.get(pk_name) != object_id:
+                continue
+            records.append(history_model(**{
+                name: fields[name].to_python(value)
+                for name, value in row.items()
+                if name in fields
+            }))
+
+    records.sort(key=lambda record: (record.history_date, record.history_id), reverse=True)
+    return records
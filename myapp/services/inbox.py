@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from myapp.models import Guard, Message, VisitBatch
+from myapp.services.manager_scope import SCOPE_ALL, SCOPE_OWN, get_manager_scope
+
+
+INBOX_CACHE_TIMEOUT = 60 * 60
+UNREAD_BY_GUARD_KEY = "inbox:unread_by_guard"
+
+
+def _manager_guards_key(user_id) -> str:
+    return f"inbox:manager_guards:{user_id}"
+
+
+def get_unread_by_guard() -> dict[int, int]:
+    """Непрочитанные сообщения по сотрудникам — общий счётчик для всех менеджеров."""
+    counts = cache.get(UNREAD_BY_GUARD_KEY)
+    if counts is None:
+        counts = dict(
+            Message.objects.filter(is_seen=False)
+            .values('guard_id')
+            .annotate(unread=Count('id'))
+            .values_list('guard_id', 'unread')
+        )
+        cache.set(UNREAD_BY_GUARD_KEY, counts, INBOX_CACHE_TIMEOUT)
+    return counts
+
+
+def get_manager_guard_ids(user_id) -> list[int]:
+    key = _manager_guards_key(user_id)
+    guard_ids = cache.get(key)
+    if guard_ids is None:
+        guard_ids = list(Guard.objects.filter(managers__id=user_id).values_list('id', flat=True))
+        cache.set(key, guard_ids, INBOX_CACHE_TIMEOUT)
+    return guard_ids
+
+
+def get_unread_counts(user) -> dict[int, int] | None:
+    """Непрочитанные сообщения видимых пользователю сотрудников; None, если он не менеджер."""
+    scope = get_manager_scope(user)
+    if scope == SCOPE_ALL:
+        return get_unread_by_guard()
+    if scope == SCOPE_OWN:
+        counts = get_unread_by_guard()
+        return {guard_id: counts[guard_id] for guard_id in get_manager_guard_ids(user.id) if guard_id in counts}
+    return None
+
+
+def get_unread_count(user) -> int:
+    return sum((get_unread_counts(user) or {}).values())
+
+
+def _invalidate(keys):
+    # Как и в кэше патрулирования: сразу и ещё раз после коммита
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver([post_save, post_delete], sender=Message, dispatch_uid="inbox_message")
+def _invalidate_unread(sender, instance, **kwargs):
+    _invalidate([UNREAD_BY_GUARD_KEY])
+
+
+@receiver(post_save, sender=VisitBatch, dispatch_uid="inbox_visit_batch")
+def _invalidate_unread_for_batch(sender, instance, created, **kwargs):
+    # Сообщения пакета вставляются bulk_create без сигналов Message
+    if created and instance.message_count:
+        _invalidate([UNREAD_BY_GUARD_KEY])
+
+
+@receiver(m2m_changed, sender=Guard.managers.through, dispatch_uid="inbox_guard_managers")
+def _invalidate_manager_guards(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == "pre_clear":
+        user_ids = list(instance.managers.values_list('id', flat=True))
+    else:
+        user_ids = pk_set or []
+    _invalidate([_manager_guards_key(user_id) for user_id in user_ids])
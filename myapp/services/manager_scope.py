@@ -0,0 +1,45 @@
+from myapp.custom_groups import QRManager, SeniorUserManager
+
+
+SENIOR_MANAGER_GROUPS = frozenset({'Senior Managers', SeniorUserManager.name})
+MANAGER_GROUPS = frozenset({'Managers', QRManager.name})
+
+# Видит всех сотрудников / только закреплённых за собой
+SCOPE_ALL = 'all'
+SCOPE_OWN = 'own'
+
+_SCOPE_ATTR = '_qr_manager_scope'
+_NO_SCOPE = object()
+
+
+def get_manager_scope(user) -> str | None:
+    """
+    Роль пользователя в QR-обходах. Группы читаются одним запросом и
+    запоминаются на объекте пользователя, т.е. один раз за запрос.
+    """
+    scope = getattr(user, _SCOPE_ATTR, _NO_SCOPE)
+    if scope is not _NO_SCOPE:
+        return scope
+
+    if user.is_superuser:
+        scope = SCOPE_ALL
+    else:
+        group_names = set(user.groups.values_list('name', flat=True))
+        if group_names & SENIOR_MANAGER_GROUPS:
+            scope = SCOPE_ALL
+        elif group_names & MANAGER_GROUPS:
+            scope = SCOPE_OWN
+        else:
+            scope = None
+    setattr(user, _SCOPE_ATTR, scope)
+    return scope
+
+
+def scope_by_manager(queryset, user, guard_path='guard'):
+    """Ограничивает queryset сотрудниками, которые видны пользователю; guard_path — путь до Guard."""
+    scope = get_manager_scope(user)
+    if scope == SCOPE_ALL:
+        return queryset
+    if scope == SCOPE_OWN:
+        return queryset.filter(**{f'{guard_path}__managers' if guard_path else 'managers': user})
+    return queryset.none()
@@ -1,4 +1,5 @@
 from myapp.models import Message
+from myapp.services.manager_scope import scope_by_manager
 
 
 def create_message(guard, visit, text):
@@ -6,8 +7,4 @@ def create_message(guard, visit, text):
 
 
 def messages_by_user(user):
-    if user.is_superuser or user.groups.filter(name='Senior Managers').exists() or user.groups.filter(name='senior_user_manager').exists():
-        return Message.objects.filter(is_seen=False).all()
-    elif user.groups.filter(name='Managers').exists() or user.groups.filter(name='qr_manager').exists():
-        return Message.objects.filter(guard__managers=user, is_seen=False)
-    return []
+    return scope_by_manager(Message.objects.filter(is_seen=False), user)
@@ -0,0 +1,180 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from myapp.models import Round, Visit, VisitBatch
+from myapp.services.patrol_cache import _invalidate, get_cached_points
+
+
+# Закрытый день (все обходы завершены и прошёл запас на обходы через полночь)
+# держим долго, открытый пересчитываем раз в несколько минут
+CLOSED_DAY_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+OPEN_DAY_CACHE_TIMEOUT = 5 * 60
+CLOSED_DAY_GRACE = timedelta(days=1)
+
+
+def _coverage_key(day) -> str:
+    return f"patrol:coverage:{day.isoformat()}"
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _isoformat(value):
+    return timezone.localtime(value).isoformat() if value else None
+
+
+def _compute_day_coverage(day) -> dict:
+    """
+    Один запрос по посещениям обходов, начатых в этот день: LAG() по обходу
+    даёт промежуток с предыдущим посещением, остальное сворачивается в Python.
+    """
+    start, end = _day_bounds(day)
+    rows = (
+        Visit.objects.filter(round__created_at__gte=start, round__created_at__lt=end)
+        .annotate(previous_visit_at=Window(
+            expression=Lag('created_at'),
+            partition_by=[F('round_id')],
+            order_by=F('created_at').asc(),
+        ))
+        .order_by('round_id', 'created_at')
+        .values_list('round_id', 'round__guard_id', 'round__created_at', 'round__is_active',
+                     'point_id', 'created_at', 'previous_visit_at')
+    )
+
+    rounds = {}
+    point_last_visits = defaultdict(dict)
+    for round_id, guard_id, started_at, is_active, point_id, visited_at, previous_visit_at in rows.iterator():
+        round_data = rounds.setdefault(round_id, {
+            'round_id': round_id,
+            'guard_id': guard_id,
+            'started_at': started_at,
+            'last_visit_at': visited_at,
+            'is_active': is_active,
+            'visited_point_ids': set(),
+            'gaps': [],
+        })
+        round_data['last_visit_at'] = visited_at
+        round_data['visited_point_ids'].add(point_id)
+        if previous_visit_at is not None:
+            round_data['gaps'].append((visited_at - previous_visit_at).total_seconds())
+
+        guard_points = point_last_visits[point_id]
+        if guard_id not in guard_points or guard_points[guard_id] < visited_at:
+            guard_points[guard_id] = visited_at
+
+    return {
+        'rounds': [
+            {
+                'round_id': data['round_id'],
+                'guard_id': data['guard_id'],
+                'started_at': _isoformat(data['started_at']),
+                'finished_at': None if data['is_active'] else _isoformat(data['last_visit_at']),
+                'duration_seconds': (data['last_visit_at'] - data['started_at']).total_seconds(),
+                'visited_point_ids': sorted(data['visited_point_ids']),
+                'max_gap_seconds': max(data['gaps'], default=None),
+                'avg_gap_seconds': sum(data['gaps']) / len(data['gaps']) if data['gaps'] else None,
+            }
+            for data in rounds.values()
+        ],
+        'point_last_visits': {
+            point_id: {guard_id: _isoformat(visited_at) for guard_id, visited_at in guards.items()}
+            for point_id, guards in point_last_visits.items()
+        },
+    }
+
+
+def _is_closed_day(day, coverage) -> bool:
+    _, end = _day_bounds(day)
+    if timezone.now() < end + CLOSED_DAY_GRACE:
+        return False
+    return all(round_data['finished_at'] is not None for round_data in coverage['rounds'])
+
+
+def get_day_coverage(day) -> dict:
+    key = _coverage_key(day)
+    coverage = cache.get(key)
+    if coverage is None:
+        coverage = _compute_day_coverage(day)
+        timeout = CLOSED_DAY_CACHE_TIMEOUT if _is_closed_day(day, coverage) else OPEN_DAY_CACHE_TIMEOUT
+        cache.set(key, coverage, timeout)
+    return coverage
+
+
+def invalidate_day_coverage(*started_at):
+    """Сбрасывает кэш покрытия за дни начала обходов (по моментам их начала)."""
+    days = {timezone.localdate(value) for value in started_at if value is not None}
+    _invalidate([_coverage_key(day) for day in days])
+
+
+@receiver([post_save, post_delete], sender=Round, dispatch_uid="patrol_analytics_round")
+def _invalidate_round_day(sender, instance, **kwargs):
+    invalidate_day_coverage(instance.created_at)
+
+
+@receiver([post_save, post_delete], sender=Visit, dispatch_uid="patrol_analytics_visit")
+def _invalidate_visit_day(sender, instance, **kwargs):
+    # Сканирование идёт без запроса обхода: его день — день посещения или предыдущий
+    # (обход через полночь). Старые офлайн-пакеты сбрасываются по VisitBatch
+    started_at = [instance.created_at, instance.created_at - timedelta(days=1)]
+    if Visit.round.is_cached(instance):
+        started_at.append(instance.round.created_at)
+    invalidate_day_coverage(*started_at)
+
+
+@receiver(post_save, sender=VisitBatch, dispatch_uid="patrol_analytics_visit_batch")
+def _invalidate_batch_day(sender, instance, created, **kwargs):
+    # Пакет вставляет посещения bulk_create без сигналов, день берём по обходу
+    if created:
+        invalidate_day_coverage(*Round.objects.filter(pk=instance.round_id).values_list('created_at', flat=True))
+
+
+def patrol_coverage(day, guards) -> dict:
+    """
+    Покрытие обходов за день для переданных сотрудников: длительность, посещённые
+    и пропущенные точки, промежутки между посещениями и последнее посещение точек.
+    Ожидаемые точки — все точки обхода.
+    """
+    guard_names = {guard.id: guard.name for guard in guards}
+    coverage = get_day_coverage(day)
+    points = get_cached_points()
+    expected_point_ids = set(points)
+
+    rounds = []
+    for round_data in coverage['rounds']:
+        if round_data['guard_id'] not in guard_names:
+            continue
+        visited = set(round_data['visited_point_ids'])
+        rounds.append({
+            **round_data,
+            'guard_name': guard_names[round_data['guard_id']],
+            'visited_point_count': len(visited & expected_point_ids),
+            'missed_point_ids': sorted(expected_point_ids - visited),
+        })
+
+    point_rows = []
+    for point_id, point in sorted(points.items()):
+        visits = [
+            visited_at for guard_id, visited_at in coverage['point_last_visits'].get(point_id, {}).items()
+            if guard_id in guard_names
+        ]
+        point_rows.append({
+            'point_id': point_id,
+            'name': point['name'],
+            'last_visit_at': max(visits, default=None),
+        })
+
+    return {
+        'date': day.isoformat(),
+        'expected_point_count': len(expected_point_ids),
+        'rounds': rounds,
+        'points': point_rows,
+    }
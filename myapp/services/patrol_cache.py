@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from myapp.models import Guard, Point, Round
+
+
+PATROL_CACHE_TIMEOUT = 60 * 60
+POINTS_CACHE_KEY = "patrol:points"
+POINT_CACHE_FIELDS = ("id", "name", "point_type", "expiration_date")
+
+
+def _guard_key(code) -> str:
+    return f"patrol:guard:{code}"
+
+
+def _round_key(guard_id) -> str:
+    return f"patrol:round:{guard_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class PatrolSession:
+    """Данные сканирования по коду сотрудника: id сотрудника и его последнего обхода."""
+
+    guard_id: int
+    code: str
+    name: str
+    round_id: int | None
+
+
+def _load_guard_entry(code) -> dict:
+    guard = Guard.objects.select_related("user").get(code=code)
+    return {"id": guard.id, "code": guard.code, "name": guard.name}
+
+
+def get_guard_entry(code) -> dict:
+    key = _guard_key(code)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _load_guard_entry(code)
+        cache.set(key, entry, PATROL_CACHE_TIMEOUT)
+    return entry
+
+
+def get_cached_guard(code) -> Guard:
+    """Ссылка на сотрудника (id и код) для фильтров и внешних ключей без запроса к базе."""
+    entry = get_guard_entry(code)
+    guard = Guard(id=entry["id"], code=entry["code"])
+    guard._state.adding = False
+    return guard
+
+
+def get_latest_round_id(guard_id) -> int | None:
+    key = _round_key(guard_id)
+    cached = cache.get(key)
+    if cached is None:
+        round_id = (
+            Round.objects.filter(guard_id=guard_id).order_by("-created_at").values_list("id", flat=True).first()
+        )
+        # 0 — закэшированное "обходов нет", чтобы не ходить в базу на каждый запрос
+        cache.set(key, round_id or 0, PATROL_CACHE_TIMEOUT)
+        return round_id
+    return cached or None
+
+
+def get_patrol_session(code) -> PatrolSession:
+    """Сотрудник по коду и его последний обход; Guard.DoesNotExist, если кода нет."""
+    entry = get_guard_entry(code)
+    return PatrolSession(
+        guard_id=entry["id"],
+        code=entry["code"],
+        name=entry["name"],
+        round_id=get_latest_round_id(entry["id"]),
+    )
+
+
+def get_cached_points() -> dict[int, dict]:
+    points = cache.get(POINTS_CACHE_KEY)
+    if points is None:
+        points = {point["id"]: point for point in Point.objects.values(*POINT_CACHE_FIELDS)}
+        cache.set(POINTS_CACHE_KEY, points, PATROL_CACHE_TIMEOUT)
+    return points
+
+
+def get_cached_point(point_id) -> Point:
+    """Точка из кэша без запроса к базе; Point.DoesNotExist для неизвестного id."""
+    try:
+        values = get_cached_points()[int(point_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Point.DoesNotExist(f"Point {point_id} does not exist")
+    point = Point(**values)
+    point._state.adding = False
+    return point
+
+
+def _invalidate(keys):
+    # Чистим сразу и ещё раз после коммита: параллельный запрос мог успеть
+    # положить в кэш данные из ещё не закоммиченной транзакции
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver([post_save, post_delete], sender=Guard, dispatch_uid="patrol_cache_guard")
+def _invalidate_guard(sender, instance, **kwargs):
+    _invalidate([_guard_key(instance.code), _round_key(instance.id)])
+
+
+GUARD_NAME_FIELDS = ("first_name", "last_name")
+
+
+def _guard_name(user):
+    return tuple(getattr(user, field) for field in GUARD_NAME_FIELDS)
+
+
+@receiver(post_init, sender=get_user_model(), dispatch_uid="patrol_cache_track_guard_name")
+def _remember_guard_name(sender, instance, **kwargs):
+    if not set(GUARD_NAME_FIELDS) & instance.get_deferred_fields():
+        instance._patrol_guard_name = _guard_name(instance)
+
+
+@receiver(post_save, sender=get_user_model(), dispatch_uid="patrol_cache_guard_user")
+def _invalidate_guard_user(sender, instance, created, update_fields=None, **kwargs):
+    # Имя сотрудника берётся из пользователя: кэш чистим, только если имя изменилось
+    if created or (update_fields and not set(GUARD_NAME_FIELDS) & set(update_fields)):
+        return
+    name = _guard_name(instance)
+    if getattr(instance, "_patrol_guard_name", None) == name:
+        return
+    instance._patrol_guard_name = name
+    codes = Guard.objects.filter(user=instance).values_list("code", flat=True)
+    _invalidate([_guard_key(code) for code in codes])
+
+
+@receiver([post_save, post_delete], sender=Round, dispatch_uid="patrol_cache_round")
+def _invalidate_round(sender, instance, **kwargs):
+    _invalidate([_round_key(instance.guard_id)])
+
+
+@receiver([post_save, post_delete], sender=Point, dispatch_uid="patrol_cache_point")
+def _invalidate_points(sender, instance, **kwargs):
+    _invalidate([POINTS_CACHE_KEY])
@@ -1,5 +1,29 @@
+import os
+from datetime import timedelta
+
 from myapp.models import Point
 
 
+DEFAULT_FIRE_EXTINGUISHER_WARNING_DAYS = 30
+FIRE_EXTINGUISHER_WARNING_ENV = "FIRE_EXTINGUISHER_WARNING_DAYS"
+
+
 def get_point(point_id: int):
     return Point.objects.get(id=point_id)
+
+
+def get_fire_extinguisher_warning_days() -> int:
+    try:
+        return max(0, int(os.getenv(FIRE_EXTINGUISHER_WARNING_ENV, str(DEFAULT_FIRE_EXTINGUISHER_WARNING_DAYS))))
+    except (TypeError, ValueError):
+        return DEFAULT_FIRE_EXTINGUISHER_WARNING_DAYS
+
+
+def get_expiring_fire_extinguishers(today, warning_days=None):
+    """Огнетушители, срок которых истёк или истекает в ближайшие warning_days (индекс point_type, expiration_date)."""
+    if warning_days is None:
+        warning_days = get_fire_extinguisher_warning_days()
+    return Point.objects.filter(
+        point_type=Point.PointType.FIRE_EXTINGUISHER,
+        expiration_date__lte=today + timedelta(days=warning_days),
+    ).order_by('expiration_date', 'name')
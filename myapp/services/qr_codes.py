@@ -0,0 +1,184 @@
+import hashlib
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import structlog
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from PIL import Image, ImageDraw, ImageFont
+
+from myapp.models import Point, QRCodeS3Storage
+from myapp.services.qr_render import render_qr_png
+
+
+# Меньше этого числа недостающих кодов рендерим в текущем процессе: пул дороже
+QR_PARALLEL_THRESHOLD = 16
+
+# Лист A4 при 300 dpi, сетка 3×4 наклейки
+SHEET_SIZE = (2480, 3508)
+SHEET_MARGIN = 120
+SHEET_COLUMNS = 3
+SHEET_ROWS = 4
+LABEL_FONT_SIZE = 42
+LABEL_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+logger = structlog.get_logger(__name__)
+
+
+def get_qr_code_storage():
+    storage_path = getattr(settings, "QR_CODE_STORAGE", None)
+    if storage_path:
+        return import_string(storage_path)()
+    return QRCodeS3Storage()
+
+
+def _qr_render_workers() -> int:
+    try:
+        return max(1, int(os.getenv("QR_RENDER_WORKERS", str(os.cpu_count() or 1))))
+    except ValueError:
+        return 1
+
+
+def _qr_code_dir(point_id) -> str:
+    return f"points/{point_id}"
+
+
+def qr_code_key(point) -> str:
+    """
+    Ключ PNG в хранилище: id и хеш имени. Переименованная точка получает новый
+    ключ и код перерисовывается, неизменная берётся из кэша.
+    """
+    name_hash = hashlib.sha1(point.name.encode("utf-8")).hexdigest()[:12]
+    return f"{_qr_code_dir(point.id)}/{name_hash}.png"
+
+
+def delete_stale_qr_codes(storage, point_id, keep=None) -> int:
+    """Удаляет PNG точки, кроме ключа keep (старые имена или все коды удалённой точки)."""
+    directory = _qr_code_dir(point_id)
+    try:
+        _, filenames = storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    stale_keys = [f"{directory}/{filename}" for filename in filenames if f"{directory}/{filename}" != keep]
+    for key in stale_keys:
+        storage.delete(key)
+    return len(stale_keys)
+
+
+def _render_many(point_ids) -> list[bytes]:
+    if len(point_ids) < QR_PARALLEL_THRESHOLD:
+        return [render_qr_png(point_id) for point_id in point_ids]
+    # spawn, а не fork: пул создаётся из многопоточного планировщика, а форк копирует
+    # чужие захваченные блокировки (логирование, соединения) в дочерний процесс
+    with ProcessPoolExecutor(
+        max_workers=_qr_render_workers(),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        return list(executor.map(render_qr_png, point_ids, chunksize=8))
+
+
+def get_qr_pngs(points, storage=None) -> dict[int, bytes]:
+    """PNG кодов точек: готовые читаются из хранилища, недостающие рендерятся параллельно и сохраняются."""
+    storage = storage or get_qr_code_storage()
+    pngs = {}
+    missing = []
+    for point in points:
+        key = qr_code_key(point)
+        if storage.exists(key):
+            with storage.open(key, "rb") as cached:
+                pngs[point.id] = cached.read()
+        else:
+            missing.append(point)
+
+    for point, png in zip(missing, _render_many([point.id for point in missing])):
+        key = qr_code_key(point)
+        storage.save(key, ContentFile(png))
+        delete_stale_qr_codes(storage, point.id, keep=key)
+        pngs[point.id] = png
+
+    logger.info("qr_codes_loaded", point_count=len(pngs), rendered_count=len(missing))
+    return pngs
+
+
+def get_qr_png(point, storage=None) -> bytes:
+    return get_qr_pngs([point], storage=storage)[point.id]
+
+
+@receiver(post_delete, sender=Point, dispatch_uid="qr_codes_point_delete")
+def _delete_point_qr_codes(sender, instance, **kwargs):
+    point_id = instance.id
+
+    def delete():
+        try:
+            delete_stale_qr_codes(get_qr_code_storage(), point_id)
+        except Exception:
+            logger.exception("qr_codes_cleanup_failed", point_id=point_id)
+
+    transaction.on_commit(delete)
+
+
+def _label_font():
+    try:
+        return ImageFont.truetype(LABEL_FONT_PATH, LABEL_FONT_SIZE)
+    except OSError:
+        return ImageFont.load_default(size=LABEL_FONT_SIZE)
+
+
+def _sheet_pages(points, pngs):
+    font = _label_font()
+    cell_width = (SHEET_SIZE[0] - 2 * SHEET_MARGIN) // SHEET_COLUMNS
+    cell_height = (SHEET_SIZE[1] - 2 * SHEET_MARGIN) // SHEET_ROWS
+    qr_side = min(cell_width, cell_height - LABEL_FONT_SIZE * 2) - 40
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+
+    if not points:
+        yield Image.new("RGB", SHEET_SIZE, "white")
+    for page_start in range(0, len(points), per_page):
+        page = Image.new("RGB", SHEET_SIZE, "white")
+        draw = ImageDraw.Draw(page)
+        for index, point in enumerate(points[page_start:page_start + per_page]):
+            column, row = index % SHEET_COLUMNS, index // SHEET_COLUMNS
+            left = SHEET_MARGIN + column * cell_width
+            top = SHEET_MARGIN + row * cell_height
+            qr_image = Image.open(BytesIO(pngs[point.id])).convert("RGB").resize((qr_side, qr_side))
+            page.paste(qr_image, (left + (cell_width - qr_side) // 2, top))
+            draw.text(
+                (left + cell_width // 2, top + qr_side + 20),
+                point.name,
+                fill="black",
+                font=font,
+                anchor="ma",
+            )
+        yield page
+
+
+def build_qr_sheet_pdf(points, pngs, output):
+    """
+    Постраничный PDF для печати в output (файл с seek): на листе сетка QR-кодов
+    с подписями. Листы дописываются по одному, в памяти только текущий.
+    """
+    for index, page in enumerate(_sheet_pages(points, pngs)):
+        page.save(output, format="PDF", append=index > 0, resolution=300)
+        page.close()
+
+
+def build_qr_zip(points, pngs) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for point in points:
+            archive.writestr(f"{point.name.replace('/', '_')}_qr.png", pngs[point.id])
+    return buffer.getvalue()
+
+
+def selected_points(point_ids=None):
+    points = Point.objects.order_by("name")
+    if point_ids:
+        points = points.filter(id__in=point_ids)
+    return list(points)
@@ -0,0 +1,17 @@
+"""
+Рендер QR-кода без Django: модуль импортируется в дочерних процессах пула
+(метод запуска spawn), где приложения не настроены.
+"""
+from io import BytesIO
+
+import qrcode
+
+
+QR_BOX_SIZE = 15
+
+
+def render_qr_png(point_id) -> bytes:
+    qr = qrcode.make(str(point_id), box_size=QR_BOX_SIZE)
+    buffer = BytesIO()
+    qr.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+import structlog
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from myapp.excel import fire_extinguishers_filename, write_fire_extinguishers
+from myapp.exports import FORMAT_XLSX, export_guards_stats
+from myapp.models import Guard, ReportJob
+from myapp.services.qr_codes import build_qr_sheet_pdf, build_qr_zip, get_qr_pngs, selected_points
+
+
+DEFAULT_REPORT_CACHE_MINUTES = 15
+REPORT_CACHE_ENV = "REPORT_CACHE_MINUTES"
+# Задание в статусе "running" дольше этого срока считается брошенным упавшим воркером
+REPORT_JOB_STALE_AFTER = timedelta(minutes=15)
+
+logger = structlog.get_logger(__name__)
+
+
+def get_report_cache_minutes() -> int:
+    try:
+        return max(0, int(os.getenv(REPORT_CACHE_ENV, str(DEFAULT_REPORT_CACHE_MINUTES))))
+    except (TypeError, ValueError):
+        return DEFAULT_REPORT_CACHE_MINUTES
+
+
+def _params_hash(report_type: str, params: dict) -> str:
+    payload = json.dumps({"type": report_type, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_report(report_type: str, params: dict, user) -> tuple[ReportJob, bool]:
+    """
+    Ставит отчёт в очередь. Если этот же пользователь уже запросил такой отчёт
+    и он формируется или был готов недавно, возвращает существующее задание
+    (второй элемент — True). Задания других пользователей не переиспользуются:
+    скачать отчёт может только тот, кто его запросил.
+    """
+    params_hash = _params_hash(report_type, params)
+    fresh_since = timezone.now() - timedelta(minutes=get_report_cache_minutes())
+    requested_by = user if user is not None and user.is_authenticated else None
+    existing = (
+        ReportJob.objects.filter(report_type=report_type, params_hash=params_hash, requested_by=requested_by)
+        .filter(
+            Q(status__in=[ReportJob.PENDING, ReportJob.RUNNING])
+            | Q(status=ReportJob.DONE, finished_at__gte=fresh_since)
+        )
+        .order_by("-created_at")
+        .first()
+    )
+    if existing is not None:
+        logger.info("report_job_reused", report_job_id=existing.id, report_type=report_type)
+        return existing, True
+
+    job = ReportJob.objects.create(
+        report_type=report_type,
+        params=params,
+        params_hash=params_hash,
+        requested_by=requested_by,
+    )
+    logger.info("report_job_created", report_job_id=job.id, report_type=report_type, params=params)
+    return job, False
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def _build_guards_stats(params, output) -> str:
+    guards = list(
+        Guard.objects.filter(id__in=params.get("guard_ids", [])).select_related("user").order_by("id")
+    )
+    return export_guards_stats(
+        guards,
+        output,
+        file_format=params.get("format") or FORMAT_XLSX,
+        date_from=_parse_date(params.get("date_from")),
+        date_to=_parse_date(params.get("date_to")),
+        point_ids=params.get("point_ids") or None,
+    )
+
+
+def _build_fire_extinguishers(params, output) -> str:
+    write_fire_extinguishers(output)
+    return fire_extinguishers_filename()
+
+
+def _build_qr_sheet_pdf(params, output) -> str:
+    points = selected_points(params.get("point_ids"))
+    build_qr_sheet_pdf(points, get_qr_pngs(points), output)
+    return f"qr_codes_{timezone.localdate().isoformat()}.pdf"
+
+
+def _build_qr_zip(params, output) -> str:
+    points = selected_points(params.get("point_ids"))
+    output.write(build_qr_zip(points, get_qr_pngs(points)))
+    return f"qr_codes_{timezone.localdate().isoformat()}.zip"
+
+
+REPORT_BUILDERS = {
+    ReportJob.GUARDS_STATS: _build_guards_stats,
+    ReportJob.FIRE_EXTINGUISHERS: _build_fire_extinguishers,
+    ReportJob.QR_SHEET_PDF: _build_qr_sheet_pdf,
+    ReportJob.QR_ZIP: _build_qr_zip,
+}
+
+
+def run_report_job(job: ReportJob) -> ReportJob:
+    builder = REPORT_BUILDERS[job.report_type]
+    try:
+        with tempfile.TemporaryFile() as output:
+            filename = builder(job.params, output)
+            output.seek(0)
+            job.file.save(f"{job.pk}/{filename}", File(output), save=False)
+    except Exception as exc:
+        job.status = ReportJob.FAILED
+        job.error = str(exc)
+        logger.exception("report_job_failed", report_job_id=job.id, report_type=job.report_type)
+    else:
+        job.status = ReportJob.DONE
+        job.filename = filename
+        logger.info("report_job_finished", report_job_id=job.id, report_type=job.report_type)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "file", "filename", "error", "finished_at"])
+    return job
+
+
+def _claim_next_job():
+    stale_before = timezone.now() - REPORT_JOB_STALE_AFTER
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ReportJob.PENDING) | Q(status=ReportJob.RUNNING, started_at__lt=stale_before))
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ReportJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+    return job
+
+
+def process_report_jobs(limit: int = 5) -> int:
+    """Забирает задания из очереди и формирует файлы; возвращает число обработанных."""
+    processed = 0
+    while processed < limit:
+        job = _claim_next_job()
+        if job is None:
+            break
+        run_report_job(job)
+        processed += 1
+    return processed
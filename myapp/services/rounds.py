@@ -1,11 +1,50 @@
-from django.db.models import Count
+from datetime import timedelta
 
-from myapp.models import Round, Guard
+import structlog
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from myapp.models import Round, Guard, Visit
+from myapp.services.patrol_analytics import invalidate_day_coverage
+
+
+DEFAULT_EMPTY_ROUND_BATCH_SIZE = 500
+# Пустые обходы младше этого возраста не трогаем: сотрудник мог только что начать обход
+EMPTY_ROUND_MIN_AGE = timedelta(hours=1)
+
+logger = structlog.get_logger(__name__)
+
+
+def _empty_rounds():
+    return Round.objects.filter(~Exists(Visit.objects.filter(round=OuterRef('pk'))))
 
 
 def deactivate_rounds(guard: Guard):
-    Round.objects.filter(guard=guard).update(is_active=False)
-    Round.objects.annotate(num_visits=Count('visits')).filter(num_visits=0).delete()
+    active_rounds = Round.objects.filter(guard=guard, is_active=True)
+    # update() идёт без сигналов: завершение обхода меняет покрытие дня его начала
+    invalidate_day_coverage(*active_rounds.values_list('created_at', flat=True))
+    active_rounds.update(is_active=False)
+    _empty_rounds().filter(guard=guard).delete()
+
+
+def cleanup_empty_rounds(*, batch_size: int = DEFAULT_EMPTY_ROUND_BATCH_SIZE, now_value=None) -> int:
+    """Удаляет завершённые обходы без посещений пачками по batch_size."""
+    cutoff = (now_value or timezone.now()) - EMPTY_ROUND_MIN_AGE
+    deleted_count = 0
+    while True:
+        round_ids = list(
+            _empty_rounds()
+            .filter(is_active=False, created_at__lt=cutoff)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not round_ids:
+            break
+        Round.objects.filter(id__in=round_ids).delete()
+        deleted_count += len(round_ids)
+
+    logger.info("empty_rounds_cleanup_finished", deleted_count=deleted_count, cutoff=cutoff.isoformat())
+    return deleted_count
 
 
 def create_round(guard: Guard):
@@ -1,4 +1,10 @@
-from myapp.models import Point, Visit, Round, Guard
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from myapp.models import Message, Point, Visit, VisitBatch, Round, Guard
+from myproject.history import bulk_create_with_history
 
 
 def create_visit(round: Round, point: Point):
@@ -7,3 +13,62 @@ def create_visit(round: Round, point: Point):
 
 def get_visit(round: Round, point: Point):
     return Visit.objects.filter(round=round, point=point).order_by('-created_at').first()
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def guard_visit_rows(guard_ids, date_from=None, date_to=None, point_ids=None):
+    """
+    Посещения сотрудников для выгрузок одним запросом: фильтры по дате идут
+    диапазоном по индексу Visit.created_at, а не через __date.
+    Строки: (guard_id, round_id, point_id, point_name, created_at).
+    """
+    visits = Visit.objects.filter(round__guard_id__in=guard_ids)
+    if date_from:
+        visits = visits.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        visits = visits.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+    if point_ids:
+        visits = visits.filter(point_id__in=point_ids)
+    return visits.order_by('round__guard_id', '-round__created_at', '-round_id', '-created_at').values_list(
+        'round__guard_id', 'round_id', 'point_id', 'point__name', 'created_at'
+    )
+
+
+def create_visit_batch(guard_id, round_id, items, idempotency_key) -> tuple[VisitBatch, bool]:
+    """
+    Сохраняет пакет офлайн-сканирований одной транзакцией: посещения и сообщения
+    вставляются bulk_create. Повтор с тем же ключом возвращает уже созданный пакет
+    (второй элемент — False).
+    """
+    existing = VisitBatch.objects.filter(guard_id=guard_id, idempotency_key=idempotency_key).first()
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            batch = VisitBatch.objects.create(
+                guard_id=guard_id,
+                round_id=round_id,
+                idempotency_key=idempotency_key,
+                visit_count=len(items),
+                message_count=sum(1 for item in items if item.get('message')),
+            )
+            visits = bulk_create_with_history(
+                [Visit(round_id=round_id, point_id=item['point_id'], created_at=item['scanned_at'])
+                 for item in items],
+                Visit,
+            )
+            messages = [
+                Message(guard_id=guard_id, visit=visit, text=item['message'])
+                for visit, item in zip(visits, items)
+                if item.get('message')
+            ]
+            if messages:
+                bulk_create_with_history(messages, Message)
+    except IntegrityError:
+        # Параллельный повтор того же пакета успел закоммитить первым
+        return VisitBatch.objects.get(guard_id=guard_id, idempotency_key=idempotency_key), False
+    return batch, True
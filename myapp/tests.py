@@ -1,24 +1,61 @@
+import csv
+import json
 import logging
+import multiprocessing
+import queue
 import tempfile
+import threading
+import time
+import zipfile
 from datetime import date, timedelta
-from io import StringIO
+from io import BytesIO, StringIO
 from pathlib import Path
 from unittest import mock
 
+import openpyxl
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
 from django.core.management import call_command
+from django.db import connection
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from PIL.PdfParser import PdfParser
+from rest_framework.test import APIClient
 
 from myapp.admin import admin as myapp_admin_module
+from myapp.crons import notify_expiring_fire_extinguishers
+from myapp.excel import write_guards_stats
+from myapp.exports import FORMAT_CSV, export_guards_stats
 from myapp.management.commands.run_scheduler import scheduler
-from myapp.models import Device
+from myapp.models import Device, Guard, HistoryArchiveEntry, HistoryArchiveSegment, Message, Point, ReportJob, Round, Visit
 from myapp.scheduler_utils import cleanup_old_job_executions
+from myapp.services import patrol_analytics, patrol_cache
+from myapp.services.history_archive import archive_old_history, read_archived_history
+from myapp.services.qr_codes import build_qr_sheet_pdf, build_qr_zip, get_qr_pngs, qr_code_key
+from myapp.services.reports import process_report_jobs, request_report
+from myapp.services.rounds import cleanup_empty_rounds, deactivate_rounds
+from myapp.services.visits import create_visit_batch
+from myproject.metrics import Counter, Gauge, Histogram, MetricsRegistry
 from myproject.observability import DailyStructuredFileHandler, build_logging_config
 
 
+def _write_json_log_lines(log_dir, worker, count, start):
+    start.wait()
+    handler = DailyStructuredFileHandler(log_dir=log_dir, async_mode=True, batch_size=1)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._today = lambda: date(2026, 3, 22)
+    for index in range(count):
+        # Строки длиннее блока буфера: при блочной записи они разрезались бы посередине
+        message = json.dumps({"worker": worker, "index": index, "payload": "x" * 3000})
+        handler.emit(logging.LogRecord("test", logging.INFO, __file__, 0, message, (), None))
+    handler.close()
+
+
 class DailyStructuredFileHandlerTests(TestCase):
     def test_daily_file_handler_writes_current_day_file_and_cleans_old_ones(self):
         with tempfile.TemporaryDirectory() as tmp_dir:
@@ -53,6 +90,124 @@ class DailyStructuredFileHandlerTests(TestCase):
             self.assertFalse((log_dir / "application-2026-03-01.log").exists())
             self.assertTrue((log_dir / "application-2026-03-08.log").exists())
 
+    def _make_record(self, message):
+        return logging.LogRecord(
+            name="test",
+            level=logging.INFO,
+            pathname=__file__,
+            lineno=1,
+            msg=message,
+            args=(),
+            exc_info=None,
+        )
+
+    def test_async_mode_writes_all_records_in_background_and_drains_on_close(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = DailyStructuredFileHandler(
+                log_dir=tmp_dir,
+                filename_prefix="application",
+                async_mode=True,
+                batch_size=7,
+                flush_interval=0.05,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            handler._today = lambda: date(2026, 3, 22)
+
+            for index in range(50):
+                handler.emit(self._make_record(f"line-{index}"))
+            handler.close()
+
+            lines = (Path(tmp_dir) / "application-2026-03-22.log").read_text(encoding="utf-8").splitlines()
+
+            self.assertEqual(lines, [f"line-{index}" for index in range(50)])
+            self.assertEqual(handler.dropped_count, 0)
+
+    def test_async_mode_drops_records_when_queue_is_full(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = DailyStructuredFileHandler(
+                log_dir=tmp_dir,
+                async_mode=True,
+                max_queue_size=2,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+
+            with mock.patch.object(handler, "_ensure_writer"):
+                handler._queue = queue.Queue(maxsize=handler.max_queue_size)
+                for index in range(5):
+                    handler.emit(self._make_record(f"line-{index}"))
+
+            self.assertEqual(handler._queue.qsize(), 2)
+            self.assertEqual(handler.dropped_count, 3)
+            handler.close()
+
+    def test_concurrent_first_emits_start_single_writer(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = DailyStructuredFileHandler(log_dir=tmp_dir, async_mode=True)
+            barrier = threading.Barrier(8)
+
+            def ensure_writer():
+                barrier.wait()
+                handler._ensure_writer()
+
+            threads = [threading.Thread(target=ensure_writer) for _ in range(8)]
+            with mock.patch("myproject.observability.threading.Thread") as thread_mock:
+                thread_mock.return_value.is_alive.return_value = True
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            thread_mock.assert_called_once()
+            handler._writer = None
+            handler.close()
+
+    def test_fork_flushes_buffer_and_child_reopens_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = DailyStructuredFileHandler(log_dir=tmp_dir, async_mode=True)
+            handler._today = lambda: date(2026, 3, 22)
+            handler._write_batch([(time.time(), "before-fork\n")])
+            inherited_stream = handler._stream
+
+            handler._before_fork()
+            handler._after_fork_in_child()
+            handler._write_batch([(time.time(), "in-child\n")])
+            handler.close()
+
+            self.assertTrue(inherited_stream.closed)
+            lines = (Path(tmp_dir) / "application-2026-03-22.log").read_text(encoding="utf-8").splitlines()
+            self.assertEqual(lines, ["before-fork", "in-child"])
+
+    def test_processes_appending_to_shared_file_keep_lines_whole(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context = multiprocessing.get_context("fork")
+            start = context.Event()
+            processes = [
+                context.Process(target=_write_json_log_lines, args=(tmp_dir, worker, 500, start))
+                for worker in range(4)
+            ]
+            for process in processes:
+                process.start()
+            start.set()
+            for process in processes:
+                process.join()
+
+            lines = (Path(tmp_dir) / "application-2026-03-22.log").read_text(encoding="utf-8").splitlines()
+            records = [json.loads(line) for line in lines]
+            self.assertEqual(len(records), 4 * 500)
+            self.assertEqual({record["worker"] for record in records}, {0, 1, 2, 3})
+
+    def test_records_dropped_by_writer_are_counted_in_metric(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = DailyStructuredFileHandler(log_dir=tmp_dir, filename_prefix="drop-test", async_mode=True)
+
+            with mock.patch.object(handler, "_ensure_stream", side_effect=OSError("disk full")), \
+                    mock.patch("myproject.observability.LOG_RECORDS_DROPPED") as dropped_mock:
+                handler._write_batch([(time.time(), "lost\n")])
+
+            self.assertEqual(handler.dropped_count, 1)
+            dropped_mock.inc.assert_called_once_with(1, handler="drop-test")
+            handler.close()
+
     def test_json_formatter_preserves_unicode_characters(self):
         processor = build_logging_config()["formatters"]["json"]["processor"]
 
@@ -69,6 +224,58 @@ class DailyStructuredFileHandlerTests(TestCase):
         self.assertNotIn("\\u041e", rendered)
 
 
+class MetricsRegistryTests(TestCase):
+    def test_render_outputs_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        requests_total = Counter("test_requests_total", "Test counter", ["route"], registry=registry)
+        latency = Histogram("test_latency_seconds", "Test histogram", registry=registry, buckets=(0.1, 1))
+
+        requests_total.inc(route="api/whoami/")
+        requests_total.inc(2, route="api/whoami/")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+        rendered = registry.render()
+
+        self.assertIn("# TYPE test_requests_total counter", rendered)
+        self.assertIn('test_requests_total{route="api/whoami/"} 3', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', rendered)
+        self.assertIn("test_latency_seconds_count 2", rendered)
+
+    def test_multiprocess_collect_sums_worker_files_and_drops_dead_gauges(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry = MetricsRegistry(multiproc_dir=tmp_dir)
+            requests_total = Counter("test_requests_total", "Test counter", registry=registry)
+            queue_depth = Gauge("test_queue_depth", "Test gauge", registry=registry)
+            requests_total.inc(2)
+            queue_depth.set(4)
+
+            (Path(tmp_dir) / "metrics-999999.json").write_text(
+                '{"test_requests_total": {"kind": "counter", "help": "Test counter", '
+                '"labelnames": [], "samples": [[[], 5]]}, '
+                '"test_queue_depth": {"kind": "gauge", "help": "Test gauge", '
+                '"labelnames": [], "samples": [[[], 3]]}}',
+                encoding="utf-8",
+            )
+            self.assertIn("test_queue_depth 7", registry.render())
+
+            registry.mark_process_dead(999999)
+            rendered = registry.render()
+
+            self.assertIn("test_requests_total 7", rendered)
+            self.assertIn("test_queue_depth 4", rendered)
+
+    def test_metrics_endpoint_exposes_http_metrics(self):
+        self.client.get(reverse("metrics"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response["Content-Type"])
+        self.assertContains(response, 'http_request_duration_seconds_count{method="GET",route="metrics"')
+
+
 class SchedulerAdminTests(TestCase):
     def setUp(self):
         self.superuser = get_user_model().objects.create_superuser(
@@ -271,3 +478,586 @@ class BackfillHistoryCreationCommandTests(TestCase):
 
         self.assertEqual(newest_record.history_type, "~")
         self.assertIn("notification_token", delta.changed_fields)
+
+
+class HistoryArchiveTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.storage = FileSystemStorage(location=self.tmp_dir.name)
+        user = get_user_model().objects.create_user(username="history-archive-user", password="pass")
+        self.guard = Guard.objects.create(user=user)
+
+    def _create_old_round(self):
+        round_obj = Round.objects.create(guard=self.guard)
+        round_obj.is_active = False
+        round_obj.save()
+        round_obj.history.update(history_date=timezone.now() - timedelta(days=400))
+        return round_obj
+
+    def test_archive_moves_old_rows_and_reads_them_back(self):
+        round_obj = self._create_old_round()
+        recent_round = Round.objects.create(guard=self.guard)
+
+        archived = archive_old_history(retention_days=180, batch_size=1, storage=self.storage)
+
+        self.assertEqual(archived["myapp.round"], 2)
+        self.assertFalse(round_obj.history.exists())
+        self.assertTrue(recent_round.history.exists())
+        segments = HistoryArchiveSegment.objects.filter(model_label="myapp.round")
+        self.assertEqual(segments.count(), 2)
+        self.assertTrue(all(self.storage.exists(segment.path) for segment in segments))
+
+        records = read_archived_history(Round, str(round_obj.pk), storage=self.storage)
+        self.assertEqual([record.history_type for record in records], ["~", "+"])
+        self.assertFalse(records[0].is_active)
+        self.assertEqual(records[0].guard_id, self.guard.pk)
+
+    def test_backfill_skips_objects_with_archived_creation_row(self):
+        round_obj = self._create_old_round()
+        archive_old_history(retention_days=180, storage=self.storage)
+        round_obj.is_active = True
+        round_obj.save()
+
+        call_command("backfill_history_creation", model_labels=["myapp.Round"], stdout=StringIO())
+
+        self.assertFalse(round_obj.history.filter(history_type="+").exists())
+
+    def test_read_only_opens_segments_containing_the_object(self):
+        first, middle, last = [Round.objects.create(guard=self.guard) for _ in range(3)]
+        for round_obj in (first, last):
+            round_obj.is_active = False
+            round_obj.save()
+        Round.history.update(history_date=timezone.now() - timedelta(days=400))
+        # Пачки по 2: [first+, middle+], [last+, first~], [last~] — диапазон второй покрывает middle
+        archive_old_history(retention_days=180, batch_size=2, storage=self.storage)
+
+        with mock.patch.object(self.storage, "open", wraps=self.storage.open) as open_mock:
+            records = read_archived_history(Round, middle.pk, storage=self.storage)
+
+        self.assertEqual([record.history_type for record in records], ["+"])
+        self.assertEqual(open_mock.call_count, 1)
+
+    def test_backfill_fills_gaps_of_objects_below_archived_ids(self):
+        missing_round = Round.objects.create(guard=self.guard)
+        missing_round.history.all().delete()
+        archived_round = self._create_old_round()
+        archive_old_history(retention_days=180, storage=self.storage)
+        archived_round.save()
+
+        call_command("backfill_history_creation", model_labels=["myapp.Round"], stdout=StringIO())
+
+        self.assertTrue(missing_round.history.filter(history_type="+").exists())
+        self.assertFalse(archived_round.history.filter(history_type="+").exists())
+
+    def test_unindexed_segments_are_indexed_by_command(self):
+        round_obj = self._create_old_round()
+        archive_old_history(retention_days=180, storage=self.storage)
+        HistoryArchiveEntry.objects.all().delete()
+        HistoryArchiveSegment.objects.update(is_indexed=False)
+
+        self.assertEqual(len(read_archived_history(Round, round_obj.pk, storage=self.storage)), 2)
+        with mock.patch("myapp.services.history_archive.get_history_archive_storage", return_value=self.storage):
+            call_command("index_history_archive", stdout=StringIO())
+
+        entry = HistoryArchiveEntry.objects.get(object_id=round_obj.pk)
+        self.assertTrue(entry.has_creation)
+        self.assertTrue(entry.segment.is_indexed)
+
+    def test_admin_history_merges_live_and_archived_rows(self):
+        round_obj = self._create_old_round()
+        archive_old_history(retention_days=180, storage=self.storage)
+        round_obj.is_active = True
+        round_obj.save()
+        round_admin = myapp_admin_module.site._registry[Round]
+
+        with mock.patch("myapp.services.history_archive.get_history_archive_storage", return_value=self.storage):
+            records = round_admin.get_history_queryset(
+                RequestFactory().get("/"), Round.history, "id", str(round_obj.pk)
+            )
+
+        self.assertEqual([record.history_type for record in records], ["~", "~", "+"])
+        self.assertTrue(records[0].is_active)
+        self.assertFalse(records[1].is_active)
+
+    def test_scheduler_registers_history_archive_job(self):
+        self.assertIsNotNone(scheduler.get_job("archive_old_history"))
+
+
+class GuardsStatsExportTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="export-guard", password="pass", first_name="Иван", last_name="Петров"
+        )
+        self.guard = Guard.objects.create(user=user)
+        self.points = [Point.objects.create(name=f"Точка {index}") for index in range(2)]
+
+    def test_export_streams_rounds_with_constant_query_count(self):
+        empty_round = Round.objects.create(guard=self.guard)
+        full_round = Round.objects.create(guard=self.guard)
+        for point in self.points:
+            Visit.objects.create(point=point, round=full_round)
+
+        guards = list(Guard.objects.filter(pk=self.guard.pk).select_related("user"))
+        output = BytesIO()
+        with CaptureQueriesContext(connection) as ctx:
+            write_guards_stats(guards, output)
+
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        rows = list(openpyxl.load_workbook(BytesIO(output.getvalue())).active.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ("id обхода", "Точка обхода", "Время обхода"))
+        self.assertEqual(
+            [row[:2] for row in rows[1:]],
+            [
+                (full_round.id, "Точка 1"),
+                (full_round.id, "Точка 0"),
+                (" ", None),
+            ],
+        )
+        self.assertNotIn(empty_round.id, [row[0] for row in rows])
+
+    def test_csv_export_applies_date_and_point_filters(self):
+        round_obj = Round.objects.create(guard=self.guard)
+        for point in self.points:
+            Visit.objects.create(point=point, round=round_obj)
+        old_visit = Visit.objects.create(point=self.points[0], round=round_obj)
+        Visit.objects.filter(pk=old_visit.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+        output = BytesIO()
+        filename = export_guards_stats(
+            [self.guard],
+            output,
+            file_format=FORMAT_CSV,
+            date_from=timezone.localdate() - timedelta(days=7),
+            point_ids=[self.points[0].id],
+        )
+
+        rows = list(csv.reader(StringIO(output.getvalue().decode("utf-8-sig"))))
+        self.assertTrue(filename.endswith(".csv"))
+        self.assertEqual(rows[0], ["guard_id", "guard_name", "round_id", "point_id", "point_name", "visited_at"])
+        self.assertEqual([row[4] for row in rows[1:]], ["Точка 0"])
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        storage_patcher = mock.patch.object(
+            ReportJob._meta.get_field("file"), "storage", FileSystemStorage(location=self.tmp_dir.name)
+        )
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+        self.superuser = get_user_model().objects.create_superuser(
+            username="report-admin", password="pass", email="report-admin@example.com"
+        )
+        self.guard = Guard.objects.create(user=self.superuser)
+        round_obj = Round.objects.create(guard=self.guard)
+        Visit.objects.create(point=Point.objects.create(name="Отчётная точка"), round=round_obj)
+
+    def test_identical_recent_report_is_reused(self):
+        params = {"guard_ids": [self.guard.id], "date_from": None, "date_to": None}
+        job, reused = request_report(ReportJob.GUARDS_STATS, params, self.superuser)
+        self.assertFalse(reused)
+
+        process_report_jobs()
+        same_job, reused = request_report(ReportJob.GUARDS_STATS, dict(params), self.superuser)
+        other_job, other_reused = request_report(
+            ReportJob.GUARDS_STATS, {**params, "date_from": "2020-01-01"}, self.superuser
+        )
+
+        self.assertTrue(reused)
+        self.assertEqual(same_job.id, job.id)
+        self.assertFalse(other_reused)
+        self.assertNotEqual(other_job.id, job.id)
+
+    def test_report_of_another_manager_is_not_reused(self):
+        other_manager = get_user_model().objects.create_user(username="report-manager", password="pass",
+                                                             is_staff=True)
+        job, _ = request_report(ReportJob.FIRE_EXTINGUISHERS, {}, self.superuser)
+
+        other_job, reused = request_report(ReportJob.FIRE_EXTINGUISHERS, {}, other_manager)
+
+        self.assertFalse(reused)
+        self.assertNotEqual(other_job.id, job.id)
+        self.assertEqual(other_job.requested_by, other_manager)
+
+    def test_admin_export_creates_job_and_downloads_generated_file(self):
+        self.client.force_login(self.superuser)
+
+        response = self.client.post(reverse("admin:guards_stats"), {"guards": self.guard.id})
+        job = ReportJob.objects.get()
+        self.assertRedirects(response, reverse("admin:report_job_status", kwargs={"job_id": job.id}))
+        self.assertEqual(self.client.get(reverse("admin:report_job_download", kwargs={"job_id": job.id})).status_code, 404)
+
+        self.assertEqual(process_report_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.DONE)
+
+        response = self.client.get(reverse("admin:report_job_download", kwargs={"job_id": job.id}))
+        content = b"".join(response.streaming_content)
+        rows = list(openpyxl.load_workbook(BytesIO(content)).active.iter_rows(values_only=True))
+        self.assertEqual(rows[1][1], "Отчётная точка")
+
+
+class PatrolCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = get_user_model().objects.create_user(username="patrol-guard", password="pass")
+        self.guard = Guard.objects.create(user=user)
+        self.point = Point.objects.create(name="Проходная")
+
+    def _visit(self, point_id):
+        return self.client.post(
+            reverse("visit-point", kwargs={"guard_id": self.guard.code, "point_id": point_id})
+        )
+
+    def test_warm_visit_scan_skips_lookup_queries(self):
+        self.client.post(reverse("start-round", kwargs={"guard_id": self.guard.code}))
+        self.assertEqual(self._visit(self.point.id).status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._visit(self.point.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["point"]["name"], "Проходная")
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(selects, [])
+        self.assertEqual(Visit.objects.filter(round__guard=self.guard).count(), 2)
+
+    def test_saves_invalidate_round_and_point_cache(self):
+        self.assertEqual(self._visit(self.point.id).status_code, 400)
+
+        self.client.post(reverse("start-round", kwargs={"guard_id": self.guard.code}))
+        new_point = Point.objects.create(name="Склад")
+
+        self.assertEqual(self._visit(new_point.id).status_code, 200)
+        latest_round = Round.objects.filter(guard=self.guard).latest("created_at")
+        self.assertEqual(latest_round.visits.get().point_id, new_point.id)
+
+    def test_user_save_checks_guards_only_on_name_change(self):
+        self.assertEqual(self._visit(self.point.id).status_code, 400)
+        guard_key = patrol_cache._guard_key(self.guard.code)
+        self.assertIsNotNone(cache.get(guard_key))
+
+        user = get_user_model().objects.get(pk=self.guard.user_id)
+        with CaptureQueriesContext(connection) as ctx:
+            user.save(update_fields=["last_login"])
+            user.save()
+        self.assertFalse(any("myapp_guard" in q["sql"] for q in ctx.captured_queries))
+        self.assertIsNotNone(cache.get(guard_key))
+
+        user.last_name = "Петров"
+        user.save()
+        self.assertIsNone(cache.get(guard_key))
+
+
+class VisitBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = get_user_model().objects.create_user(username="batch-guard", password="pass")
+        self.guard = Guard.objects.create(user=user)
+        self.round = Round.objects.create(guard=self.guard)
+        self.points = [Point.objects.create(name=f"Подвал {index}") for index in range(2)]
+        self.url = reverse("visit-batch", kwargs={"guard_id": self.guard.code})
+
+    def _payload(self, key="batch-1"):
+        started = int(timezone.now().timestamp()) - 600
+        return {
+            "idempotency_key": key,
+            "visits": [
+                {"point_id": self.points[0].id, "scanned_at": started},
+                {"point_id": self.points[1].id, "scanned_at": started + 60, "message": "Протечка"},
+            ],
+        }
+
+    def test_batch_creates_visits_and_messages_once(self):
+        response = self.client.post(self.url, self._payload(), content_type="application/json")
+        retry = self.client.post(self.url, self._payload(), content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(retry.status_code, 200)
+        self.assertTrue(retry.json()["duplicate"])
+        visits = list(self.round.visits.order_by("created_at"))
+        self.assertEqual([visit.point_id for visit in visits], [point.id for point in self.points])
+        self.assertEqual(int(visits[0].created_at.timestamp()), self._payload()["visits"][0]["scanned_at"])
+        self.assertEqual(list(Message.objects.values_list("visit_id", "text")), [(visits[1].id, "Протечка")])
+
+    def test_batch_rejects_unknown_point(self):
+        payload = self._payload()
+        payload["visits"][1]["point_id"] = 999999
+
+        response = self.client.post(self.url, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("visits", response.json()["errors"])
+        self.assertFalse(Visit.objects.exists())
+
+
+class RoundCleanupTests(TestCase):
+    def setUp(self):
+        self.guards = [
+            Guard.objects.create(user=get_user_model().objects.create_user(username=f"cleanup-{index}", password="pass"))
+            for index in range(2)
+        ]
+        self.point = Point.objects.create(name="Котельная")
+
+    def test_deactivate_rounds_only_cleans_own_empty_rounds(self):
+        own_empty = Round.objects.create(guard=self.guards[0])
+        own_visited = Round.objects.create(guard=self.guards[0])
+        Visit.objects.create(point=self.point, round=own_visited)
+        other_empty = Round.objects.create(guard=self.guards[1])
+
+        deactivate_rounds(self.guards[0])
+
+        self.assertFalse(Round.objects.filter(pk=own_empty.pk).exists())
+        self.assertFalse(Round.objects.get(pk=own_visited.pk).is_active)
+        self.assertTrue(Round.objects.filter(pk=other_empty.pk).exists())
+
+    def test_cleanup_empty_rounds_deletes_old_inactive_rounds_in_batches(self):
+        old_rounds = [Round.objects.create(guard=self.guards[1], is_active=False) for _ in range(3)]
+        Round.objects.filter(pk__in=[r.pk for r in old_rounds]).update(created_at=timezone.now() - timedelta(days=1))
+        active_empty = Round.objects.create(guard=self.guards[1])
+
+        self.assertEqual(cleanup_empty_rounds(batch_size=2), 3)
+        self.assertEqual(list(Round.objects.values_list("pk", flat=True)), [active_empty.pk])
+
+
+class PatrolCoverageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.manager = get_user_model().objects.create_superuser(
+            username="coverage-admin", password="pass", email="coverage@example.com"
+        )
+        self.guard = Guard.objects.create(user=self.manager)
+        self.points = [Point.objects.create(name=f"Пост {index}") for index in range(3)]
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.manager)
+
+    def test_coverage_reports_duration_gaps_and_missed_points(self):
+        started_at = timezone.now().replace(microsecond=0) - timedelta(hours=2)
+        round_obj = Round.objects.create(guard=self.guard, is_active=False)
+        Round.objects.filter(pk=round_obj.pk).update(created_at=started_at)
+        Visit.objects.create(point=self.points[0], round=round_obj, created_at=started_at + timedelta(minutes=5))
+        Visit.objects.create(point=self.points[1], round=round_obj, created_at=started_at + timedelta(minutes=25))
+
+        response = self.api_client.get(reverse("patrol-coverage"), {"date": timezone.localdate(started_at).isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["expected_point_count"], 3)
+        [round_data] = data["rounds"]
+        self.assertEqual(round_data["duration_seconds"], 25 * 60)
+        self.assertEqual(round_data["max_gap_seconds"], 20 * 60)
+        self.assertEqual(round_data["visited_point_count"], 2)
+        self.assertEqual(round_data["missed_point_ids"], [self.points[2].id])
+        last_visits = {point["point_id"]: point["last_visit_at"] for point in data["points"]}
+        self.assertIsNone(last_visits[self.points[2].id])
+        self.assertIsNotNone(last_visits[self.points[1].id])
+
+    def test_manager_without_guards_gets_empty_report_and_others_are_forbidden(self):
+        manager = get_user_model().objects.create_user(username="coverage-manager", password="pass")
+        manager.groups.add(Group.objects.get_or_create(name="qr_manager")[0])
+        self._old_round(0)
+        self.api_client.force_authenticate(manager)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api_client.get(reverse("patrol-coverage"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rounds"], [])
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "myapp_guard"' in q["sql"]]), 1)
+
+        self.api_client.force_authenticate(get_user_model().objects.create_user(username="coverage-nobody"))
+        self.assertEqual(self.api_client.get(reverse("patrol-coverage")).status_code, 403)
+
+    def _old_round(self, days_ago, **kwargs):
+        started_at = timezone.now().replace(microsecond=0) - timedelta(days=days_ago)
+        round_obj = Round.objects.create(guard=self.guard, **kwargs)
+        Round.objects.filter(pk=round_obj.pk).update(created_at=started_at)
+        round_obj.refresh_from_db()
+        Visit.objects.create(point=self.points[0], round=round_obj, created_at=started_at + timedelta(minutes=5))
+        return round_obj
+
+    def _coverage(self, day):
+        return self.api_client.get(reverse("patrol-coverage"), {"date": day.isoformat()}).json()
+
+    def test_closed_day_is_served_from_cache(self):
+        day = timezone.localdate() - timedelta(days=3)
+        self._coverage(day)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._coverage(day)
+
+        self.assertFalse([q for q in ctx.captured_queries if "myapp_visit" in q["sql"]])
+
+    def test_day_with_active_round_is_not_closed(self):
+        round_obj = self._old_round(3)
+        day = timezone.localdate(round_obj.created_at)
+
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self._coverage(day)
+
+        cache_set.assert_any_call(mock.ANY, mock.ANY, patrol_analytics.OPEN_DAY_CACHE_TIMEOUT)
+
+    def test_late_changes_invalidate_closed_day(self):
+        round_obj = self._old_round(3, is_active=False)
+        day = timezone.localdate(round_obj.created_at)
+        self.assertEqual(self._coverage(day)["rounds"][0]["visited_point_ids"], [self.points[0].id])
+
+        create_visit_batch(self.guard.id, round_obj.id, [
+            {"point_id": self.points[1].id, "scanned_at": round_obj.created_at + timedelta(minutes=10)},
+        ], "late-batch")
+        self.assertEqual(
+            self._coverage(day)["rounds"][0]["visited_point_ids"], [self.points[0].id, self.points[1].id]
+        )
+
+        round_obj.delete()
+        self.assertEqual(self._coverage(day)["rounds"], [])
+
+    def test_deactivating_round_invalidates_its_day(self):
+        round_obj = self._old_round(3)
+        day = timezone.localdate(round_obj.created_at)
+        self.assertIsNone(self._coverage(day)["rounds"][0]["finished_at"])
+
+        deactivate_rounds(self.guard)
+
+        self.assertIsNotNone(self._coverage(day)["rounds"][0]["finished_at"])
+
+
+class QRCodeBatchTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.storage = FileSystemStorage(location=self.tmp_dir.name)
+        self.points = [Point.objects.create(name=f"Этаж {index}") for index in range(14)]
+
+    def test_pngs_are_rendered_in_parallel_once_and_rerendered_after_rename(self):
+        with mock.patch("myapp.services.qr_codes.QR_PARALLEL_THRESHOLD", 2):
+            first = get_qr_pngs(self.points, storage=self.storage)
+
+        with mock.patch("myapp.services.qr_codes.render_qr_png") as render_mock:
+            self.assertEqual(get_qr_pngs(self.points, storage=self.storage), first)
+            render_mock.assert_not_called()
+
+        point = self.points[0]
+        point.name = "Этаж 0 (новый)"
+        point.save()
+        with mock.patch("myapp.services.qr_codes.render_qr_png", return_value=b"png") as render_mock:
+            get_qr_pngs(self.points, storage=self.storage)
+        render_mock.assert_called_once_with(point.id)
+        self.assertEqual(self.storage.listdir(f"points/{point.id}")[1], [qr_code_key(point).rsplit("/", 1)[1]])
+
+    def test_deleted_point_codes_are_removed_after_commit(self):
+        point = self.points[0]
+        point_id = point.id
+        get_qr_pngs([point], storage=self.storage)
+
+        with mock.patch("myapp.services.qr_codes.get_qr_code_storage", return_value=self.storage):
+            with self.captureOnCommitCallbacks(execute=True):
+                point.delete()
+
+        self.assertEqual(self.storage.listdir(f"points/{point_id}")[1], [])
+
+    def test_sheet_pdf_is_paginated_and_zip_contains_every_point(self):
+        pngs = get_qr_pngs(self.points, storage=self.storage)
+
+        output = BytesIO()
+        build_qr_sheet_pdf(self.points, pngs, output)
+        archive = zipfile.ZipFile(BytesIO(build_qr_zip(self.points, pngs)))
+
+        self.assertTrue(output.getvalue().startswith(b"%PDF"))
+        self.assertEqual(len(PdfParser(buf=output.getvalue()).pages), 2)
+        self.assertEqual(len(archive.namelist()), len(self.points))
+
+
+class FireExtinguisherExpiryTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        self.manager = get_user_model().objects.create_user(username="qr-manager", password="pass")
+        self.manager.groups.add(Group.objects.get_or_create(name="qr_manager")[0])
+        get_user_model().objects.create_user(username="no-group", password="pass")
+        for name, expires in [("Склад", date(2026, 3, 1)), ("Холл", date(2026, 3, 20)), ("Крыша", date(2026, 6, 1))]:
+            Point.objects.create(name=name, point_type=Point.PointType.FIRE_EXTINGUISHER, expiration_date=expires)
+        Point.objects.create(name="Проходная")
+
+    def test_single_grouped_digest_is_sent_to_qr_managers(self):
+        with mock.patch("myapp.crons.notify_users") as notify_mock:
+            self.assertEqual(notify_expiring_fire_extinguishers(self.today), 1)
+
+        notify_mock.assert_called_once()
+        users, _title, text, _source = notify_mock.call_args.args
+        self.assertEqual(users, [self.manager])
+        self.assertIn("Срок истёк (1):\nСклад — 01.03.2026", text)
+        self.assertIn("(1):\nХолл — 20.03.2026", text)
+        self.assertNotIn("Крыша", text)
+
+    def test_nothing_is_sent_when_no_extinguisher_expires(self):
+        with mock.patch("myapp.crons.notify_users") as notify_mock:
+            self.assertEqual(notify_expiring_fire_extinguishers(date(2025, 1, 1)), 0)
+
+        notify_mock.assert_not_called()
+
+
+class ManagerInboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.manager = get_user_model().objects.create_user(username="inbox-manager", password="pass")
+        self.manager.groups.add(Group.objects.get_or_create(name="qr_manager")[0])
+        self.own_guard = Guard.objects.create(user=get_user_model().objects.create_user(username="inbox-own"))
+        self.own_guard.managers.add(self.manager)
+        self.other_guard = Guard.objects.create(user=get_user_model().objects.create_user(username="inbox-other"))
+        point = Point.objects.create(name="Шлагбаум")
+        self.own_visit = Visit.objects.create(point=point, round=Round.objects.create(guard=self.own_guard))
+        other_visit = Visit.objects.create(point=point, round=Round.objects.create(guard=self.other_guard))
+        self.own_message = Message.objects.create(guard=self.own_guard, visit=self.own_visit, text="Открыто")
+        Message.objects.create(guard=self.other_guard, visit=other_visit, text="Разбито")
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.manager)
+
+    def test_counts_are_scoped_to_manager_and_served_from_cache(self):
+        response = self.api_client.get(reverse("manager-inbox"))
+        self.assertEqual(response.json()["unread_count"], 1)
+        self.assertEqual(response.json()["guards"], [{"guard_id": self.own_guard.id, "unread_count": 1}])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.api_client.get(reverse("manager-inbox"))
+        self.assertFalse([q for q in ctx.captured_queries if "myapp_message" in q["sql"]])
+
+    def test_counts_follow_new_seen_messages_and_guard_assignment(self):
+        self.api_client.get(reverse("manager-inbox"))
+
+        Message.objects.create(guard=self.own_guard, visit=self.own_visit, text="Ещё")
+        self.own_message.is_seen = True
+        self.own_message.save()
+        self.other_guard.managers.add(self.manager)
+
+        self.assertEqual(self.api_client.get(reverse("manager-inbox")).json()["unread_count"], 2)
+
+    def test_messages_from_offline_batch_are_counted(self):
+        self.assertEqual(self.api_client.get(reverse("manager-inbox")).json()["unread_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("visit-batch", kwargs={"guard_id": self.own_guard.code}),
+                {
+                    "idempotency_key": "inbox-batch",
+                    "visits": [{
+                        "point_id": self.own_visit.point_id,
+                        "scanned_at": int(timezone.now().timestamp()) - 60,
+                        "message": "Протечка",
+                    }],
+                },
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.api_client.get(reverse("manager-inbox")).json()["unread_count"], 2)
+
+    def test_user_without_manager_group_is_forbidden(self):
+        self.api_client.force_authenticate(self.own_guard.user)
+
+        self.assertEqual(self.api_client.get(reverse("manager-inbox")).status_code, 403)
@@ -1,10 +1,11 @@
 from django.urls import path
 
+from myapp.views.analytics import PatrolCoverageView
 from myapp.views.auth import UserInfo, RegisterNotificationToken
 from myapp.views.guards import GuardView
-from myapp.views.messages import PointMessageView
+from myapp.views.messages import ManagerInboxView, PointMessageView
 from myapp.views.rounds import StartRoundView, EndRoundView, RoundStatusView
-from myapp.views.visits import VisitPointsView
+from myapp.views.visits import VisitBatchView, VisitPointsView
 
 urlpatterns = [
     path('whoami', UserInfo.as_view(), name='whoami'),  # надо убрать после перехода на веб версию
@@ -26,4 +27,8 @@ urlpatterns = [
     path('guard/<int:guard_id>/visit_point/<int:point_id>/', VisitPointsView.as_view(), name='visit-point'),
     path('guard/<int:guard_id>/visit_point/<int:point_id>/add_message', PointMessageView.as_view(), name='add-message'), # надо убрать после перехода на веб версию
     path('guard/<int:guard_id>/visit_point/<int:point_id>/add_message/', PointMessageView.as_view(), name='add-message'),
+    path('guard/<int:guard_id>/visits/batch/', VisitBatchView.as_view(), name='visit-batch'),
+
+    path('manager/inbox/', ManagerInboxView.as_view(), name='manager-inbox'),
+    path('patrol/coverage/', PatrolCoverageView.as_view(), name='patrol-coverage'),
 ]
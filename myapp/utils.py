@@ -5,6 +5,7 @@ from django.core.management import call_command
 from pyfcm import FCMNotification
 
 from myapp.models import Device
+from myproject.metrics import track_provider_call
 from myproject.settings import AUTH_USER_MODEL
 
 
@@ -16,11 +17,16 @@ def telegram_notification(tg_user_id, message):
     Отправить уведомление пользователю через вашу management-команду.
     """
     logger.info("telegram_notification_send_started", telegram_user_id=tg_user_id)
-    call_command('sendnotification', str(tg_user_id), message)
+    with track_provider_call("telegram"):
+        call_command('sendnotification', str(tg_user_id), message)
     logger.info("telegram_notification_send_finished", telegram_user_id=tg_user_id)
 
 
-def send_fcm_notification(user: AUTH_USER_MODEL, title, body, data=None):
+def send_fcm_notification(user: AUTH_USER_MODEL, title, body, data=None) -> bool:
+    """
+    Отправляет push через FCM, при ошибке или без устройства — в Telegram.
+    Возвращает True, если уведомление ушло хотя бы по одному каналу.
+    """
     try:
         fcm = FCMNotification(service_account_file=os.getenv('PATH_TO_GOOGLE_OAUTH_TOKEN'),
                             project_id=os.getenv('FIREBASE_PROJECT_ID'))
@@ -31,30 +37,31 @@ def send_fcm_notification(user: AUTH_USER_MODEL, title, body, data=None):
                 user_id=user.id,
                 notification_title=title,
             )
-            result = fcm.notify(
-                fcm_token=user.device.notification_token,
-                notification_title=title,
-                notification_body=body,
-                webpush_config={
-                    "fcm_options": {
-                        "link": "https://web.appsostra.ru/#/notifications"
+            with track_provider_call("fcm"):
+                result = fcm.notify(
+                    fcm_token=user.device.notification_token,
+                    notification_title=title,
+                    notification_body=body,
+                    webpush_config={
+                        "fcm_options": {
+                            "link": "https://web.appsostra.ru/#/notifications"
+                        },
+                        "notification": {
+                            "title": title,
+                            "body": body,
+                            # "icon": "https://appsostra.ru/icons/icon-192.png",
+                            # "badge": "https://appsostra.ru/icons/badge.png",
+                        },
                     },
-                    "notification": {
-                        "title": title,
-                        "body": body,
-                        # "icon": "https://appsostra.ru/icons/icon-192.png",
-                        # "badge": "https://appsostra.ru/icons/badge.png",
-                    },
-                },
-            )
+                )
             logger.info(
                 "fcm_notification_send_finished",
                 user_id=user.id,
                 notification_title=title,
                 provider_response=result,
             )
-            return result
-    except Exception as e:
+            return True
+    except Exception:
         logger.exception(
             "fcm_notification_send_failed",
             user_id=user.id,
@@ -69,3 +76,7 @@ def send_fcm_notification(user: AUTH_USER_MODEL, title, body, data=None):
             notification_title=title,
         )
         telegram_notification(user.telegram_user_id, title + '\n\n' + body)
+        return True
+
+    logger.warning("notification_not_delivered", user_id=user.id, notification_title=title)
+    return False
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from myapp.serializers import SuccessJsonResponse
+from myapp.services.guards import get_manager_guards
+from myapp.services.manager_scope import get_manager_scope
+from myapp.services.patrol_analytics import patrol_coverage
+
+
+class PatrolCoverageView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            day = date.fromisoformat(request.query_params['date']) if 'date' in request.query_params \
+                else timezone.localdate()
+        except ValueError:
+            return SuccessJsonResponse(success=False, status=status.HTTP_400_BAD_REQUEST)
+
+        # Права — по роли: менеджер без закреплённых сотрудников получает пустой отчёт
+        if get_manager_scope(request.user) is None:
+            return SuccessJsonResponse(success=False, status=status.HTTP_403_FORBIDDEN)
+        guards = get_manager_guards(request.user).select_related('user')
+        guard_id = request.query_params.get('guard')
+        if guard_id:
+            if not guard_id.isdigit():
+                return SuccessJsonResponse(success=False, status=status.HTTP_400_BAD_REQUEST)
+            guards = guards.filter(id=guard_id)
+
+        return SuccessJsonResponse(data=patrol_coverage(day, list(guards)), status=status.HTTP_200_OK)
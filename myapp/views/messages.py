@@ -1,23 +1,43 @@
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from myapp.models import Guard, Round
 from myapp.serializers import SuccessJsonResponse
-from myapp.services.guards import get_guard
+from myapp.services.inbox import get_unread_counts
 from myapp.services.messages import create_message
-from myapp.services.points import get_point
-from myapp.services.rounds import get_latest_round
+from myapp.services.patrol_cache import get_cached_point, get_patrol_session
 from myapp.services.visits import get_visit
 
 
 class PointMessageView(APIView):
     def post(self, request, guard_id, point_id):
         try:
-            guard = get_guard(guard_id)
-            round = get_latest_round(guard)
-            point = get_point(point_id)
-            visit = get_visit(round, point)
+            session = get_patrol_session(guard_id)
+            if session.round_id is None:
+                raise Round.DoesNotExist
+            point = get_cached_point(point_id)
+            visit = get_visit(Round(id=session.round_id, guard_id=session.guard_id), point)
             text = request.data.get('text')
-            create_message(guard, visit, text)
+            create_message(Guard(id=session.guard_id, code=session.code), visit, text)
             return SuccessJsonResponse(status=status.HTTP_200_OK)
         except (Exception,) as e:
             return SuccessJsonResponse(success=False, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ManagerInboxView(APIView):
+    """Счётчики непрочитанных сообщений для опроса из приложения менеджера."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        counts = get_unread_counts(request.user)
+        if counts is None:
+            return SuccessJsonResponse(success=False, status=status.HTTP_403_FORBIDDEN)
+        return SuccessJsonResponse(data={
+            'unread_count': sum(counts.values()),
+            'guards': [
+                {'guard_id': guard_id, 'unread_count': unread} for guard_id, unread in sorted(counts.items())
+            ],
+        }, status=status.HTTP_200_OK)
@@ -3,14 +3,14 @@ from rest_framework.views import APIView
 
 from myapp.models import Round
 from myapp.serializers import RoundSerializer, SuccessJsonResponse
-from myapp.services.guards import get_guard
-from myapp.services.rounds import deactivate_rounds, create_round, get_latest_round
+from myapp.services.patrol_cache import get_cached_guard, get_patrol_session
+from myapp.services.rounds import deactivate_rounds, create_round
 
 
 class StartRoundView(APIView):
     def post(self, request, guard_id):
         try:
-            guard = get_guard(guard_id)
+            guard = get_cached_guard(guard_id)
             deactivate_rounds(guard)
             create_round(guard)
             return SuccessJsonResponse(status=status.HTTP_200_OK)
@@ -21,7 +21,7 @@ class StartRoundView(APIView):
 class EndRoundView(APIView):
     def post(self, request, guard_id):
         try:
-            guard = get_guard(guard_id)
+            guard = get_cached_guard(guard_id)
             deactivate_rounds(guard)
             return SuccessJsonResponse(status=status.HTTP_200_OK)
         except (Exception,) as e:
@@ -31,9 +31,9 @@ class EndRoundView(APIView):
 class RoundStatusView(APIView):
     def get(self, request, guard_id):
         try:
-            guard = get_guard(guard_id)
+            session = get_patrol_session(guard_id)
             try:
-                round = get_latest_round(guard)
+                round = Round.objects.prefetch_related('visits__point').get(id=session.round_id)
                 serializer = RoundSerializer(round)
                 return SuccessJsonResponse(data=serializer.data, status=status.HTTP_200_OK)
             except (Exception,) as e:
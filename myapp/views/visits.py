@@ -1,21 +1,59 @@
 from rest_framework import status
 from rest_framework.views import APIView
 
-from myapp.serializers import SuccessJsonResponse, VisitSerializer
-from myapp.services.guards import get_guard
-from myapp.services.points import get_point
-from myapp.services.rounds import get_latest_round
-from myapp.services.visits import create_visit
+from myapp.models import Round
+from myapp.serializers import SuccessJsonResponse, VisitBatchSerializer, VisitSerializer
+from myapp.services.patrol_cache import get_cached_point, get_cached_points, get_patrol_session
+from myapp.services.visits import create_visit, create_visit_batch
 
 
 class VisitPointsView(APIView):
     def post(self, request, guard_id, point_id):
         try:
-            guard = get_guard(guard_id)
-            round = get_latest_round(guard)
-            point = get_point(point_id)
-            visit = create_visit(round, point)
+            session = get_patrol_session(guard_id)
+            if session.round_id is None:
+                raise Round.DoesNotExist
+            point = get_cached_point(point_id)
+            visit = create_visit(Round(id=session.round_id, guard_id=session.guard_id), point)
             serializer = VisitSerializer(visit)
             return SuccessJsonResponse(data=serializer.data, status=status.HTTP_200_OK)
         except (Exception,) as e:
             return SuccessJsonResponse(success=False, status=status.HTTP_400_BAD_REQUEST)
+
+
+class VisitBatchView(APIView):
+    """Пакетная загрузка посещений, накопленных устройством без связи."""
+
+    def post(self, request, guard_id):
+        try:
+            session = get_patrol_session(guard_id)
+        except (Exception,) as e:
+            return SuccessJsonResponse(success=False, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = VisitBatchSerializer(data=request.data, context={'points': get_cached_points()})
+        if not serializer.is_valid():
+            return SuccessJsonResponse(data={'errors': serializer.errors}, success=False,
+                                       status=status.HTTP_400_BAD_REQUEST)
+
+        round_id = serializer.validated_data.get('round_id') or session.round_id
+        if round_id is None or (
+                round_id != session.round_id
+                and not Round.objects.filter(id=round_id, guard_id=session.guard_id).exists()):
+            return SuccessJsonResponse(data={'errors': {'round_id': ['Обход не найден.']}}, success=False,
+                                       status=status.HTTP_400_BAD_REQUEST)
+
+        batch, created = create_visit_batch(
+            session.guard_id,
+            round_id,
+            serializer.validated_data['visits'],
+            serializer.validated_data['idempotency_key'],
+        )
+        return SuccessJsonResponse(
+            data={
+                'round_id': batch.round_id,
+                'visit_count': batch.visit_count,
+                'message_count': batch.message_count,
+                'duplicate': not created,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
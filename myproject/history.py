@@ -1,6 +1,19 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
 from simple_history import register
+from simple_history.models import HistoricalRecords
+from simple_history.utils import (
+    bulk_create_with_history as _bulk_create_with_history,
+    bulk_update_with_history as _bulk_update_with_history,
+    get_history_manager_for_model,
+)
 
 from dispatch.models import (
     AudioMessage,
@@ -23,6 +36,163 @@ from users.models import Notification, PasswordResetToken
 
 _HISTORY_REGISTERED = False
 
+HISTORY_MODE_FULL = "full"
+HISTORY_MODE_OFF = "off"
+
+_bulk_history_buffer: ContextVar["_HistoryBuffer | None"] = ContextVar("bulk_history_buffer", default=None)
+
+
+class _SavepointMarker:
+    """Пустой on_commit-колбэк: Django выбрасывает его при откате точки сохранения."""
+
+    def __call__(self):
+        pass
+
+
+class _HistoryBuffer:
+    """
+    Строки истории внутри bulk_history(). Каждая строка привязана к маркеру
+    текущего набора точек сохранения; строки из откаченных savepoint при
+    вставке отбрасываются вместе с их маркером.
+    """
+
+    def __init__(self):
+        self._markers: dict = {}
+        self._rows: list = []
+
+    def add(self, history_model, row, using=None) -> None:
+        connection = transaction.get_connection(using)
+        scope = (connection.alias, tuple(connection.savepoint_ids))
+        marker = self._markers.get(scope)
+        if marker is None:
+            marker = self._markers[scope] = _SavepointMarker()
+            transaction.on_commit(marker, using=using)
+        self._rows.append((connection, marker, history_model, row))
+
+    def rows_by_model(self) -> dict:
+        alive = {
+            (connection.alias, id(callback))
+            for connection in {connection for connection, *_ in self._rows}
+            for _, callback, _ in connection.run_on_commit
+        }
+        rows = {}
+        for connection, marker, history_model, row in self._rows:
+            if (connection.alias, id(marker)) in alive:
+                rows.setdefault(history_model, []).append(row)
+        return rows
+
+
+def get_history_policy(model) -> tuple[str, float]:
+    """
+    Политика истории для модели из settings.HISTORY_MODEL_POLICIES:
+    "off", "full" или доля сохраняемых записей (0..1).
+    """
+    policy = getattr(settings, "HISTORY_MODEL_POLICIES", {}).get(model._meta.label_lower, HISTORY_MODE_FULL)
+    if policy == HISTORY_MODE_OFF:
+        return HISTORY_MODE_OFF, 0.0
+    if policy == HISTORY_MODE_FULL:
+        return HISTORY_MODE_FULL, 1.0
+    try:
+        sample_rate = float(policy)
+    except (TypeError, ValueError):
+        return HISTORY_MODE_FULL, 1.0
+    if sample_rate <= 0:
+        return HISTORY_MODE_OFF, 0.0
+    return HISTORY_MODE_FULL, min(sample_rate, 1.0)
+
+
+def should_record_history(model) -> bool:
+    mode, sample_rate = get_history_policy(model)
+    if mode == HISTORY_MODE_OFF:
+        return False
+    return sample_rate >= 1 or random.random() < sample_rate
+
+
+class PolicyHistoricalRecords(HistoricalRecords):
+    """
+    HistoricalRecords с учётом HISTORY_MODEL_POLICIES и буфера bulk_history():
+    внутри контекста строки истории копятся и вставляются одним bulk_create.
+    """
+
+    def create_historical_record(self, instance, history_type, using=None):
+        if not should_record_history(type(instance)):
+            return
+
+        buffer = _bulk_history_buffer.get()
+        # Истории m2m нужна сохранённая строка-родитель, такие модели пишем сразу.
+        if buffer is None or self.m2m_fields:
+            return super().create_historical_record(instance, history_type, using=using)
+
+        manager = getattr(instance, self.manager_name)
+        attrs = {
+            field.attname: getattr(instance, field.attname)
+            for field in self.fields_included(instance)
+        }
+        buffer.add(
+            manager.model,
+            manager.model(
+                history_date=getattr(instance, "_history_date", timezone.now()),
+                history_type=history_type,
+                history_user=self.get_history_user(instance),
+                history_change_reason=self.get_change_reason_for_object(instance, history_type, using),
+                **attrs,
+            ),
+            using=using,
+        )
+
+
+@contextmanager
+def bulk_history(batch_size: int = 500):
+    """
+    Копит строки истории, создаваемые save()/delete() внутри блока, и вставляет
+    их одним bulk_create в той же транзакции. Вложенные вызовы переиспользуют
+    внешний буфер; строки из откаченных вложенных atomic() не вставляются.
+    """
+    if _bulk_history_buffer.get() is not None:
+        yield
+        return
+
+    buffer = _HistoryBuffer()
+    token = _bulk_history_buffer.set(buffer)
+    try:
+        with transaction.atomic():
+            yield
+            for history_model, rows in buffer.rows_by_model().items():
+                history_model.objects.bulk_create(rows, batch_size=batch_size)
+    finally:
+        _bulk_history_buffer.reset(token)
+
+
+def bulk_create_with_history(objs, model, batch_size=None, **kwargs):
+    if not should_record_history(model):
+        return model._default_manager.bulk_create(objs, batch_size=batch_size)
+    return _bulk_create_with_history(objs, model, batch_size=batch_size, **kwargs)
+
+
+def bulk_update_with_history(objs, model, fields, batch_size=None, **kwargs):
+    if not should_record_history(model):
+        return model._default_manager.bulk_update(objs, fields, batch_size=batch_size)
+    return _bulk_update_with_history(objs, model, fields, batch_size=batch_size, **kwargs)
+
+
+def update_with_history(queryset, batch_size: int = 500, **values) -> int:
+    """queryset.update(...) плюс одна пачка строк истории "~" для изменённых объектов."""
+    model = queryset.model
+    if not should_record_history(model):
+        return queryset.update(**values)
+
+    with transaction.atomic():
+        object_ids = list(queryset.values_list("pk", flat=True))
+        if not object_ids:
+            return 0
+        updated_count = model._default_manager.filter(pk__in=object_ids).update(**values)
+        get_history_manager_for_model(model).bulk_history_create(
+            model._default_manager.filter(pk__in=object_ids),
+            batch_size=batch_size,
+            update=True,
+        )
+    return updated_count
+
 
 def register_model_histories() -> None:
     global _HISTORY_REGISTERED
@@ -61,6 +231,6 @@ def register_model_histories() -> None:
     for model, config in model_configs:
         if hasattr(model, "history"):
             continue
-        register(model, **config)
+        register(model, records_class=PolicyHistoricalRecords, **config)
 
     _HISTORY_REGISTERED = True
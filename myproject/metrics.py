@@ -0,0 +1,394 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable
+
+import structlog
+
+
+logger = structlog.get_logger(__name__)
+
+METRICS_MULTIPROC_DIR_ENV = "METRICS_MULTIPROC_DIR"
+METRICS_FLUSH_INTERVAL_ENV = "METRICS_FLUSH_INTERVAL_SECONDS"
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Iterable[str], labelvalues: Iterable[str], extra: str = "") -> str:
+    parts = [
+        f'{name}="{_escape_label_value(str(value))}"'
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        parts.append(extra)
+    if not parts:
+        return ""
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._samples: dict[tuple[str, ...], Any] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), self._copy_value(value)] for key, value in self._samples.items()]
+        return {
+            "kind": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _copy_value(value):
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._samples[key] = sample
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    sample["buckets"][index] += 1
+                    break
+            sample["sum"] += value
+            sample["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def snapshot(self) -> dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+    @staticmethod
+    def _copy_value(value):
+        return {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+
+    В режиме нескольких процессов (воркеры gunicorn) каждый процесс периодически
+    сбрасывает свой снимок в METRICS_MULTIPROC_DIR, а /metrics суммирует все файлы.
+    """
+
+    def __init__(self, multiproc_dir: str | os.PathLike[str] | None = None, flush_interval: float = 5.0):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.multiproc_dir = Path(multiproc_dir) if multiproc_dir else None
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def _process_file(self, pid: int | None = None) -> Path:
+        return self.multiproc_dir / f"metrics-{pid or os.getpid()}.json"
+
+    def flush(self) -> None:
+        if self.multiproc_dir is None:
+            return
+        self.multiproc_dir.mkdir(parents=True, exist_ok=True)
+        target = self._process_file()
+        tmp_path = target.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        os.replace(tmp_path, target)
+        self._last_flush = time.monotonic()
+
+    def flush_if_due(self) -> None:
+        if self.multiproc_dir is None:
+            return
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        try:
+            self.flush()
+        except OSError:
+            logger.exception("metrics_flush_failed", multiproc_dir=str(self.multiproc_dir))
+
+    def mark_process_dead(self, pid: int) -> None:
+        """Убирает gauge умершего воркера, счётчики и гистограммы остаются в сумме."""
+        if self.multiproc_dir is None:
+            return
+        path = self._process_file(pid)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        data = {name: metric for name, metric in data.items() if metric["kind"] != "gauge"}
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+    def clear_multiproc_dir(self) -> None:
+        if self.multiproc_dir is None or not self.multiproc_dir.exists():
+            return
+        for path in self.multiproc_dir.glob("metrics-*.json"):
+            path.unlink(missing_ok=True)
+
+    def collect(self) -> dict[str, Any]:
+        if self.multiproc_dir is None:
+            return self.snapshot()
+
+        self.flush()
+        merged: dict[str, Any] = {}
+        for path in sorted(self.multiproc_dir.glob("metrics-*.json")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            for name, metric in data.items():
+                _merge_metric(merged, name, metric)
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            labelnames = metric["labelnames"]
+            for labelvalues, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+                if metric["kind"] == "histogram":
+                    lines.extend(_render_histogram(name, labelnames, labelvalues, metric["buckets"], value))
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge_metric(merged: dict[str, Any], name: str, metric: dict[str, Any]) -> None:
+    target = merged.setdefault(name, {**metric, "samples": []})
+    samples = {tuple(labels): value for labels, value in target["samples"]}
+    for labels, value in metric["samples"]:
+        key = tuple(labels)
+        current = samples.get(key)
+        if current is None:
+            samples[key] = value
+        elif metric["kind"] == "histogram":
+            samples[key] = {
+                "buckets": [a + b for a, b in zip(current["buckets"], value["buckets"])],
+                "sum": current["sum"] + value["sum"],
+                "count": current["count"] + value["count"],
+            }
+        else:
+            samples[key] = current + value
+    target["samples"] = [[list(key), value] for key, value in samples.items()]
+
+
+def _render_histogram(name, labelnames, labelvalues, buckets, value) -> list[str]:
+    lines = []
+    cumulative = 0
+    for upper_bound, bucket_count in zip(buckets, value["buckets"]):
+        cumulative += bucket_count
+        le = f'le="{_format_value(upper_bound)}"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+    inf_label = 'le="+Inf"'
+    lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, inf_label)} {value['count']}")
+    lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(value['sum'])}")
+    lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {value['count']}")
+    return lines
+
+
+def _flush_interval_from_env() -> float:
+    try:
+        return max(0.0, float(os.getenv(METRICS_FLUSH_INTERVAL_ENV, "5")))
+    except ValueError:
+        return 5.0
+
+
+REGISTRY = MetricsRegistry(
+    multiproc_dir=os.getenv(METRICS_MULTIPROC_DIR_ENV) or None,
+    flush_interval=_flush_interval_from_env(),
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Number of DB queries executed per HTTP request",
+    ["method", "route"],
+    registry=REGISTRY,
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "DB queries executed while serving HTTP requests",
+    ["route"],
+    registry=REGISTRY,
+)
+NOTIFICATIONS = Counter(
+    "notifications_total",
+    "Notification delivery pipeline events",
+    ["event"],
+    registry=REGISTRY,
+)
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    "notification_executor_queue_depth",
+    "Pending notification deliveries in the executor queue",
+    registry=REGISTRY,
+)
+PROVIDER_REQUEST_DURATION = Histogram(
+    "notification_provider_duration_seconds",
+    "Latency of external notification providers",
+    ["provider", "outcome"],
+    registry=REGISTRY,
+)
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "APScheduler job execution time",
+    ["job", "outcome"],
+    registry=REGISTRY,
+)
+SCHEDULER_JOB_LAG = Histogram(
+    "scheduler_job_lag_seconds",
+    "Delay between scheduled and actual APScheduler job submission",
+    ["job"],
+    registry=REGISTRY,
+)
+SCHEDULER_JOB_MISSED = Counter(
+    "scheduler_job_missed_total",
+    "APScheduler runs skipped because of misfire",
+    ["job"],
+    registry=REGISTRY,
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped by the async file handler (full queue or failed write)",
+    ["handler"],
+    registry=REGISTRY,
+)
+
+
+@contextmanager
+def track_provider_call(provider: str):
+    started_at = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        PROVIDER_REQUEST_DURATION.observe(
+            time.perf_counter() - started_at,
+            provider=provider,
+            outcome=outcome,
+        )
+
+
+@contextmanager
+def track_scheduler_job(job_name: str):
+    started_at = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        SCHEDULER_JOB_DURATION.observe(
+            time.perf_counter() - started_at,
+            job=job_name,
+            outcome=outcome,
+        )
+        REGISTRY.flush_if_due()
@@ -1,8 +1,15 @@
 import time
 
 import structlog
+from django.db import connection
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from myproject.metrics import (
+    DB_QUERIES,
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DURATION,
+    REGISTRY,
+)
 from myproject.observability import new_request_id
 
 
@@ -16,6 +23,22 @@ def _get_client_ip(request) -> str | None:
     return request.META.get("REMOTE_ADDR")
 
 
+def _get_route(request) -> str:
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return "<unresolved>"
+    return resolver_match.route or resolver_match.view_name or "<unresolved>"
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
 class RequestContextMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -66,21 +89,41 @@ class RequestContextMiddleware:
         started_at = time.perf_counter()
         logger.info("http_request_started")
 
+        query_counter = _QueryCounter()
         try:
-            response = self.get_response(request)
+            with connection.execute_wrapper(query_counter):
+                response = self.get_response(request)
         except Exception:
+            duration = time.perf_counter() - started_at
             logger.exception(
                 "http_request_failed",
-                duration_ms=round((time.perf_counter() - started_at) * 1000, 2),
+                duration_ms=round(duration * 1000, 2),
             )
+            self._record_metrics(request, 500, duration, query_counter.count)
             structlog.contextvars.clear_contextvars()
             raise
 
+        duration = time.perf_counter() - started_at
         response["X-Request-ID"] = request_id
         logger.info(
             "http_request_finished",
             status_code=response.status_code,
-            duration_ms=round((time.perf_counter() - started_at) * 1000, 2),
+            duration_ms=round(duration * 1000, 2),
         )
+        self._record_metrics(request, response.status_code, duration, query_counter.count)
         structlog.contextvars.clear_contextvars()
         return response
+
+    @staticmethod
+    def _record_metrics(request, status_code, duration, query_count):
+        route = _get_route(request)
+        HTTP_REQUEST_DURATION.observe(
+            duration,
+            method=request.method,
+            route=route,
+            status=status_code,
+        )
+        HTTP_REQUEST_DB_QUERIES.observe(query_count, method=request.method, route=route)
+        if query_count:
+            DB_QUERIES.inc(query_count, route=route)
+        REGISTRY.flush_if_due()
@@ -1,20 +1,55 @@
 import enum
 import logging
 import os
+import queue
+import threading
 import uuid
+import weakref
 from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from pathlib import Path
 import re
+from time import monotonic as _monotonic
 from typing import Any
 from uuid import UUID
 
 from django.db import models
-from django.db.models.fields.files import FieldFile
+from django.db.models.fields.files import FieldFile, FileField
 from django.utils import timezone
+from django.utils.encoding import force_str
+from django.utils.hashable import make_hashable
 import structlog
 
+from myproject.metrics import LOG_RECORDS_DROPPED
+
+
+_WRITER_STOP = object()
+_FORK_AWARE_HANDLERS = weakref.WeakSet()
+
+
+def _handlers_before_fork() -> None:
+    for handler in list(_FORK_AWARE_HANDLERS):
+        handler._before_fork()
+
+
+def _handlers_after_fork_in_parent() -> None:
+    for handler in list(_FORK_AWARE_HANDLERS):
+        handler._after_fork_in_parent()
+
+
+def _handlers_after_fork_in_child() -> None:
+    for handler in list(_FORK_AWARE_HANDLERS):
+        handler._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=_handlers_before_fork,
+        after_in_parent=_handlers_after_fork_in_parent,
+        after_in_child=_handlers_after_fork_in_child,
+    )
+
 
 def configure_structlog() -> None:
     timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
@@ -47,6 +82,17 @@ def configure_structlog() -> None:
 
 
 class DailyStructuredFileHandler(logging.Handler):
+    """
+    Пишет логи в файл на каждый день и удаляет файлы старше retention_days.
+
+    В async_mode запись уходит в ограниченную очередь, а фоновый поток пишет
+    её пачками и сбрасывает на диск раз в flush_interval секунд. При
+    переполнении очереди записи отбрасываются и учитываются в dropped_count.
+
+    Перед fork (gunicorn preload_app) буфер файла сбрасывается на диск, а в
+    дочернем процессе файл открывается заново, и фоновый поток запускается свой.
+    """
+
     terminator = "\n"
 
     def __init__(
@@ -55,18 +101,35 @@ class DailyStructuredFileHandler(logging.Handler):
         filename_prefix: str = "application",
         retention_days: int = 14,
         encoding: str = "utf-8",
+        async_mode: bool = False,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
     ) -> None:
         super().__init__()
         self.log_dir = Path(log_dir)
         self.filename_prefix = filename_prefix
         self.retention_days = int(retention_days)
         self.encoding = encoding
+        self.async_mode = bool(async_mode)
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.dropped_count = 0
         self._stream = None
         self._current_date: date | None = None
+        self._rollover_at: float | None = None
         self._filename_regex = re.compile(
             rf"^{re.escape(self.filename_prefix)}-(\d{{4}}-\d{{2}}-\d{{2}})\.log$"
         )
+        self._queue: queue.Queue | None = None
+        self._writer: threading.Thread | None = None
+        self._writer_pid: int | None = None
+        self._writer_lock = threading.Lock()
+        # Защищает файл от записи фоновым потоком во время fork и close
+        self._io_lock = threading.RLock()
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        _FORK_AWARE_HANDLERS.add(self)
 
     def _today(self) -> date:
         return timezone.localdate()
@@ -87,8 +150,22 @@ class DailyStructuredFileHandler(logging.Handler):
             if file_date < cutoff_date:
                 path.unlink(missing_ok=True)
 
-    def _ensure_stream(self) -> None:
+    @staticmethod
+    def _next_midnight(current_date: date) -> float:
+        next_midnight = datetime.combine(current_date + timedelta(days=1), time.min)
+        return timezone.make_aware(next_midnight).timestamp()
+
+    def _ensure_stream(self, record_created: float | None = None) -> None:
+        if (
+            self._stream is not None
+            and self._rollover_at is not None
+            and record_created is not None
+            and record_created < self._rollover_at
+        ):
+            return
+
         current_date = self._today()
+        self._rollover_at = self._next_midnight(current_date)
         if self._stream is not None and self._current_date == current_date:
             return
 
@@ -96,35 +173,161 @@ class DailyStructuredFileHandler(logging.Handler):
             self._stream.close()
 
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        self._stream = open(
-            self._build_path(current_date),
-            mode="a",
-            encoding=self.encoding,
-            buffering=1,
-        )
+        # Файл дня общий для воркеров gunicorn и планировщика: без буфера и с O_APPEND,
+        # чтобы каждая пачка строк уходила одним write() и строки процессов не перемешивались
+        self._stream = open(self._build_path(current_date), mode="ab", buffering=0)
         self._current_date = current_date
         self._cleanup_old_files(current_date)
 
-    def emit(self, record: logging.LogRecord) -> None:
-        try:
-            self._ensure_stream()
-            if self._stream is None:
+    def _writer_running(self) -> bool:
+        # После fork (gunicorn preload_app) поток мастера в воркере не существует.
+        return self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive()
+
+    def _ensure_writer(self) -> None:
+        if self._writer_running():
+            return
+        with self._writer_lock:
+            if self._writer_running():
                 return
-            self._stream.write(self.format(record) + self.terminator)
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._writer_pid = os.getpid()
+            self._writer = threading.Thread(
+                target=self._writer_loop,
+                args=(self._queue,),
+                name="log-file-writer",
+                daemon=True,
+            )
+            self._writer.start()
+
+    def _before_fork(self) -> None:
+        self._io_lock.acquire()
+        try:
             self.flush()
+        except Exception:
+            pass
+
+    def _after_fork_in_parent(self) -> None:
+        self._io_lock.release()
+
+    def _after_fork_in_child(self) -> None:
+        self._io_lock = threading.RLock()
+        self._writer_lock = threading.Lock()
+        self._writer = None
+        self._writer_pid = None
+        self._queue = None
+        if self._stream is not None:
+            # Буфер сброшен перед fork: закрываем только копию дескриптора
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        self._current_date = None
+        self._rollover_at = None
+
+    def _record_dropped(self, count: int) -> None:
+        self.dropped_count += count
+        LOG_RECORDS_DROPPED.inc(count, handler=self.filename_prefix)
+
+    def _writer_loop(self, pending: queue.Queue) -> None:
+        last_flush = _monotonic()
+        while True:
+            try:
+                item = pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            batch = [] if item is None else [item]
+            while item is not _WRITER_STOP and len(batch) < self.batch_size:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            stop = bool(batch) and batch[-1] is _WRITER_STOP
+            if stop:
+                batch.pop()
+            self._write_batch(batch)
+
+            if stop or _monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = _monotonic()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[tuple[float, str]]) -> None:
+        with self._io_lock:
+            lines = []
+            for record_created, line in batch:
+                if self._rollover_at is None or record_created >= self._rollover_at:
+                    self._write_lines(lines)
+                    lines = []
+                    try:
+                        self._ensure_stream(record_created)
+                    except Exception:
+                        self._record_dropped(1)
+                        continue
+                lines.append(line)
+            self._write_lines(lines)
+
+    def _write_lines(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        if self._stream is None:
+            self._record_dropped(len(lines))
+            return
+        try:
+            self._append("".join(lines))
+        except Exception:
+            self._record_dropped(len(lines))
+
+    def _append(self, text: str) -> None:
+        data = memoryview(text.encode(self.encoding))
+        while data:
+            data = data[self._stream.write(data):]
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not self.async_mode:
+            try:
+                with self._io_lock:
+                    self._ensure_stream(record.created)
+                    if self._stream is None:
+                        return
+                    self._append(self.format(record) + self.terminator)
+                    self.flush()
+            except Exception:
+                self.handleError(record)
+            return
+
+        try:
+            # Форматируем в потоке вызова: contextvars структурного лога живут здесь.
+            line = self.format(record) + self.terminator
+            self._ensure_writer()
+            self._queue.put_nowait((record.created, line))
+        except queue.Full:
+            self._record_dropped(1)
         except Exception:
             self.handleError(record)
 
     def flush(self) -> None:
-        if self._stream is not None:
-            self._stream.flush()
+        with self._io_lock:
+            if self._stream is not None:
+                self._stream.flush()
 
     def close(self) -> None:
         try:
-            if self._stream is not None:
-                self._stream.close()
-                self._stream = None
+            writer = self._writer
+            if writer is not None and self._writer_pid == os.getpid() and writer.is_alive():
+                self._queue.put(_WRITER_STOP)
+                writer.join(timeout=max(5.0, self.flush_interval * 2))
+            self._writer = None
+            with self._io_lock:
+                if self._stream is not None:
+                    self._stream.close()
+                    self._stream = None
         finally:
+            _FORK_AWARE_HANDLERS.discard(self)
             super().close()
 
 
@@ -134,6 +337,9 @@ def build_logging_config(
     log_dir: str | os.PathLike[str] = "logs",
     filename_prefix: str = "application",
     retention_days: int = 14,
+    async_mode: bool = False,
+    max_queue_size: int = 10000,
+    flush_interval: float = 1.0,
 ) -> dict[str, Any]:
     timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
     foreign_pre_chain = [
@@ -167,6 +373,9 @@ def build_logging_config(
                 "log_dir": str(log_dir),
                 "filename_prefix": filename_prefix,
                 "retention_days": retention_days,
+                "async_mode": async_mode,
+                "max_queue_size": max_queue_size,
+                "flush_interval": flush_interval,
             },
         },
         "root": {
@@ -258,6 +467,59 @@ def model_snapshot(instance: models.Model, include_m2m: bool = False) -> dict[st
     return snapshot
 
 
+def _choice_display(field, value) -> Any:
+    return force_str(
+        dict(field.flatchoices).get(make_hashable(value), value),
+        strings_only=True,
+    )
+
+
+def snapshot_from_values(model: type[models.Model], values: dict[str, Any]) -> dict[str, Any]:
+    """То же, что model_snapshot, но по сырым значениям полей (attname -> value)."""
+    snapshot: dict[str, Any] = {}
+
+    for field in model._meta.concrete_fields:
+        field_name = field.attname if field.is_relation else field.name
+        value = values[field.attname]
+        if isinstance(field, FileField) and not isinstance(value, FieldFile):
+            snapshot[field_name] = value or None
+        else:
+            snapshot[field_name] = serialize_for_log(value)
+        if field.choices:
+            snapshot[f"{field.name}_display"] = serialize_for_log(_choice_display(field, value))
+
+    return snapshot
+
+
+class FieldTrackerMixin:
+    """
+    Запоминает значения полей в момент загрузки из БД, чтобы аудит мог
+    построить состояние "до" без повторного SELECT перед сохранением.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_field_values = {
+            field_name: value
+            for field_name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def loaded_snapshot(self) -> dict[str, Any] | None:
+        snapshot = getattr(self, "_audit_loaded_snapshot", None)
+        if snapshot is not None:
+            return snapshot
+
+        loaded_values = getattr(self, "_loaded_field_values", None)
+        if loaded_values is None:
+            return None
+        if any(field.attname not in loaded_values for field in self._meta.concrete_fields):
+            return None
+        return snapshot_from_values(type(self), loaded_values)
+
+
 def diff_snapshots(
     before: dict[str, Any] | None,
     after: dict[str, Any] | None,
@@ -13,6 +13,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 from myproject.observability import build_logging_config, configure_structlog
 
 # from rest_framework_nested.runtests.settings import MIDDLEWARE_CLASSES
@@ -143,6 +145,29 @@ else:
         }
     }
 
+# Кэш общий для всех воркеров gunicorn и планировщика. Инвалидация по сигналам
+# чистит только кэш своего процесса, поэтому локальная память допустима лишь
+# для разработки и тестов: вне DEBUG без REDIS_URL не стартуем, а gunicorn.conf.py
+# не запускает несколько воркеров с LocMemCache.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sostra',
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured('REDIS_URL обязателен при DEBUG=False: кэш должен быть общим для всех процессов')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -247,12 +272,37 @@ LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_DIR = os.getenv('LOG_DIR', str(BASE_DIR / 'logs'))
 LOG_FILE_PREFIX = os.getenv('LOG_FILE_PREFIX', 'application')
 LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '14'))
+LOG_ASYNC = os.getenv('LOG_ASYNC', '1') == '1'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '1'))
 LOGGING = build_logging_config(
     LOG_LEVEL,
     log_dir=LOG_DIR,
     filename_prefix=LOG_FILE_PREFIX,
     retention_days=LOG_RETENTION_DAYS,
+    async_mode=LOG_ASYNC,
+    max_queue_size=LOG_QUEUE_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL,
 )
 configure_structlog()
 
+# full — before/after/changes, changes — только diff, off — аудит диспетчеризации выключен
+DISPATCH_AUDIT_MODE = os.getenv('DISPATCH_AUDIT_MODE', 'full')
+DISPATCH_AUDIT_FULL_PAYLOAD_SAMPLE_RATE = float(os.getenv('DISPATCH_AUDIT_FULL_PAYLOAD_SAMPLE_RATE', '1'))
+
 SIMPLE_HISTORY_REVERT_DISABLED = True
+
+# Политика истории для частых моделей: "app_label.model=off|full|<доля 0..1>" через запятую,
+# например "users.notification=off,myapp.visit=0.1"
+HISTORY_MODEL_POLICIES = dict(
+    item.split('=', 1)
+    for item in os.getenv('HISTORY_MODEL_POLICIES', '').split(',')
+    if '=' in item
+)
+
+# Класс хранилища архива истории (по умолчанию myapp.models.HistoryArchiveS3Storage),
+# срок хранения в основных таблицах задаётся HISTORY_RETENTION_DAYS
+HISTORY_ARCHIVE_STORAGE = os.getenv('HISTORY_ARCHIVE_STORAGE') or None
+
+# Класс хранилища кэша PNG QR-кодов точек (по умолчанию myapp.models.QRCodeS3Storage)
+QR_CODE_STORAGE = os.getenv('QR_CODE_STORAGE') or None
@@ -0,0 +1,187 @@
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+import structlog
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+from dispatch.models import AudioMessage, PhotoMessage, VideoMessage
+from food.models import Dish, Feedback
+from myapp.models import DirectUpload
+
+
+UPLOAD_URL_EXPIRES = 15 * 60
+# Медленная загрузка с телефона может идти дольше срока ссылки: подтверждаем в течение суток
+UPLOAD_CONFIRM_MAX_AGE = 24 * 60 * 60
+UPLOAD_TOKEN_SALT = "direct-upload"
+IMAGE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp", "image/heic")
+MAX_IMAGE_SIZE = 20 * 1024 * 1024
+MAX_MEDIA_SIZE = 100 * 1024 * 1024
+
+logger = structlog.get_logger(__name__)
+
+
+class UploadError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class UploadTarget:
+    """Файловое поле модели, в которое клиент загружает файл напрямую в хранилище."""
+
+    name: str
+    model: type
+    field_name: str
+    content_types: tuple[str, ...]
+    max_size: int
+    # Право на создание/изменение объекта; None — достаточно аутентификации
+    permission: str | None = None
+
+    @property
+    def field(self):
+        return self.model._meta.get_field(self.field_name)
+
+    @property
+    def storage(self):
+        return self.field.storage
+
+    def new_name(self, filename) -> str:
+        _, extension = os.path.splitext(filename)
+        return self.field.generate_filename(None, f"{uuid.uuid4().hex}{extension.lower()}")
+
+
+UPLOAD_TARGETS = {
+    target.name: target
+    for target in [
+        UploadTarget("dish_photo", Dish, "photo", IMAGE_CONTENT_TYPES, MAX_IMAGE_SIZE, "food.change_dish"),
+        UploadTarget("feedback_photo", Feedback, "photo", IMAGE_CONTENT_TYPES, MAX_IMAGE_SIZE, "food.add_feedback"),
+        UploadTarget("incident_photo", PhotoMessage, "photo", IMAGE_CONTENT_TYPES, MAX_IMAGE_SIZE),
+        UploadTarget("incident_video", VideoMessage, "video", ("video/mp4", "video/quicktime", "video/webm"),
+                     MAX_MEDIA_SIZE),
+        UploadTarget("incident_audio", AudioMessage, "audio",
+                     ("audio/mpeg", "audio/mp4", "audio/aac", "audio/ogg", "audio/webm", "audio/wav"),
+                     MAX_MEDIA_SIZE),
+    ]
+}
+
+
+def get_upload_target(name) -> UploadTarget:
+    try:
+        return UPLOAD_TARGETS[name]
+    except KeyError:
+        raise UploadError(f"Неизвестное назначение загрузки: {name}")
+
+
+def _presigned_post(target, name, content_type, size, token) -> tuple[str, dict]:
+    storage = target.storage
+    if isinstance(storage, S3Boto3Storage):
+        # Политика POST подписывает тип и диапазон размера: больше заявленного S3 не примет
+        presigned = storage.bucket.meta.client.generate_presigned_post(
+            Bucket=storage.bucket_name,
+            Key=storage._normalize_name(clean_name(name)),
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, size]],
+            ExpiresIn=UPLOAD_URL_EXPIRES,
+        )
+        return presigned["url"], presigned["fields"]
+    # Локальное хранилище (разработка и тесты): загрузка через приложение
+    return reverse("direct-upload-local", kwargs={"token": token}), {"Content-Type": content_type}
+
+
+def create_upload_slot(target, user, filename, content_type, size) -> dict:
+    """
+    Выдаёт место для загрузки: ключ в хранилище, подписанную форму POST
+    (upload_url и поля fields, файл — в поле file) и токен, которым клиент
+    подтверждает загрузку. Размер ограничен заявленным size.
+    """
+    if content_type not in target.content_types:
+        raise UploadError(f"Недопустимый тип файла: {content_type}")
+    if not 0 < size <= target.max_size:
+        raise UploadError(f"Размер файла должен быть от 1 байта до {target.max_size // (1024 * 1024)} МБ")
+
+    name = target.new_name(filename)
+    token = signing.dumps(
+        {"target": target.name, "name": name, "user": user.id, "content_type": content_type, "size": size},
+        salt=UPLOAD_TOKEN_SALT,
+    )
+    DirectUpload.objects.create(target=target.name, name=name, user=user)
+    upload_url, fields = _presigned_post(target, name, content_type, size, token)
+    logger.info("direct_upload_slot_created", target=target.name, file_name=name, user_id=user.id, size=size)
+    return {
+        "upload_url": upload_url,
+        "method": "POST",
+        "fields": fields,
+        "token": token,
+        "expires_in": UPLOAD_URL_EXPIRES,
+    }
+
+
+def read_upload_token(token, max_age=UPLOAD_CONFIRM_MAX_AGE) -> dict:
+    try:
+        return signing.loads(token, salt=UPLOAD_TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        raise UploadError("Недействительный или просроченный токен загрузки")
+
+
+def confirm_upload(target, user, token) -> str:
+    """Проверяет, что файл по токену загружен в хранилище, и возвращает его имя для поля модели."""
+    slot = read_upload_token(token)
+    if slot["target"] != target.name or slot["user"] != user.id:
+        raise UploadError("Токен загрузки выдан для другого назначения")
+
+    storage = target.storage
+    if not storage.exists(slot["name"]):
+        raise UploadError("Файл ещё не загружен в хранилище")
+    size = storage.size(slot["name"])
+    # Токены, выданные до ограничения по заявленному размеру, его не содержат
+    if size > slot.get("size", target.max_size):
+        storage.delete(slot["name"])
+        raise UploadError("Загруженный файл превышает допустимый размер")
+
+    # Место одноразовое: один файл нельзя привязать по тому же токену к нескольким объектам
+    consumed = DirectUpload.objects.filter(
+        target=target.name, name=slot["name"], confirmed_at__isnull=True,
+    ).update(confirmed_at=timezone.now())
+    if not consumed:
+        raise UploadError("Токен загрузки уже использован")
+
+    logger.info("direct_upload_confirmed", target=target.name, file_name=slot["name"], user_id=user.id, size=size)
+    return slot["name"]
+
+
+def save_local_upload(token, content) -> str:
+    """Замена подписанного POST для хранилищ без S3 (разработка и тесты)."""
+    slot = read_upload_token(token, max_age=UPLOAD_URL_EXPIRES)
+    target = get_upload_target(slot["target"])
+    if isinstance(target.storage, S3Boto3Storage):
+        raise UploadError("Файлы загружаются напрямую в хранилище")
+    if not 0 < len(content) <= slot.get("size", target.max_size):
+        raise UploadError("Загруженный файл превышает допустимый размер")
+    if target.storage.exists(slot["name"]):
+        target.storage.delete(slot["name"])
+    return target.storage.save(slot["name"], ContentFile(content))
+
+
+def cleanup_abandoned_uploads(now_value=None) -> int:
+    """
+    Удаляет файлы неподтверждённых мест загрузки старше срока подтверждения и записи
+    о всех просроченных местах (их токены уже недействительны). Возвращает число удалённых файлов.
+    """
+    cutoff = (now_value or timezone.now()) - timedelta(seconds=UPLOAD_CONFIRM_MAX_AGE)
+    expired = DirectUpload.objects.filter(created_at__lt=cutoff)
+    deleted_count = 0
+    for upload in expired.filter(confirmed_at__isnull=True).order_by("id").iterator():
+        target = UPLOAD_TARGETS.get(upload.target)
+        if target and target.storage.exists(upload.name):
+            target.storage.delete(upload.name)
+            deleted_count += 1
+    expired.delete()
+
+    logger.info("abandoned_uploads_cleanup_finished", deleted_count=deleted_count, cutoff=cutoff.isoformat())
+    return deleted_count
@@ -22,6 +22,7 @@ from django.views.static import serve
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from myproject.settings import DEBUG
+from myproject.views import DirectUploadSlotView, LocalUploadView, metrics_view
 from users.views import (
     ChangePasswordView,
     ReadUserNotificationView,
@@ -62,6 +63,9 @@ urlpatterns = [
         PasswordResetConfirmView.as_view(),
         name="password_reset_confirm",
     ),
+    path("metrics", metrics_view, name="metrics"),
+    path("api/uploads/", DirectUploadSlotView.as_view(), name="direct-upload-slot"),
+    path("api/uploads/local/<str:token>/", LocalUploadView.as_view(), name="direct-upload-local"),
     path("api/users/", UserListAPIView.as_view()),
     path(
         "api/users/notifications/<int:user_id>/",
@@ -0,0 +1,75 @@
+import hmac
+import os
+
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from rest_framework import serializers, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from myproject.metrics import REGISTRY
+from myproject.uploads import UploadError, create_upload_slot, get_upload_target, save_local_upload
+
+
+METRICS_TOKEN_ENV = "METRICS_TOKEN"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics_view(request):
+    expected_token = os.getenv(METRICS_TOKEN_ENV)
+    if expected_token:
+        provided = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(provided, expected_token):
+            return HttpResponseForbidden()
+
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class UploadSlotSerializer(serializers.Serializer):
+    target = serializers.CharField()
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1)
+
+
+class DirectUploadSlotView(APIView):
+    """
+    Место для загрузки файла напрямую в хранилище: клиент отправляет multipart POST
+    на upload_url с полями fields и файлом в поле file, затем передаёт token в API
+    объекта (блюда, отзыва или сообщения инцидента).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSlotSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            target = get_upload_target(data["target"])
+            if target.permission and not request.user.has_perm(target.permission):
+                raise PermissionDenied()
+            slot = create_upload_slot(target, request.user, data["filename"], data["content_type"], data["size"])
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(slot, status=status.HTTP_201_CREATED)
+
+
+class LocalUploadView(APIView):
+    """Принимает POST формы вместо S3, когда медиа лежат в локальном хранилище."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, token):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Файл не передан"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            save_local_upload(token, upload.read())
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_200_OK)
@@ -4,6 +4,8 @@ import requests
 import structlog
 from django.conf import settings
 
+from myproject.metrics import track_provider_call
+
 
 SMSAERO_API_URL = "https://gate.smsaero.ru/v2/sms/send"
 logger = structlog.get_logger(__name__)
@@ -64,12 +66,13 @@ def _send_sms_smsaero(
         "channel": "digital"
     }
 
-    resp = requests.post(
-        SMSAERO_API_URL,
-        json=payload,
-        auth=(email, api_key),
-        timeout=15
-    )
+    with track_provider_call("smsaero"):
+        resp = requests.post(
+            SMSAERO_API_URL,
+            json=payload,
+            auth=(email, api_key),
+            timeout=15
+        )
 
     try:
         data = resp.json()